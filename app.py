@@ -1,6 +1,11 @@
+import os
+
 from weekmenu import create_app
 
-app = create_app()
+# Met debug=True draait de reloader: het ouderproces bewaakt alleen de
+# bestanden, het kindproces (WERKZEUG_RUN_MAIN) bedient de requests. Alleen
+# dat laatste mag scrape-jobs oppakken.
+app = create_app(start_workers=__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=True)
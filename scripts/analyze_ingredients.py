@@ -201,9 +201,10 @@ def load_data(db_path):
     conn.row_factory = sqlite3.Row
 
     ingredients = conn.execute('''
-        SELECT i.id, i.name, i.category, i.ah_product_id, i.ah_product_name,
+        SELECT i.id, i.name, i.category, i.ah_product_id, p.title AS ah_product_name,
                COUNT(ri.id) as ri_count
         FROM ingredient i
+        LEFT JOIN ah_product p ON p.webshop_id = i.ah_product_id
         LEFT JOIN recipe_ingredient ri ON ri.ingredient_id = i.id
         GROUP BY i.id
     ''').fetchall()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Query-plan check voor weekmenu-planner: draait EXPLAIN QUERY PLAN op de
+hete queries en faalt als een ervan de tabel volledig scant.
+
+Usage:
+  python3 scripts/check_query_plans.py                 # tegen data/weekmenu.db
+  python3 scripts/check_query_plans.py --db pad.db
+
+Read-only. Exit code 1 als een query geen index gebruikt (bv. na een
+schemawijziging die migratie v8 ongedaan maakt).
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+
+_LOCAL_DB = os.path.join(os.path.dirname(__file__), '..', 'data', 'weekmenu.db')
+_DOCKER_DB = '/data/weekmenu.db'
+DB_PATH = _DOCKER_DB if os.path.exists(_DOCKER_DB) else _LOCAL_DB
+
+# (label, tabel die niet gescand mag worden, SQL, parameters)
+HOT_QUERIES = [
+    ('weekmenu', 'menu_item',
+     'SELECT * FROM menu_item WHERE year = ? AND week_number = ?', (2026, 10)),
+    ('recept in weekmenu', 'menu_item',
+     'SELECT DISTINCT year, week_number FROM menu_item WHERE recipe_id = ?', (1,)),
+    ('snel toevoegen', 'quick_add_item',
+     'SELECT * FROM quick_add_item WHERE year = ? AND week_number = ?', (2026, 10)),
+    ('recept in snel toevoegen', 'quick_add_item',
+     'SELECT DISTINCT year, week_number FROM quick_add_item WHERE recipe_id = ?', (1,)),
+    ('extra boodschappen', 'custom_shopping_ingredient',
+     'SELECT * FROM custom_shopping_ingredient WHERE year = ? AND week_number = ?', (2026, 10)),
+    ('uitsluitingen', 'shopping_list_exclusion',
+     'SELECT ingredient_id FROM shopping_list_exclusion WHERE year = ? AND week_number = ?', (2026, 10)),
+    ('AH-aantallen', 'shopping_list_override',
+     'SELECT * FROM shopping_list_override WHERE year = ? AND week_number = ?', (2026, 10)),
+    ('ingrediënten van recept', 'recipe_ingredient',
+     'SELECT * FROM recipe_ingredient WHERE recipe_id = ?', (1,)),
+    ('recepten met ingrediënt', 'recipe_ingredient',
+     'SELECT recipe_id FROM recipe_ingredient WHERE ingredient_id = ?', (1,)),
+    ('alias-prefix', 'ingredient_alias',
+     'SELECT ingredient_id FROM ingredient_alias WHERE alias LIKE ?', ('ui%',)),
+    ('recent gebruikt', 'recipe',
+     'SELECT * FROM recipe WHERE last_used IS NOT NULL ORDER BY last_used DESC LIMIT 10', ()),
+    ('populair', 'recipe',
+     'SELECT * FROM recipe WHERE usage_count > 0 ORDER BY usage_count DESC LIMIT 10', ()),
+]
+
+
+def check(db_path):
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    failures = 0
+    for label, table, sql, params in HOT_QUERIES:
+        plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+        # 'SCAN tabel' zonder 'USING ... INDEX' is een volledige tabelscan
+        scans = [p for p in plan
+                 if p.split()[:2] == ['SCAN', table] and 'INDEX' not in p]
+        status = 'FAIL' if scans else 'ok'
+        failures += bool(scans)
+        print(f'{status:4}  {label:28} {" | ".join(plan)}')
+    conn.close()
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check query plans of hot queries')
+    parser.add_argument('--db', default=DB_PATH, help='Path to SQLite database')
+    args = parser.parse_args()
+    failed = check(args.db)
+    if failed:
+        print(f'\n{failed} query(s) zonder index')
+        sys.exit(1)
@@ -412,9 +412,7 @@ def run_migration(db_path, dry_run=True, review_path=None):
     # ── Load data ──
     ingredients = conn.execute('''
         SELECT i.id, i.name, i.category,
-               i.ah_product_id, i.ah_product_name, i.ah_product_size,
-               i.ah_product_price, i.ah_product_image, i.ah_product_bonus,
-               i.ah_product_updated, i.ah_product_color,
+               i.ah_product_id,
                COUNT(ri.id) as ri_count
         FROM ingredient i
         LEFT JOIN recipe_ingredient ri ON ri.ingredient_id = i.id
@@ -581,22 +579,15 @@ def run_migration(db_path, dry_run=True, review_path=None):
             conn.execute('DELETE FROM shopping_list_override WHERE ingredient_id = ?', (loser_id,))
 
             # Transfer AH product link if winner doesn't have one
+            # (productgegevens zelf staan in ah_product, gedeeld via ah_product_id)
             winner = conn.execute('SELECT ah_product_id FROM ingredient WHERE id = ?', (winner_id,)).fetchone()
             loser = conn.execute(
-                'SELECT ah_product_id, ah_product_name, ah_product_size, ah_product_price, '
-                'ah_product_image, ah_product_bonus, ah_product_updated, ah_product_color '
-                'FROM ingredient WHERE id = ?', (loser_id,)
+                'SELECT ah_product_id FROM ingredient WHERE id = ?', (loser_id,)
             ).fetchone()
             if not winner['ah_product_id'] and loser and loser['ah_product_id']:
                 conn.execute(
-                    'UPDATE ingredient SET '
-                    'ah_product_id=?, ah_product_name=?, ah_product_size=?, '
-                    'ah_product_price=?, ah_product_image=?, ah_product_bonus=?, '
-                    'ah_product_updated=?, ah_product_color=? '
-                    'WHERE id = ?',
-                    (loser['ah_product_id'], loser['ah_product_name'], loser['ah_product_size'],
-                     loser['ah_product_price'], loser['ah_product_image'], loser['ah_product_bonus'],
-                     loser['ah_product_updated'], loser['ah_product_color'], winner_id)
+                    'UPDATE ingredient SET ah_product_id=? WHERE id = ?',
+                    (loser['ah_product_id'], winner_id)
                 )
                 print(f"    Transferred AH link from id={loser_id} to id={winner_id}")
 
@@ -687,17 +678,9 @@ def run_migration(db_path, dry_run=True, review_path=None):
                 # Transfer AH link
                 if not dupes[0]['ah_product_id'] and loser['ah_product_id']:
                     conn.execute(
-                        'UPDATE ingredient SET ah_product_id = (SELECT ah_product_id FROM ingredient WHERE id = ?), '
-                        'ah_product_name = (SELECT ah_product_name FROM ingredient WHERE id = ?), '
-                        'ah_product_size = (SELECT ah_product_size FROM ingredient WHERE id = ?), '
-                        'ah_product_price = (SELECT ah_product_price FROM ingredient WHERE id = ?), '
-                        'ah_product_image = (SELECT ah_product_image FROM ingredient WHERE id = ?), '
-                        'ah_product_bonus = (SELECT ah_product_bonus FROM ingredient WHERE id = ?), '
-                        'ah_product_updated = (SELECT ah_product_updated FROM ingredient WHERE id = ?), '
-                        'ah_product_color = (SELECT ah_product_color FROM ingredient WHERE id = ?) '
+                        'UPDATE ingredient SET ah_product_id = (SELECT ah_product_id FROM ingredient WHERE id = ?) '
                         'WHERE id = ?',
-                        (loser['id'], loser['id'], loser['id'], loser['id'],
-                         loser['id'], loser['id'], loser['id'], loser['id'], winner_id)
+                        (loser['id'], winner_id)
                     )
                 conn.execute('DELETE FROM ingredient WHERE id = ?', (loser['id'],))
                 print(f"    Resolved collision: merged id={loser['id']} into id={winner_id} for name='{row['name']}'")
@@ -753,6 +736,13 @@ def run_migration(db_path, dry_run=True, review_path=None):
     conn.commit()
     print(f"  Created {alias_count} aliases for {len(remaining)} ingredients")
 
+    # Ingrediënt-id's zijn samengevoegd: boodschappenlijst-cache van de app is ongeldig
+    try:
+        conn.execute('DELETE FROM shopping_list_cache')
+        conn.commit()
+    except sqlite3.OperationalError:
+        pass
+
     # ── Final stats ──
     print("\n=== MIGRATION COMPLETE ===")
     final_count = conn.execute('SELECT COUNT(*) FROM ingredient').fetchone()[0]
@@ -66,6 +66,15 @@ def backup_db(db_path):
     return backup
 
 
+def invalidate_shopping_cache(conn):
+    """Boodschappenlijst-cache van de app leegmaken na schrijf-operaties."""
+    try:
+        conn.execute('DELETE FROM shopping_list_cache')
+        conn.commit()
+    except sqlite3.OperationalError:
+        pass  # oudere DB zonder cache-tabel
+
+
 def get_multi_unit_ingredients(conn):
     """Vind ingrediënten met meerdere genormaliseerde units in recipe_ingredient."""
     rows = conn.execute('''
@@ -553,6 +562,8 @@ def main():
                 print('--dry-run niet ondersteund voor --apply')
                 sys.exit(1)
             cmd_apply(conn, args.apply)
+        if not args.analyze and not args.dry_run:
+            invalidate_shopping_cache(conn)
     finally:
         conn.close()
 
@@ -5,11 +5,15 @@
  * Wij gebruiken:
  *   - window.openDetail(event, id)        om de modal te openen
  *   - window.getActiveDetailRecipe()      om de plan-popup aan de actieve recipe te koppelen
- *   - window.onRecipeFavoriteToggled/Deleted callbacks om onze lokale RECIPES-cache
+ *   - window.onRecipeFavoriteToggled/Deleted callbacks om onze geladen kaarten
  *     synchroon te houden met modal-acties.
+ *
+ * Receptkaarten komen per pagina uit /api/recipes (filters + cursor); de
+ * volgende pagina wordt geladen zodra #recipes-sentinel in beeld scrolt of
+ * de coverflow het einde van de geladen kaarten nadert.
  */
 
-const RECIPES = JSON.parse(document.getElementById('planner-recipes').textContent);
+const PAGE_SIZE = 48;
 const _plannerCfg = JSON.parse(document.getElementById('planner-config').textContent);
 const CURRENT_WEEK   = _plannerCfg.current_week;
 const CURRENT_YEAR   = _plannerCfg.current_year;
@@ -17,7 +21,12 @@ const DEFAULT_SERVES = _plannerCfg.default_serves;
 
 let currentView     = 'grid';
 let currentCookbook = null;
-let filteredRecipes = [...RECIPES];
+let favoritesOnly   = false;
+const filteredRecipes = []; // geladen kaarten voor de huidige filters
+let nextCursor      = '';     // '' = eerste pagina nog laden, null = alles geladen
+let loadingPage     = false;
+let filterSeq       = 0;    // negeer antwoorden van verouderde filters
+let filterTimer     = null;
 let cfIndex         = 0;
 
 function switchView(view) {
@@ -45,20 +54,59 @@ function switchView(view) {
   try { localStorage.setItem('plannerView', view); } catch(e) {}
 }
 
+function recipeQuery(cursor) {
+  const params = new URLSearchParams({ limit: PAGE_SIZE });
+  const q = (document.getElementById('recipe-search').value || '').trim();
+  if (q)               params.set('q', q);
+  if (currentCookbook) params.set('cookbook', currentCookbook);
+  if (favoritesOnly)   params.set('favorites', '1');
+  if (cursor)          params.set('cursor', cursor);
+  return '/api/recipes?' + params.toString();
+}
+
+async function loadNextPage() {
+  if (loadingPage || nextCursor === null) return;
+  loadingPage = true;
+  const seq = filterSeq;
+  try {
+    const resp = await fetch(recipeQuery(nextCursor === '' ? null : nextCursor));
+    const data = await resp.json();
+    if (seq !== filterSeq) return;
+    const added = data.recipes || [];
+    filteredRecipes.push(...added);
+    nextCursor = data.next_cursor || null;
+    appendRendered(added);
+  } catch(e) {
+    console.error('Fout bij laden recepten:', e);
+  } finally {
+    if (seq === filterSeq) loadingPage = false;
+  }
+  if (seq === filterSeq) maybeLoadMore();
+}
+
+// Blijf laden zolang de sentinel nog in beeld is (korte pagina's / grote schermen).
+function maybeLoadMore() {
+  if (nextCursor === null || currentView === 'coverflow') return;
+  const rect = document.getElementById('recipes-sentinel').getBoundingClientRect();
+  if (rect.top < window.innerHeight + 400) loadNextPage();
+}
+
 function applyFilters() {
-  const q     = (document.getElementById('recipe-search').value || '').trim().toLowerCase();
-  const words = q ? q.split(/\s+/) : [];
-  filteredRecipes = RECIPES.filter(r => {
-    const textMatch = !words.length || words.every(w =>
-      [r.name, r.cookbook || '', r.cookbook_abbr || ''].join(' ').toLowerCase().includes(w)
-    );
-    const bookMatch = !currentCookbook || r.cookbook === currentCookbook;
-    return textMatch && bookMatch;
-  });
+  clearTimeout(filterTimer);
+  filterSeq += 1;
+  filteredRecipes.length = 0;
+  nextCursor  = '';
+  loadingPage = false;
   cfIndex = 0;
   if (currentView === 'grid')            renderGrid();
   else if (currentView === 'coverflow')  renderCoverflow();
   else                                   renderList();
+  loadNextPage();
+}
+
+function scheduleFilters() {
+  clearTimeout(filterTimer);
+  filterTimer = setTimeout(applyFilters, 200);
 }
 
 function filterByCookbook(val) {
@@ -66,8 +114,14 @@ function filterByCookbook(val) {
   applyFilters();
 }
 
+function toggleFavoritesFilter() {
+  favoritesOnly = !favoritesOnly;
+  document.getElementById('favorites-filter').classList.toggle('active', favoritesOnly);
+  applyFilters();
+}
+
 function initCookbookFilter() {
-  const books = [...new Set(RECIPES.map(r => r.cookbook).filter(Boolean))].sort();
+  const books = _plannerCfg.cookbooks || [];
   const sel   = document.getElementById('cookbook-filter');
   books.forEach(b => {
     const opt = document.createElement('option');
@@ -77,13 +131,44 @@ function initCookbookFilter() {
   if (books.length <= 1) sel.style.display = 'none';
 }
 
+function emptyMessage(cls) {
+  return nextCursor === null
+    ? `<p class="text-[#6B6B6B] text-sm ${cls}">Geen recepten gevonden.</p>`
+    : '';
+}
+
+// Nieuwe pagina toevoegen aan de actieve view zonder de rest opnieuw te renderen.
+function appendRendered(added) {
+  if (currentView === 'grid') {
+    const container = document.getElementById('view-grid');
+    if (!filteredRecipes.length) { container.innerHTML = emptyMessage('col-span-full'); return; }
+    if (filteredRecipes.length === added.length) container.innerHTML = '';
+    container.insertAdjacentHTML('beforeend', added.map(gridCard).join(''));
+  } else if (currentView === 'list') {
+    const container = document.getElementById('view-list');
+    if (!filteredRecipes.length) { container.innerHTML = emptyMessage(''); return; }
+    if (filteredRecipes.length === added.length) container.innerHTML = '';
+    container.insertAdjacentHTML('beforeend', added.map(listRow).join(''));
+  } else {
+    const track = document.getElementById('coverflow-track');
+    const offset = filteredRecipes.length - added.length;
+    added.forEach((r, i) => track.appendChild(coverflowCard(r, offset + i)));
+    updateCoverflowPositions();
+    updateCoverflowCaption();
+  }
+}
+
 function renderGrid() {
   const container = document.getElementById('view-grid');
   if (!filteredRecipes.length) {
-    container.innerHTML = '<p class="text-[#6B6B6B] text-sm col-span-full">Geen recepten gevonden.</p>';
+    container.innerHTML = emptyMessage('col-span-full');
     return;
   }
-  container.innerHTML = filteredRecipes.map(r => `
+  container.innerHTML = filteredRecipes.map(gridCard).join('');
+}
+
+function gridCard(r) {
+  return `
     <div class="recipe-card-grid" role="button" tabindex="0"
          onclick="openDetail(event, ${r.id})"
          onkeydown="if(event.key==='Enter'||event.key===' '){event.preventDefault();openDetail(null, ${r.id});}">
@@ -105,7 +190,7 @@ function renderGrid() {
               style="position:absolute;top:0.4rem;right:0.5rem;font-size:1.1rem;background:none;border:none;cursor:pointer;padding:0;line-height:1;"
               title="Favoriet">${r.is_favorite ? '\u2B50' : '\u2606'}</button>
     </div>
-  `).join('');
+  `;
 }
 
 const CF_POS = ['cf-pos-m2','cf-pos-m1','cf-pos-0','cf-pos-1','cf-pos-2'];
@@ -113,27 +198,29 @@ const CF_POS = ['cf-pos-m2','cf-pos-m1','cf-pos-0','cf-pos-1','cf-pos-2'];
 function renderCoverflow() {
   const track = document.getElementById('coverflow-track');
   track.innerHTML = '';
-  filteredRecipes.forEach((r, i) => {
-    const div = document.createElement('div');
-    div.className = 'coverflow-card';
-    div.dataset.idx = i;
-    div.innerHTML = r.image_path
-      ? `<img src="/${esc(r.image_path)}" alt="${esc(r.name)}" loading="lazy">`
-      : `<div class="cf-placeholder" style="background:#F5F2ED;">
-           <span style="font-size:4rem;font-weight:800;color:#D4CEC4;">${esc((r.name?.[0] ?? '?').toUpperCase())}</span>
-         </div>`;
-    div.innerHTML += `<div class="cf-label">${esc(r.name)}</div>`;
-    div.addEventListener('click', () => {
-      const offset = i - cfIndex;
-      if (offset === 0) openDetail(null, r.id);
-      else coverflowGoTo(i);
-    });
-    track.appendChild(div);
-  });
+  filteredRecipes.forEach((r, i) => track.appendChild(coverflowCard(r, i)));
   updateCoverflowPositions();
   updateCoverflowCaption();
 }
 
+function coverflowCard(r, i) {
+  const div = document.createElement('div');
+  div.className = 'coverflow-card';
+  div.dataset.idx = i;
+  div.innerHTML = r.image_path
+    ? `<img src="/${esc(r.image_path)}" alt="${esc(r.name)}" loading="lazy">`
+    : `<div class="cf-placeholder" style="background:#F5F2ED;">
+         <span style="font-size:4rem;font-weight:800;color:#D4CEC4;">${esc((r.name?.[0] ?? '?').toUpperCase())}</span>
+       </div>`;
+  div.innerHTML += `<div class="cf-label">${esc(r.name)}</div>`;
+  div.addEventListener('click', () => {
+    const offset = i - cfIndex;
+    if (offset === 0) openDetail(null, r.id);
+    else coverflowGoTo(i);
+  });
+  return div;
+}
+
 function updateCoverflowPositions() {
   const cards = document.querySelectorAll('.coverflow-card');
   cards.forEach(card => {
@@ -170,6 +257,7 @@ function coverflowGoTo(index) {
   cfIndex = Math.max(0, Math.min(index, filteredRecipes.length - 1));
   updateCoverflowPositions();
   updateCoverflowCaption();
+  if (cfIndex >= filteredRecipes.length - 5) loadNextPage();
 }
 function coverflowNext() { coverflowGoTo(cfIndex + 1); }
 function coverflowPrev() { coverflowGoTo(cfIndex - 1); }
@@ -177,10 +265,14 @@ function coverflowPrev() { coverflowGoTo(cfIndex - 1); }
 function renderList() {
   const container = document.getElementById('view-list');
   if (!filteredRecipes.length) {
-    container.innerHTML = '<p class="text-[#6B6B6B] text-sm">Geen recepten gevonden.</p>';
+    container.innerHTML = emptyMessage('');
     return;
   }
-  container.innerHTML = filteredRecipes.map(r => `
+  container.innerHTML = filteredRecipes.map(listRow).join('');
+}
+
+function listRow(r) {
+  return `
     <div class="flex items-center gap-3 p-3 bg-[#F5F2ED] rounded-lg border border-[#E8E4DC] cursor-pointer hover:border-[#C9A882]"
          role="button" tabindex="0"
          onclick="openDetail(event, ${r.id})"
@@ -203,7 +295,7 @@ function renderList() {
               class="text-base ml-1 flex-shrink-0" style="background:none;border:none;cursor:pointer;padding:0;line-height:1;"
               title="Favoriet">${r.is_favorite ? '\u2B50' : '\u2606'}</button>
     </div>
-  `).join('');
+  `;
 }
 
 async function toggleCardFavorite(recipeId, btn) {
@@ -213,7 +305,7 @@ async function toggleCardFavorite(recipeId, btn) {
     });
     const data = await resp.json();
     if (data.status === 'success') {
-      const master = RECIPES.find(x => x.id === recipeId);
+      const master = filteredRecipes.find(x => x.id === recipeId);
       if (master) master.is_favorite = data.is_favorite;
       btn.textContent = data.is_favorite ? '\u2B50' : '\u2606';
       const active = window.getActiveDetailRecipe?.();
@@ -227,9 +319,9 @@ async function toggleCardFavorite(recipeId, btn) {
   }
 }
 
-// Callbacks van de gedeelde modal-module — houden de lokale RECIPES-cache synchroon.
+// Callbacks van de gedeelde modal-module — houden de geladen kaarten synchroon.
 window.onRecipeFavoriteToggled = function (id, isFav) {
-  const master = RECIPES.find(x => x.id === id);
+  const master = filteredRecipes.find(x => x.id === id);
   if (master) master.is_favorite = isFav;
   if (currentView === 'grid') renderGrid();
   else if (currentView === 'list') renderList();
@@ -237,9 +329,12 @@ window.onRecipeFavoriteToggled = function (id, isFav) {
 };
 
 window.onRecipeDeleted = function (id) {
-  const idx = RECIPES.findIndex(x => x.id === id);
-  if (idx !== -1) RECIPES.splice(idx, 1);
-  applyFilters();
+  const idx = filteredRecipes.findIndex(x => x.id === id);
+  if (idx !== -1) filteredRecipes.splice(idx, 1);
+  cfIndex = Math.min(cfIndex, Math.max(filteredRecipes.length - 1, 0));
+  if (currentView === 'grid') renderGrid();
+  else if (currentView === 'list') renderList();
+  else renderCoverflow();
 };
 
 const NL_MONTHS = ['jan','feb','mrt','apr','mei','jun','jul','aug','sep','okt','nov','dec'];
@@ -358,4 +453,8 @@ document.addEventListener('DOMContentLoaded', () => {
   let saved = 'grid';
   try { saved = localStorage.getItem('plannerView') || 'grid'; } catch(e) {}
   switchView(saved);
+  applyFilters();
+  new IntersectionObserver(entries => {
+    if (entries.some(e => e.isIntersecting)) loadNextPage();
+  }, { rootMargin: '400px' }).observe(document.getElementById('recipes-sentinel'));
 });
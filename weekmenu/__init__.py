@@ -3,9 +3,10 @@ import os
 from flask import Flask
 
 from weekmenu.extensions import db
+from weekmenu.storage import install_sqlite_profile, sqlite_pragmas_from_env
 
 
-def create_app():
+def create_app(start_workers=True):
     app = Flask(__name__,
                 template_folder='../templates',
                 static_folder='../static')
@@ -13,6 +14,29 @@ def create_app():
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-only-change-in-production')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:////data/weekmenu.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLITE_PRAGMAS'] = sqlite_pragmas_from_env()
+    # AH-zoekcache: vers binnen TTL, daarna nog STALE seconden direct geserveerd
+    # terwijl op de achtergrond ververst wordt; MAX entries (LRU).
+    app.config['AH_SEARCH_CACHE_TTL'] = int(os.environ.get('AH_SEARCH_CACHE_TTL', 6 * 3600))
+    app.config['AH_SEARCH_CACHE_STALE'] = int(os.environ.get('AH_SEARCH_CACHE_STALE', 48 * 3600))
+    app.config['AH_SEARCH_CACHE_MAX'] = int(os.environ.get('AH_SEARCH_CACHE_MAX', 2000))
+    # URL-import-wachtrij: aantal worker-threads en max. gelijktijdige jobs per domein
+    app.config['SCRAPE_WORKERS'] = int(os.environ.get('SCRAPE_WORKERS', 3))
+    app.config['SCRAPE_PER_DOMAIN'] = int(os.environ.get('SCRAPE_PER_DOMAIN', 2))
+    # Scrape-cache: opgehaalde pagina's TTL seconden hergebruiken, max. MAX_MB in totaal (LRU)
+    app.config['SCRAPE_CACHE_TTL'] = int(os.environ.get('SCRAPE_CACHE_TTL', 30 * 24 * 3600))
+    app.config['SCRAPE_CACHE_MAX_MB'] = int(os.environ.get('SCRAPE_CACHE_MAX_MB', 64))
+    # LLM-provider: gemini | record | replay (zie services/llm.py), plus optionele kunstmatige latency
+    app.config['LLM_PROVIDER'] = os.environ.get('LLM_PROVIDER', 'gemini')
+    app.config['LLM_FIXTURES_DIR'] = os.environ.get('LLM_FIXTURES_DIR', '/data/llm_fixtures')
+    app.config['LLM_LATENCY_MS'] = None
+    if os.environ.get('LLM_LATENCY_MS'):
+        from weekmenu.services.llm import _parse_latency
+        try:
+            app.config['LLM_LATENCY_MS'] = _parse_latency(os.environ['LLM_LATENCY_MS'])
+        except ValueError:
+            app.logger.warning('LLM_LATENCY_MS=%r genegeerd: verwacht bv. 800 of 500-1500',
+                               os.environ['LLM_LATENCY_MS'])
 
     db.init_app(app)
 
@@ -20,8 +44,17 @@ def create_app():
     register_blueprints(app)
 
     with app.app_context():
+        install_sqlite_profile(db.engine, app.config['SQLITE_PRAGMAS'])
         db.create_all()
         from weekmenu.migrations import migrate_db
         migrate_db()
+        # Aggregatieregels kunnen per versie wijzigen: cache altijd vers opbouwen
+        from weekmenu.services.shopping import invalidate_shopping_cache
+        invalidate_shopping_cache()
+        db.session.commit()
+        if start_workers:
+            # Wachtrij hervatten: 'running' jobs opnieuw inplannen, workers starten
+            from weekmenu.services.scrape_jobs import start_scrape_workers
+            start_scrape_workers()
 
     return app
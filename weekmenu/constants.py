@@ -225,6 +225,7 @@ _AH_ANON_TOKEN_URL   = 'https://api.ah.nl/mobile-auth/v1/auth/token/anonymous'
 _AH_TOKEN_URL        = 'https://api.ah.nl/mobile-auth/v1/auth/token'
 _AH_REFRESH_URL      = 'https://api.ah.nl/mobile-auth/v1/auth/token/refresh'
 _AH_SEARCH_URL       = 'https://api.ah.nl/mobile-services/product/search/v2'
+_AH_PRODUCT_URL      = 'https://api.ah.nl/mobile-services/product/detail/v4/fir/{product_id}'
 _AH_SHOPPINGLIST_URL = 'https://api.ah.nl/mobile-services/shoppinglist/v2/items'
 _AH_ORDER_ACTIVE_URL = 'https://api.ah.nl/mobile-services/order/v1/summaries/active?sortBy=DEFAULT'
 _AH_ORDER_ITEMS_URL  = 'https://api.ah.nl/mobile-services/order/v1/items?sortBy=DEFAULT'
@@ -2,7 +2,7 @@ from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
 
 from weekmenu.extensions import db
-from weekmenu.services.units import _parse_product_size, _guess_ingredient_category
+from weekmenu.services.units import _parse_product_size, _guess_ingredient_category, price_per_unit
 
 
 def _migrate_v1(conn):
@@ -215,6 +215,190 @@ def _migrate_v6(conn):
             conn.execute(text(f'ALTER TABLE ingredient ADD COLUMN {col} {col_def}'))
 
 
+_CATALOG_TRIGGERS = [
+    # (tabel, event) — UPDATE OF alleen op kolommen die in de recepten-payload zitten,
+    # zodat usage_count/last_used (bij elke planning) of AH-velden niet invalideren.
+    ('recipe', 'INSERT'),
+    ('recipe', 'DELETE'),
+    ('recipe', 'UPDATE OF name, serves, cookbook_id, page, image_path, is_favorite, url, instructions'),
+    ('recipe_ingredient', 'INSERT'),
+    ('recipe_ingredient', 'DELETE'),
+    ('recipe_ingredient', 'UPDATE'),
+    ('ingredient', 'DELETE'),
+    ('ingredient', 'UPDATE OF name, display_name, category'),
+    ('cookbook', 'DELETE'),
+    ('cookbook', 'UPDATE OF name, abbreviation'),
+]
+
+
+def _migrate_v7(conn):
+    """Catalogusversie: triggers hogen settings.catalog_version op bij elke receptwijziging."""
+    conn.execute(text(
+        "INSERT OR IGNORE INTO settings (key, value) VALUES ('catalog_version', '0')"
+    ))
+    for table, event in _CATALOG_TRIGGERS:
+        name = f"trg_catalog_{table}_{event.split()[0].lower()}"
+        conn.execute(text(f'''
+            CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}
+            BEGIN
+                UPDATE settings SET value = CAST(value AS INTEGER) + 1
+                WHERE key = 'catalog_version';
+            END
+        '''))
+
+
+_SECONDARY_INDEXES = [
+    # (naam, tabel, kolommen) — shopping_list_exclusion/override hebben al een
+    # UNIQUE (year, week_number, ingredient_id) die als week-index dient.
+    ('ix_menu_item_week', 'menu_item', 'year, week_number'),
+    ('ix_menu_item_recipe', 'menu_item', 'recipe_id'),
+    ('ix_quick_add_item_week', 'quick_add_item', 'year, week_number'),
+    ('ix_quick_add_item_recipe', 'quick_add_item', 'recipe_id'),
+    ('ix_custom_shopping_ingredient_week', 'custom_shopping_ingredient', 'year, week_number'),
+    ('ix_recipe_ingredient_recipe', 'recipe_ingredient', 'recipe_id'),
+    ('ix_recipe_ingredient_ingredient', 'recipe_ingredient', 'ingredient_id, recipe_id'),
+    # LIKE is in SQLite hoofdletterongevoelig: alleen een NOCASE-index bedient 'abc%'
+    ('ix_ingredient_alias_alias_nocase', 'ingredient_alias', 'alias COLLATE NOCASE'),
+    ('ix_recipe_last_used', 'recipe', 'last_used'),
+    ('ix_recipe_usage_count', 'recipe', 'usage_count'),
+]
+
+
+def _migrate_v8(conn):
+    """Secundaire indexen voor week-queries, FK-kolommen en de recent/populair-lijsten."""
+    for name, table, columns in _SECONDARY_INDEXES:
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})'))
+
+
+_LEGACY_AH_COLUMNS = [
+    'ah_product_name', 'ah_product_size', 'ah_product_price', 'ah_product_image',
+    'ah_product_bonus', 'ah_product_updated', 'ah_product_color',
+    'ah_product_was_price', 'ah_product_bonus_mechanism', 'ah_product_brand',
+    'ah_product_category',
+]
+
+
+def _migrate_v9(conn):
+    """AH-catalogus: productgegevens van ingredient naar ah_product.
+
+    Ingredient houdt alleen ah_product_id (+ eigen verpakkings-/conversie-
+    instellingen); de gedupliceerde ah_product_*-kolommen verdwijnen.
+    """
+    from weekmenu.services.ah import _is_organic, _parse_price
+    conn.execute(text('''
+        CREATE TABLE IF NOT EXISTS ah_product (
+            webshop_id INTEGER PRIMARY KEY,
+            title VARCHAR(200) NOT NULL DEFAULT '',
+            brand VARCHAR(100),
+            category VARCHAR(100),
+            size VARCHAR(50),
+            pkg_qty FLOAT,
+            pkg_unit VARCHAR(20),
+            price FLOAT,
+            was_price FLOAT,
+            is_bonus BOOLEAN NOT NULL DEFAULT 0,
+            bonus_mechanism VARCHAR(100),
+            price_per_unit FLOAT,
+            price_unit VARCHAR(10),
+            is_organic BOOLEAN NOT NULL DEFAULT 0,
+            image VARCHAR(500),
+            bg_color VARCHAR(20),
+            last_seen INTEGER
+        )
+    '''))
+    ing_cols = [row[1] for row in conn.execute(text('PRAGMA table_info(ingredient)')).fetchall()]
+    if 'ah_product_name' not in ing_cols:
+        return
+
+    # Meerdere ingrediënten kunnen hetzelfde product delen: meest recente wint
+    rows = conn.execute(text('''
+        SELECT ah_product_id, ah_product_name, ah_product_size, ah_product_price,
+               ah_product_was_price, ah_product_image, ah_product_bonus,
+               ah_product_bonus_mechanism, ah_product_brand, ah_product_category,
+               ah_product_color, ah_product_updated
+        FROM ingredient WHERE ah_product_id IS NOT NULL
+        ORDER BY COALESCE(ah_product_updated, 0) DESC
+    ''')).fetchall()
+    for (pid, title, size, price, was_price, image, bonus, mechanism,
+         brand, category, color, updated) in rows:
+        price = _parse_price(price)
+        parsed = _parse_product_size(size or '')
+        pu = price_per_unit(price, size or '')
+        conn.execute(text('''
+            INSERT OR IGNORE INTO ah_product
+                (webshop_id, title, brand, category, size, pkg_qty, pkg_unit,
+                 price, was_price, is_bonus, bonus_mechanism, price_per_unit,
+                 price_unit, is_organic, image, bg_color, last_seen)
+            VALUES (:pid, :title, :brand, :category, :size, :pkg_qty, :pkg_unit,
+                    :price, :was_price, :is_bonus, :mechanism, :ppu,
+                    :ppu_unit, :is_organic, :image, :color, :updated)
+        '''), {
+            'pid': pid, 'title': title or '', 'brand': brand, 'category': category,
+            'size': size, 'pkg_qty': parsed[0] if parsed else None,
+            'pkg_unit': parsed[1] if parsed else None,
+            'price': price, 'was_price': _parse_price(was_price),
+            'is_bonus': bool(bonus), 'mechanism': mechanism,
+            'ppu': round(pu[0], 4) if pu else None, 'ppu_unit': pu[1] if pu else None,
+            'is_organic': _is_organic(title, brand), 'image': image,
+            'color': color, 'updated': updated,
+        })
+
+    for col in _LEGACY_AH_COLUMNS:
+        if col in ing_cols:
+            try:
+                conn.execute(text(f'ALTER TABLE ingredient DROP COLUMN {col}'))
+            except OperationalError:
+                pass  # SQLite < 3.35: kolom blijft staan maar wordt niet meer gebruikt
+
+
+def _migrate_v10(conn):
+    """Bulk-URL-import: batch-, domein- en uitkomstkolommen op scrape_job."""
+    job_cols = [row[1] for row in conn.execute(text('PRAGMA table_info(scrape_job)')).fetchall()]
+    for col, col_def in [
+        ('domain',    'VARCHAR(200)'),
+        ('batch_id',  'INTEGER REFERENCES scrape_batch(id)'),
+        ('outcome',   'VARCHAR(10)'),
+        ('recipe_id', 'INTEGER'),
+    ]:
+        if col not in job_cols:
+            conn.execute(text(f'ALTER TABLE scrape_job ADD COLUMN {col} {col_def}'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_scrape_job_batch_id ON scrape_job (batch_id)'))
+
+
+def _migrate_v11(conn):
+    """Conversieversie: triggers hogen settings.conversion_version op bij elke conversiewijziging."""
+    conn.execute(text(
+        "INSERT OR IGNORE INTO settings (key, value) VALUES ('conversion_version', '0')"
+    ))
+    for event in ('INSERT', 'DELETE', 'UPDATE'):
+        conn.execute(text(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_conversion_{event.lower()}
+            AFTER {event} ON ingredient_unit_conversion
+            BEGIN
+                UPDATE settings SET value = CAST(value AS INTEGER) + 1
+                WHERE key = 'conversion_version';
+            END
+        '''))
+
+
+_FK_ORPHAN_CLEANUP = [
+    # Rijen die zonder FK-handhaving naar verwijderde ouders konden wijzen
+    'DELETE FROM menu_item WHERE recipe_id IS NOT NULL AND recipe_id NOT IN (SELECT id FROM recipe)',
+    'DELETE FROM quick_add_item WHERE recipe_id NOT IN (SELECT id FROM recipe)',
+    'DELETE FROM recipe_ingredient WHERE recipe_id NOT IN (SELECT id FROM recipe)',
+    'UPDATE recipe SET cookbook_id = NULL '
+    'WHERE cookbook_id IS NOT NULL AND cookbook_id NOT IN (SELECT id FROM cookbook)',
+    'UPDATE scrape_batch SET cookbook_id = NULL '
+    'WHERE cookbook_id IS NOT NULL AND cookbook_id NOT IN (SELECT id FROM cookbook)',
+]
+
+
+def _migrate_v12(conn):
+    """Foreign keys gaan aan (storage.py): ruim eerst verweesde rijen op."""
+    for statement in _FK_ORPHAN_CLEANUP:
+        conn.execute(text(statement))
+
+
 def migrate_db():
     with db.engine.connect() as conn:
         conn.execute(text('''
@@ -242,8 +426,20 @@ def migrate_db():
             _migrate_v5(conn)
         if current < 6:
             _migrate_v6(conn)
-
-        target = 6
+        if current < 7:
+            _migrate_v7(conn)
+        if current < 8:
+            _migrate_v8(conn)
+        if current < 9:
+            _migrate_v9(conn)
+        if current < 10:
+            _migrate_v10(conn)
+        if current < 11:
+            _migrate_v11(conn)
+        if current < 12:
+            _migrate_v12(conn)
+
+        target = 12
         if current < target:
             if row:
                 conn.execute(
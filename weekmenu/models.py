@@ -2,6 +2,21 @@ from datetime import datetime
 from weekmenu.extensions import db
 
 
+def _format_price(value):
+    return f"{value:.2f}".replace('.', ',') if value else ''
+
+
+def _ah_field(attr, fmt=None):
+    """Read-only Ingredient-property die een veld van het gekoppelde AhProduct leest."""
+    def getter(self):
+        product = self.ah_product
+        if product is None:
+            return None
+        value = getattr(product, attr)
+        return fmt(value) if fmt else value
+    return property(getter)
+
+
 class Recipe(db.Model):
     __tablename__ = 'recipe'
     id = db.Column(db.Integer, primary_key=True)
@@ -25,23 +40,30 @@ class Ingredient(db.Model):
     name = db.Column(db.String(100), nullable=False, unique=True)
     display_name = db.Column(db.String(100), nullable=False, default='')
     category = db.Column(db.String(50), nullable=False)
-    ah_product_id      = db.Column(db.Integer, nullable=True)
-    ah_product_name    = db.Column(db.String(200), nullable=True)
-    ah_product_size    = db.Column(db.String(50), nullable=True)
-    ah_product_price   = db.Column(db.String(20), nullable=True)
-    ah_product_image   = db.Column(db.String(500), nullable=True)
-    ah_product_bonus   = db.Column(db.Boolean, default=False)
-    ah_product_updated = db.Column(db.Integer, nullable=True)
-    ah_product_color   = db.Column(db.String(20), nullable=True)
-    ah_product_was_price       = db.Column(db.String(20), nullable=True)
-    ah_product_bonus_mechanism = db.Column(db.String(100), nullable=True)
-    ah_product_brand           = db.Column(db.String(100), nullable=True)
-    ah_product_category        = db.Column(db.String(100), nullable=True)
+    ah_product_id      = db.Column(db.Integer, nullable=True)  # → ah_product.webshop_id
     ah_pkg_qty         = db.Column(db.Float, nullable=True)
     ah_pkg_unit        = db.Column(db.String(20), nullable=True)
     ah_conv_factor     = db.Column(db.Float, nullable=True)
     ah_conv_unit       = db.Column(db.String(20), nullable=True)
     preferred_unit     = db.Column(db.String(20), nullable=True)
+    ah_product = db.relationship(
+        'AhProduct', lazy='joined', viewonly=True,
+        primaryjoin='foreign(Ingredient.ah_product_id) == AhProduct.webshop_id',
+    )
+
+    # Productgegevens staan in de AH-catalogus; deze read-only velden houden
+    # de oude ah_product_*-namen voor templates en JSON-responses.
+    ah_product_name            = _ah_field('title')
+    ah_product_size            = _ah_field('size')
+    ah_product_price           = _ah_field('price', _format_price)
+    ah_product_was_price       = _ah_field('was_price', _format_price)
+    ah_product_image           = _ah_field('image')
+    ah_product_bonus           = _ah_field('is_bonus')
+    ah_product_bonus_mechanism = _ah_field('bonus_mechanism')
+    ah_product_brand           = _ah_field('brand')
+    ah_product_category        = _ah_field('category')
+    ah_product_color           = _ah_field('bg_color')
+    ah_product_updated         = _ah_field('last_seen')
 
     @property
     def display(self):
@@ -161,3 +183,122 @@ class ShoppingListExclusion(db.Model):
     year          = db.Column(db.Integer, nullable=False)
     week_number   = db.Column(db.Integer, nullable=False)
     ingredient_id = db.Column(db.Integer, db.ForeignKey('ingredient.id'), nullable=False)
+
+
+class ShoppingListCache(db.Model):
+    __tablename__ = 'shopping_list_cache'
+    __table_args__ = (
+        db.UniqueConstraint('year', 'week_number', name='uq_shopping_cache_week'),
+    )
+    id          = db.Column(db.Integer, primary_key=True)
+    year        = db.Column(db.Integer, nullable=False)
+    week_number = db.Column(db.Integer, nullable=False)
+    items       = db.Column(db.Text, nullable=False)
+
+
+class AhSearchCache(db.Model):
+    __tablename__ = 'ah_search_cache'
+    __table_args__ = (
+        db.UniqueConstraint('term', 'size', name='uq_ah_search_cache_term'),
+    )
+    id         = db.Column(db.Integer, primary_key=True)
+    term       = db.Column(db.String(200), nullable=False)
+    size       = db.Column(db.Integer, nullable=False)
+    products   = db.Column(db.Text, nullable=False)
+    fetched_at = db.Column(db.Integer, nullable=False)
+    last_hit   = db.Column(db.Integer, nullable=False, index=True)
+    hits       = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AhProduct(db.Model):
+    """Lokale AH-catalogus, geüpsert vanuit elke zoekopdracht."""
+    __tablename__ = 'ah_product'
+    webshop_id      = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    title           = db.Column(db.String(200), nullable=False, default='')
+    brand           = db.Column(db.String(100), nullable=True)
+    category        = db.Column(db.String(100), nullable=True)
+    size            = db.Column(db.String(50), nullable=True)
+    pkg_qty         = db.Column(db.Float, nullable=True)
+    pkg_unit        = db.Column(db.String(20), nullable=True)
+    price           = db.Column(db.Float, nullable=True)
+    was_price       = db.Column(db.Float, nullable=True)  # alleen bij een echte afprijzing
+    is_bonus        = db.Column(db.Boolean, default=False, nullable=False)
+    bonus_mechanism = db.Column(db.String(100), nullable=True)
+    price_per_unit  = db.Column(db.Float, nullable=True)
+    price_unit      = db.Column(db.String(10), nullable=True)
+    is_organic      = db.Column(db.Boolean, default=False, nullable=False)
+    image           = db.Column(db.String(500), nullable=True)
+    bg_color        = db.Column(db.String(20), nullable=True)
+    last_seen       = db.Column(db.Integer, nullable=True)
+
+    def to_search_dict(self):
+        """Zelfde vorm als een resultaat van ah_search_products."""
+        unit_price_label = (
+            f"€{self.price_per_unit:.2f}/{self.price_unit}".replace('.', ',')
+            if self.price_per_unit else ''
+        )
+        return {
+            'productId':      self.webshop_id,
+            'title':          self.title,
+            'size':           self.size or '',
+            'price':          _format_price(self.price),
+            'wasPrice':       _format_price(self.was_price),
+            'isBonus':        bool(self.is_bonus),
+            'bonusMechanism': self.bonus_mechanism or '',
+            'brand':          self.brand or '',
+            'category':       self.category or '',
+            'unitPrice':      self.price_per_unit,
+            'unitPriceUnit':  self.price_unit or '',
+            'unitPriceLabel': unit_price_label,
+            'isOrganic':      bool(self.is_organic),
+            'image':          self.image or '',
+            'bgColor':        self.bg_color or '',
+        }
+
+
+class ScrapeJob(db.Model):
+    """Wachtrij voor URL-imports; verwerkt door de scrape-workers."""
+    __tablename__ = 'scrape_job'
+    __table_args__ = (
+        db.Index('ix_scrape_job_state', 'state', 'id'),
+    )
+    id          = db.Column(db.Integer, primary_key=True)
+    url         = db.Column(db.String(2000), nullable=False)
+    domain      = db.Column(db.String(200), nullable=True)
+    state       = db.Column(db.String(10), nullable=False, default='queued')  # queued | running | done | failed
+    http_status = db.Column(db.Integer, nullable=True)
+    result      = db.Column(db.Text, nullable=True)  # JSON-payload zoals /recipe/scrape die teruggaf
+    created_at  = db.Column(db.Integer, nullable=False)
+    started_at  = db.Column(db.Integer, nullable=True)
+    finished_at = db.Column(db.Integer, nullable=True)
+    # Alleen bij bulk-import: batch, en na verwerking de uitkomst + het recept
+    batch_id    = db.Column(db.Integer, db.ForeignKey('scrape_batch.id'), nullable=True, index=True)
+    outcome     = db.Column(db.String(10), nullable=True)  # imported | duplicate | error
+    recipe_id   = db.Column(db.Integer, nullable=True)
+
+
+class ScrapeBatch(db.Model):
+    """Eén bulk-URL-import; de voortgang per URL staat in de ScrapeJobs."""
+    __tablename__ = 'scrape_batch'
+    id          = db.Column(db.Integer, primary_key=True)
+    cookbook_id = db.Column(db.Integer, db.ForeignKey('cookbook.id'), nullable=True)  # None = kookboek per site
+    created_at  = db.Column(db.Integer, nullable=False)
+
+
+class ScrapeCachePage(db.Model):
+    """Genormaliseerde URL → hash van de laatst opgehaalde HTML."""
+    __tablename__ = 'scrape_cache_page'
+    url_key      = db.Column(db.String(2000), primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False, index=True)
+    fetched_at   = db.Column(db.Integer, nullable=False)
+
+
+class ScrapeCacheBlob(db.Model):
+    """Eén opgehaalde pagina, op inhoud geadresseerd (sha256 van de HTML)."""
+    __tablename__ = 'scrape_cache_blob'
+    content_hash = db.Column(db.String(64), primary_key=True)
+    html         = db.Column(db.LargeBinary, nullable=False)  # zlib
+    clean_text   = db.Column(db.Text, nullable=True)          # _clean_html-uitvoer, pas bij LLM-fallback
+    recipe       = db.Column(db.Text, nullable=True)          # JSON-payload van een geslaagde parse
+    size         = db.Column(db.Integer, nullable=False)      # bytes, voor de eviction
+    last_hit     = db.Column(db.Integer, nullable=False, index=True)
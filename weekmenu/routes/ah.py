@@ -2,15 +2,19 @@ import json as _json
 import os
 import time
 
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, Response, request, jsonify, render_template, stream_with_context
 
 from weekmenu.extensions import db
-from weekmenu.models import Ingredient, Settings
-from weekmenu.constants import _AH_TOKEN_URL, _AH_HEADERS, _AH_CLIENT_ID
+from weekmenu.models import Ingredient, AhProduct
+from weekmenu.constants import _AH_TOKEN_URL, _AH_CLIENT_ID
 from weekmenu.services.ah import (
     _ah_setting, ah_get_access_token, ah_search_products,
     ah_login_with_password, ah_price_advice,
+    ah_search_cache_stats, clear_ah_search_cache, upsert_ah_products,
+    set_ah_user_tokens, clear_ah_user_tokens,
 )
+from weekmenu.services.ah_client import ah_request, ah_http_metrics
+from weekmenu.services.settings import get_setting
 from weekmenu.services.units import _parse_product_size, _calc_ah_qty
 
 bp = Blueprint('ah', __name__)
@@ -18,25 +22,18 @@ bp = Blueprint('ah', __name__)
 
 @bp.route('/api/ah/connect', methods=['POST'])
 def ah_connect():
-    import requests as _req
     from weekmenu.services.ah import _ah_extract_code
     raw = (request.json or {}).get('code', '').strip()
     code = _ah_extract_code(raw)
     if not code:
         return jsonify({'status': 'error', 'message': 'Geen code opgegeven'}), 400
     try:
-        resp = _req.post(
-            _AH_TOKEN_URL,
-            json={'clientId': _AH_CLIENT_ID, 'code': code},
-            headers=_AH_HEADERS,
-            timeout=10,
-        )
+        resp = ah_request('POST', _AH_TOKEN_URL, 'token',
+                          json={'clientId': _AH_CLIENT_ID, 'code': code})
         resp.raise_for_status()
         data = resp.json()
-        _ah_setting('ah_access_token', data['access_token'])
-        _ah_setting('ah_refresh_token', data['refresh_token'])
         expires_at = int(time.time()) + data.get('expires_in', 604798)
-        _ah_setting('ah_token_expires', str(expires_at))
+        set_ah_user_tokens(data['access_token'], data['refresh_token'], expires_at)
         return jsonify({'status': 'ok', 'expires_at': expires_at})
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Koppelen mislukt: {e}'}), 400
@@ -44,10 +41,9 @@ def ah_connect():
 
 @bp.route('/api/ah/status')
 def ah_status():
-    refresh = _ah_setting('ah_refresh_token')
-    expires = _ah_setting('ah_token_expires')
+    refresh = get_setting('ah_refresh_token')
+    expires_ts = get_setting('ah_token_expires')
     connected = bool(refresh)
-    expires_ts = int(expires) if expires else None
     return jsonify({
         'connected': connected,
         'expires_at': expires_ts,
@@ -57,11 +53,7 @@ def ah_status():
 
 @bp.route('/api/ah/disconnect', methods=['POST'])
 def ah_disconnect():
-    for key in ('ah_access_token', 'ah_refresh_token', 'ah_token_expires'):
-        s = Settings.query.filter_by(key=key).first()
-        if s:
-            db.session.delete(s)
-    db.session.commit()
+    clear_ah_user_tokens()
     return jsonify({'status': 'ok'})
 
 
@@ -86,9 +78,7 @@ def ah_poll_token():
         expires = data.get('expires_at', int(time.time()) + 604798)
         if not access or not refresh:
             return jsonify({'ready': False})
-        _ah_setting('ah_access_token', access)
-        _ah_setting('ah_refresh_token', refresh)
-        _ah_setting('ah_token_expires', str(expires))
+        set_ah_user_tokens(access, refresh, expires)
         os.remove(token_file)
         return jsonify({'ready': True})
     except Exception as e:
@@ -107,9 +97,7 @@ def ah_login_password():
         _ah_setting('capsolver_key', capsolver_key)
     try:
         access, refresh, expires = ah_login_with_password(email, password, capsolver_key or None)
-        _ah_setting('ah_access_token', access)
-        _ah_setting('ah_refresh_token', refresh)
-        _ah_setting('ah_token_expires', str(expires))
+        set_ah_user_tokens(access, refresh, expires)
         return jsonify({'status': 'ok'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 401
@@ -117,10 +105,8 @@ def ah_login_password():
 
 @bp.route('/api/ah/verify')
 def ah_verify():
-    import requests as _req
     from weekmenu.constants import _AH_GRAPHQL_URL
-    token = ah_get_access_token()
-    if not token:
+    if not ah_get_access_token():
         return jsonify({'ok': False, 'reason': 'Geen token opgeslagen'})
     # AH heeft member-info verplaatst van de REST-route
     # (mobile-services/v1/member/profile → 404) naar GraphQL.
@@ -129,12 +115,8 @@ def ah_verify():
         'name { first last } } }'
     )
     try:
-        r = _req.post(
-            _AH_GRAPHQL_URL,
-            json={'query': query},
-            headers={**_AH_HEADERS, 'Authorization': f'Bearer {token}'},
-            timeout=8,
-        )
+        r = ah_request('POST', _AH_GRAPHQL_URL, 'graphql', auth='user',
+                       json={'query': query}, timeout=8)
         if r.status_code != 200:
             return jsonify({'ok': False, 'reason': f'HTTP {r.status_code}'})
         body = r.json()
@@ -168,6 +150,54 @@ def ah_advice():
     return jsonify(ah_price_advice(q))
 
 
+@bp.route('/api/ah/advice/week/<int:year>/<int:week>')
+def ah_advice_week(year, week):
+    """Prijsadvies voor de hele boodschappenlijst, als NDJSON gestreamd.
+
+    Eén regel per ingrediënt zodra de zoekactie klaar is (zonder de volledige
+    productlijst, tenzij ?full=1), afgesloten met {"done": true, "count": n}.
+    Is AH niet bereikbaar, dan volgt een 502 vóór de stream; een fout halverwege
+    eindigt in {"done": true, "error": ...}.
+    """
+    from weekmenu.services.ah import ah_price_advice_many, _ah_get_anon_token
+    from weekmenu.services.shopping import get_shopping_dict, _ingredient_map
+    full = request.args.get('full') == '1'
+    ingredients = _ingredient_map(get_shopping_dict(year, week))
+    queries = {ing_id: ing.display for ing_id, ing in ingredients.items()}
+    if queries:
+        try:
+            _ah_get_anon_token()
+        except Exception as e:
+            return jsonify({'status': 'error', 'message': f'AH niet bereikbaar: {e}'}), 502
+
+    def generate():
+        count = 0
+        try:
+            for ing_id, advice in ah_price_advice_many(queries):
+                if not full:
+                    advice = {k: v for k, v in advice.items() if k != 'products'}
+                count += 1
+                yield _json.dumps({'ingredientId': ing_id, 'name': queries[ing_id], **advice}) + '\n'
+        except Exception as e:
+            yield _json.dumps({'done': True, 'count': count, 'error': str(e)}) + '\n'
+            return
+        yield _json.dumps({'done': True, 'count': count}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@bp.route('/api/ah/http-metrics')
+def ah_http_metrics_view():
+    return jsonify(ah_http_metrics())
+
+
+@bp.route('/api/ah/search-cache', methods=['GET', 'DELETE'])
+def ah_search_cache():
+    if request.method == 'DELETE':
+        clear_ah_search_cache()
+    return jsonify(ah_search_cache_stats())
+
+
 # ── AH winkelmand (order-commandocentrum) ────────────────────────────────
 
 @bp.route('/ah-winkelmand')
@@ -186,7 +216,7 @@ def ah_orders():
 @bp.route('/api/ah/order/<int:order_id>')
 def ah_order_detail(order_id):
     from weekmenu.services.ah import ah_get_order
-    from weekmenu.services.shopping import _build_shopping_dict
+    from weekmenu.services.shopping import get_shopping_dict, _ingredient_map
     order = ah_get_order(order_id)
     if order is None:
         return jsonify({'error': 'Order niet bereikbaar'}), 502
@@ -197,8 +227,10 @@ def ah_order_detail(order_id):
     if week and year:
         in_order = set(order['productIds'])
         seen = set()
-        for (ing_id, unit), amount in _build_shopping_dict(year, week).items():
-            ing = Ingredient.query.get(ing_id)
+        shopping_dict = get_shopping_dict(year, week)
+        ingredients = _ingredient_map(shopping_dict)
+        for (ing_id, unit), amount in shopping_dict.items():
+            ing = ingredients.get(ing_id)
             if not ing:
                 continue
             if not ing.ah_product_id:
@@ -249,22 +281,18 @@ def ah_order_apply(order_id):
 def ah_link_ingredient(ingredient_id):
     data = request.json or {}
     ing = Ingredient.query.get_or_404(ingredient_id)
+    product_id = data.get('productId')
+    if not product_id:
+        return jsonify({'status': 'error', 'message': 'Geen product opgegeven'}), 400
+    product = AhProduct.query.get(int(product_id))
+    if product is None:
+        # Zoekresultaat van vóór de catalogus (of een gelockte DB bij de upsert)
+        upsert_ah_products([data])
+        product = AhProduct.query.get(int(product_id))
     old_product_id = ing.ah_product_id
-    ing.ah_product_id = data.get('productId')
-    ing.ah_product_name = data.get('title', '')
-    ing.ah_product_size = data.get('size', '')
-    ing.ah_product_price = data.get('price', '')
-    ing.ah_product_image = data.get('image', '')
-    ing.ah_product_bonus = bool(data.get('isBonus', False))
-    ing.ah_product_color = data.get('bgColor', '')
-    ing.ah_product_was_price = data.get('wasPrice', '')
-    ing.ah_product_bonus_mechanism = data.get('bonusMechanism', '')
-    ing.ah_product_brand = data.get('brand', '')
-    ing.ah_product_category = data.get('category', '')
-    ing.ah_product_updated = int(time.time())
-    parsed = _parse_product_size(data.get('size', ''))
-    if parsed:
-        ing.ah_pkg_qty, ing.ah_pkg_unit = parsed
+    ing.ah_product_id = int(product_id)
+    if product and product.pkg_qty:
+        ing.ah_pkg_qty, ing.ah_pkg_unit = product.pkg_qty, product.pkg_unit
     else:
         ing.ah_pkg_qty = None
         ing.ah_pkg_unit = None
@@ -280,20 +308,12 @@ def ah_refresh_ingredient(ingredient_id):
     ing = Ingredient.query.get_or_404(ingredient_id)
     if not ing.ah_product_id:
         return jsonify({'status': 'error', 'message': 'Geen product gekoppeld'}), 400
-    products = ah_search_products(ing.name, size=1)
-    if not products:
-        return jsonify({'status': 'error', 'message': 'Geen resultaten'}), 404
-    p = products[0]
-    ing.ah_product_name = p['title']
-    ing.ah_product_size = p['size']
-    ing.ah_product_price = p['price']
-    ing.ah_product_image = p['image']
-    ing.ah_product_bonus = p['isBonus']
-    ing.ah_product_was_price = p.get('wasPrice', '')
-    ing.ah_product_bonus_mechanism = p.get('bonusMechanism', '')
-    ing.ah_product_brand = p.get('brand', '')
-    ing.ah_product_category = p.get('category', '')
-    ing.ah_product_updated = int(time.time())
+    # Zoek op de producttitel: dan staat het gekoppelde product vrijwel altijd
+    # bovenaan. De upsert in ah_search_products werkt de catalogus bij.
+    products = ah_search_products(ing.ah_product_name or ing.name, size=10, fresh=True)
+    p = next((p for p in products if p['productId'] == ing.ah_product_id), None)
+    if p is None:
+        return jsonify({'status': 'error', 'message': 'Gekoppeld product niet gevonden'}), 404
     parsed = _parse_product_size(p['size'])
     if parsed:
         ing.ah_pkg_qty, ing.ah_pkg_unit = parsed
@@ -301,6 +321,15 @@ def ah_refresh_ingredient(ingredient_id):
     return jsonify({'status': 'ok', 'product': p})
 
 
+@bp.route('/api/ah/refresh-all', methods=['GET', 'POST'])
+def ah_refresh_all():
+    from weekmenu.services.ah_refresh import start_ah_refresh, ah_refresh_status
+    if request.method == 'GET':
+        return jsonify(ah_refresh_status())
+    started, status = start_ah_refresh()
+    return jsonify(status), (202 if started else 409)
+
+
 @bp.route('/api/ah/ingredient/<int:ingredient_id>/pkg-config', methods=['POST'])
 def ah_pkg_config(ingredient_id):
     data = request.get_json(force=True) or {}
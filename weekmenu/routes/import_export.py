@@ -1,290 +1,158 @@
 import io
 import json
 import os
+import shutil
 import zipfile
-from datetime import datetime, date
+from datetime import date
 
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 
 from weekmenu.extensions import db
-from weekmenu.models import Cookbook, Recipe, RecipeIngredient, Ingredient
-from weekmenu.services.recipes import _resolve_or_create_ingredient
-from weekmenu.services.units import _normalize_ri_unit
+from weekmenu.models import Cookbook
+from weekmenu.services.backup_export import export_json_chunks, export_zip_chunks
+from weekmenu.services.backup_import import iter_backup_items, import_backup_batches
+from weekmenu.services.bulk_import import (
+    MAX_BULK_URLS, parse_url_list, enqueue_bulk_import, bulk_import_status,
+)
+from weekmenu.services.scrape_jobs import start_scrape_workers
 
 bp = Blueprint('import_export', __name__)
 
 
 @bp.route('/export')
 def export_data():
-    cookbooks = Cookbook.query.order_by(Cookbook.name).all()
-    recipes = Recipe.query.order_by(Recipe.name).all()
+    filename = f"weekmenu_export_{date.today().strftime('%Y%m%d')}.json"
+    return _download(export_json_chunks(), 'application/json', filename)
 
-    data = {
-        'version': 1,
-        'exported_at': datetime.now().isoformat(),
-        'cookbooks': [
-            {'name': c.name, 'abbreviation': c.abbreviation}
-            for c in cookbooks
-        ],
-        'recipes': [
-            {
-                'name': r.name,
-                'serves': r.serves,
-                'cookbook': r.cookbook.name if r.cookbook else None,
-                'page': r.page,
-                'is_favorite': r.is_favorite,
-                'url': r.url,
-                'instructions': r.instructions,
-                'ingredients': [
-                    {
-                        'name': ri.ingredient.display,
-                        'category': ri.ingredient.category,
-                        'amount': ri.amount,
-                        'unit': ri.unit,
-                        'preparation': ri.preparation or '',
-                    }
-                    for ri in r.ingredients
-                ]
-            }
-            for r in recipes
-        ]
-    }
 
-    buf = io.BytesIO(json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
-    buf.seek(0)
-    filename = f"weekmenu_export_{date.today().strftime('%Y%m%d')}.json"
-    return send_file(buf, mimetype='application/json', as_attachment=True, download_name=filename)
+def _download(chunks, mimetype, filename):
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 
 @bp.route('/import', methods=['POST'])
 def import_data():
-    try:
-        file = request.files.get('file')
-        if not file:
-            return jsonify({'status': 'error', 'message': 'Geen bestand geselecteerd'}), 400
-
-        data = json.loads(file.read().decode('utf-8'))
-        counts = {'cookbooks': 0, 'recipes': 0, 'ingredients': 0}
-
-        for cb_data in data.get('cookbooks', []):
-            if not Cookbook.query.filter_by(name=cb_data['name']).first():
-                db.session.add(Cookbook(
-                    name=cb_data['name'],
-                    abbreviation=cb_data.get('abbreviation')
-                ))
-                counts['cookbooks'] += 1
-        db.session.commit()
-
-        for r_data in data.get('recipes', []):
-            if Recipe.query.filter_by(name=r_data['name']).first():
-                continue
-
-            cookbook = Cookbook.query.filter_by(name=r_data['cookbook']).first() if r_data.get('cookbook') else None
-            recipe = Recipe(
-                name=r_data['name'],
-                serves=r_data.get('serves', 4),
-                cookbook_id=cookbook.id if cookbook else None,
-                page=r_data.get('page'),
-                is_favorite=r_data.get('is_favorite', False),
-                url=r_data.get('url'),
-                instructions=r_data.get('instructions')
-            )
-            db.session.add(recipe)
-            db.session.flush()
-
-            for ing_data in r_data.get('ingredients', []):
-                ingredient = _resolve_or_create_ingredient(
-                    ing_data['name'],
-                    ing_data.get('category', 'Overig')
-                )
-                if not ingredient:
-                    continue
-                counts['ingredients'] += 1
-
-                raw_amount = ing_data.get('amount', 0)
-                norm_unit, norm_amount = _normalize_ri_unit(ingredient, ing_data.get('unit', ''), raw_amount)
-                db.session.add(RecipeIngredient(
-                    recipe_id=recipe.id,
-                    ingredient_id=ingredient.id,
-                    amount=norm_amount,
-                    unit=norm_unit,
-                    preparation=ing_data.get('preparation'),
-                ))
-
-            counts['recipes'] += 1
+    file = request.files.get('file')
+    if not file:
+        return jsonify({'status': 'error', 'message': 'Geen bestand geselecteerd'}), 400
+
+    def run(commit):
+        items = iter_backup_items(io.TextIOWrapper(file.stream, encoding='utf-8'))
+        yield from import_backup_batches(items, commit=commit)
+
+    return _import_response(run, lambda counts: (
+        f"{counts['cookbooks']} kookboeken, {counts['recipes']} recepten en "
+        f"{counts['ingredients']} ingrediënten geïmporteerd."))
+
+
+def _import_response(run, message):
+    """Voer `run(commit)` (een generator met tussentellers) uit als import.
+
+    Standaard is de import één transactie met één JSON-antwoord. Met
+    ?stream=1 wordt na elke batch recepten gecommit en komt er per batch een
+    NDJSON-regel met de tellers, afgesloten met {"done": true, "status", "message"};
+    een afgebroken import kan gewoon opnieuw, bestaande recepten worden overgeslagen.
+    """
+    if request.args.get('stream') != '1':
+        try:
+            for counts in run(False):
+                pass
+            db.session.commit()
+            return jsonify({'status': 'success', 'message': message(counts)})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    def generate():
+        try:
+            for counts in run(True):
+                yield json.dumps(counts) + '\n'
+            db.session.commit()
+            yield json.dumps({'done': True, 'status': 'success', 'message': message(counts)}) + '\n'
+        except Exception as e:
+            db.session.rollback()
+            yield json.dumps({'done': True, 'status': 'error', 'message': str(e)}) + '\n'
 
-        db.session.commit()
-        return jsonify({
-            'status': 'success',
-            'message': f"{counts['cookbooks']} kookboeken, {counts['recipes']} recepten en {counts['ingredients']} ingrediënten geïmporteerd."
-        })
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
 @bp.route('/export/zip')
 def export_zip():
-    cookbooks = Cookbook.query.order_by(Cookbook.name).all()
-    recipes = Recipe.query.order_by(Recipe.name).all()
-
-    data = {
-        'version': 2,
-        'exported_at': datetime.now().isoformat(),
-        'cookbooks': [
-            {
-                'name': c.name,
-                'abbreviation': c.abbreviation,
-                'image_filename': os.path.basename(c.image_path) if c.image_path else None,
-                'is_archived': c.is_archived,
-            }
-            for c in cookbooks
-        ],
-        'recipes': [
-            {
-                'name': r.name,
-                'serves': r.serves,
-                'cookbook': r.cookbook.name if r.cookbook else None,
-                'page': r.page,
-                'is_favorite': r.is_favorite,
-                'url': r.url,
-                'instructions': r.instructions,
-                'image_filename': os.path.basename(r.image_path) if r.image_path else None,
-                'ingredients': [
-                    {
-                        'name': ri.ingredient.name,
-                        'category': ri.ingredient.category,
-                        'amount': ri.amount,
-                        'unit': ri.unit,
-                    }
-                    for ri in r.ingredients
-                ],
-            }
-            for r in recipes
-        ],
-    }
-
-    buf = io.BytesIO()
     uploads_dir = os.path.join(current_app.root_path, 'static', 'uploads')
-    image_filenames = set()
-    for c in cookbooks:
-        if c.image_path:
-            image_filenames.add(os.path.basename(c.image_path))
-    for r in recipes:
-        if r.image_path:
-            image_filenames.add(os.path.basename(r.image_path))
+    filename = f"weekmenu_export_{date.today().strftime('%Y%m%d')}.zip"
+    return _download(export_zip_chunks(uploads_dir), 'application/zip', filename)
 
-    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr('weekmenu_export.json', json.dumps(data, ensure_ascii=False, indent=2))
-        for fname in image_filenames:
-            full_path = os.path.join(uploads_dir, fname)
-            if os.path.isfile(full_path):
-                zf.write(full_path, arcname=os.path.join('images', fname))
 
-    buf.seek(0)
-    filename = f"weekmenu_export_{date.today().strftime('%Y%m%d')}.zip"
-    return send_file(buf, mimetype='application/zip', as_attachment=True, download_name=filename)
+def _uploaded_image_path(fname):
+    candidate = os.path.join('static', 'uploads', fname)
+    if os.path.isfile(os.path.join(current_app.root_path, candidate)):
+        return candidate
+    return None
 
 
 @bp.route('/import/zip', methods=['POST'])
 def import_zip():
-    try:
-        file = request.files.get('file')
-        if not file:
-            return jsonify({'status': 'error', 'message': 'Geen bestand geselecteerd'}), 400
-
-        buf = io.BytesIO(file.read())
-        if not zipfile.is_zipfile(buf):
-            return jsonify({'status': 'error', 'message': 'Ongeldig ZIP-bestand'}), 400
-
-        buf.seek(0)
-        counts = {'cookbooks': 0, 'recipes': 0, 'ingredients': 0, 'images': 0}
-        uploads_dir = os.path.join(current_app.root_path, 'static', 'uploads')
-        os.makedirs(uploads_dir, exist_ok=True)
-
-        with zipfile.ZipFile(buf, 'r') as zf:
-            if 'weekmenu_export.json' not in zf.namelist():
-                return jsonify({'status': 'error', 'message': 'weekmenu_export.json niet gevonden in ZIP'}), 400
-
-            data = json.loads(zf.read('weekmenu_export.json').decode('utf-8'))
-
-            for entry in zf.namelist():
-                if entry.startswith('images/') and not entry.endswith('/'):
-                    fname = os.path.basename(entry)
-                    dest = os.path.join(uploads_dir, fname)
-                    if not os.path.exists(dest):
-                        with open(dest, 'wb') as f:
-                            f.write(zf.read(entry))
-                        counts['images'] += 1
-
-            for cb_data in data.get('cookbooks', []):
-                if not Cookbook.query.filter_by(name=cb_data['name']).first():
-                    image_path = None
-                    if cb_data.get('image_filename'):
-                        candidate = os.path.join('static', 'uploads', cb_data['image_filename'])
-                        if os.path.isfile(os.path.join(current_app.root_path, candidate)):
-                            image_path = candidate
-                    db.session.add(Cookbook(
-                        name=cb_data['name'],
-                        abbreviation=cb_data.get('abbreviation'),
-                        image_path=image_path,
-                        is_archived=cb_data.get('is_archived', False),
-                    ))
-                    counts['cookbooks'] += 1
-            db.session.commit()
-
-            for r_data in data.get('recipes', []):
-                if Recipe.query.filter_by(name=r_data['name']).first():
-                    continue
-
-                cookbook = (Cookbook.query.filter_by(name=r_data['cookbook']).first()
-                            if r_data.get('cookbook') else None)
-
-                image_path = None
-                if r_data.get('image_filename'):
-                    candidate = os.path.join('static', 'uploads', r_data['image_filename'])
-                    if os.path.isfile(os.path.join(current_app.root_path, candidate)):
-                        image_path = candidate
-
-                recipe = Recipe(
-                    name=r_data['name'],
-                    serves=r_data.get('serves'),
-                    cookbook_id=cookbook.id if cookbook else None,
-                    page=r_data.get('page'),
-                    is_favorite=r_data.get('is_favorite', False),
-                    url=r_data.get('url'),
-                    instructions=r_data.get('instructions'),
-                    image_path=image_path,
-                )
-                db.session.add(recipe)
-                db.session.flush()
-
-                for ing_data in r_data.get('ingredients', []):
-                    ingredient = Ingredient.query.filter_by(name=ing_data['name']).first()
-                    if not ingredient:
-                        ingredient = Ingredient(
-                            name=ing_data['name'],
-                            category=ing_data.get('category', 'Overig'),
-                        )
-                        db.session.add(ingredient)
-                        db.session.flush()
-                        counts['ingredients'] += 1
-                    raw_amount = ing_data.get('amount') or 0
-                    norm_unit, norm_amount = _normalize_ri_unit(ingredient, ing_data.get('unit', ''), raw_amount)
-                    db.session.add(RecipeIngredient(
-                        recipe_id=recipe.id,
-                        ingredient_id=ingredient.id,
-                        amount=norm_amount,
-                        unit=norm_unit,
-                    ))
-                counts['recipes'] += 1
-
-        db.session.commit()
-        return jsonify({
-            'status': 'success',
-            'message': (f"{counts['cookbooks']} kookboeken, {counts['recipes']} recepten, "
-                        f"{counts['ingredients']} ingrediënten en {counts['images']} afbeeldingen geïmporteerd.")
-        })
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'status': 'error', 'message': str(e)}), 400
+    file = request.files.get('file')
+    if not file:
+        return jsonify({'status': 'error', 'message': 'Geen bestand geselecteerd'}), 400
+
+    # Werkzeug spoolt grote uploads naar een tijdelijk bestand; de ZIP wordt
+    # daaruit per member gelezen in plaats van in een BytesIO.
+    if not zipfile.is_zipfile(file.stream):
+        return jsonify({'status': 'error', 'message': 'Ongeldig ZIP-bestand'}), 400
+    zf = zipfile.ZipFile(file.stream, 'r')
+    if 'weekmenu_export.json' not in zf.namelist():
+        zf.close()
+        return jsonify({'status': 'error', 'message': 'weekmenu_export.json niet gevonden in ZIP'}), 400
+
+    def run(commit):
+        with zf:
+            images = _extract_images(zf, os.path.join(current_app.root_path, 'static', 'uploads'))
+            with zf.open('weekmenu_export.json') as member:
+                items = iter_backup_items(io.TextIOWrapper(member, encoding='utf-8'))
+                for counts in import_backup_batches(items, zip_format=True,
+                                                    image_path_for=_uploaded_image_path, commit=commit):
+                    yield dict(counts, images=images)
+
+    return _import_response(run, lambda counts: (
+        f"{counts['cookbooks']} kookboeken, {counts['recipes']} recepten, "
+        f"{counts['ingredients']} ingrediënten en {counts['images']} afbeeldingen geïmporteerd."))
+
+
+def _extract_images(zf, uploads_dir):
+    """Pak images/* uit naar de uploads-map (bestaande bestanden blijven). Returns het aantal."""
+    os.makedirs(uploads_dir, exist_ok=True)
+    count = 0
+    for entry in zf.namelist():
+        if entry.startswith('images/') and not entry.endswith('/'):
+            dest = os.path.join(uploads_dir, os.path.basename(entry))
+            if not os.path.exists(dest):
+                with zf.open(entry) as src, open(dest, 'wb') as f:
+                    shutil.copyfileobj(src, f)
+                count += 1
+    return count
+
+
+@bp.route('/import/urls', methods=['POST'])
+def import_urls():
+    """Bulk-import van recept-URL's; poll daarna /import/urls/<batch_id>."""
+    data = request.get_json() or {}
+    urls = parse_url_list(data.get('urls'))
+    if not urls:
+        return jsonify({'status': 'error', 'message': "Geen geldige URL's opgegeven"}), 400
+    if len(urls) > MAX_BULK_URLS:
+        return jsonify({'status': 'error',
+                        'message': f"Maximaal {MAX_BULK_URLS} URL's per keer"}), 400
+    cookbook_id = data.get('cookbook_id') or None
+    if cookbook_id and not Cookbook.query.get(cookbook_id):
+        return jsonify({'status': 'error', 'message': 'Kookboek niet gevonden'}), 400
+    return jsonify({'status': 'queued', **enqueue_bulk_import(urls, cookbook_id)}), 202
+
+
+@bp.route('/import/urls/<int:batch_id>')
+def import_urls_status(batch_id):
+    start_scrape_workers()  # no-op als ze al draaien
+    status = bulk_import_status(batch_id)
+    if status is None:
+        return jsonify({'status': 'error', 'message': 'Import niet gevonden'}), 404
+    return jsonify(status)
@@ -2,7 +2,7 @@ from flask import Blueprint, render_template, request
 
 from weekmenu.constants import MONTH_NAMES_NL
 from weekmenu.services.seasons import current_month, resolve_seasonal_ingredients
-from weekmenu.services.recipe_matcher import score_recipes
+from weekmenu.services.recipe_matcher import score_recipes, DEFAULT_MATCH_LIMIT
 
 
 bp = Blueprint('inspiratie', __name__)
@@ -23,7 +23,11 @@ def inspiratie():
         ctx.update(
             month_name=MONTH_NAMES_NL[month - 1],
             items=items,
-            recipes=score_recipes(boost_ids, source='season'),
+            recipes=score_recipes(
+                boost_ids, source='season',
+                limit=request.args.get('limit', DEFAULT_MATCH_LIMIT, type=int),
+                offset=request.args.get('offset', 0, type=int),
+            ),
         )
 
     return render_template('inspiratie.html', **ctx)
@@ -4,11 +4,13 @@ from datetime import date
 from flask import Blueprint, render_template, request, jsonify
 
 from weekmenu.extensions import db
-from weekmenu.models import MenuItem, Recipe, Settings, QuickAddItem
+from weekmenu.models import MenuItem, Recipe, QuickAddItem
 from weekmenu.constants import DAYS, MEAL_TYPES
 from weekmenu.services.menu import (
     plan_recipe, update_week_menu, clear_week, clear_shopping_list,
 )
+from weekmenu.services.shopping import invalidate_shopping_cache
+from weekmenu.services.settings import get_setting
 
 bp = Blueprint('menu', __name__)
 
@@ -18,8 +20,7 @@ def week_menu(year, week):
     menu_items = MenuItem.query.filter_by(week_number=week, year=year).all()
     recipes = Recipe.query.order_by(Recipe.name).all()
     recipes_json = json.dumps([{'id': r.id, 'name': r.name, 'serves': r.serves} for r in recipes])
-    default_serves_setting = Settings.query.filter_by(key='default_serves').first()
-    default_serves = int(default_serves_setting.value) if default_serves_setting and default_serves_setting.value else None
+    default_serves = get_setting('default_serves')
     return render_template('week_menu.html',
                          menu_items=menu_items,
                          recipes=recipes,
@@ -106,7 +107,11 @@ def save_quick_add():
             year=year
         ).delete()
 
+        known_ids = {rid for (rid,) in db.session.query(Recipe.id)
+                     .filter(Recipe.id.in_({int(item['recipe_id']) for item in items}))}
         for item in items:
+            if int(item['recipe_id']) not in known_ids:
+                continue  # intussen verwijderd recept
             quick_item = QuickAddItem(
                 recipe_id=item['recipe_id'],
                 people_count=item['people_count'],
@@ -115,6 +120,7 @@ def save_quick_add():
             )
             db.session.add(quick_item)
 
+        invalidate_shopping_cache(year, week)
         db.session.commit()
         return jsonify({'status': 'success'})
     except Exception as e:
@@ -134,6 +140,7 @@ def clear_quick_add():
             year=year
         ).delete()
 
+        invalidate_shopping_cache(year, week)
         db.session.commit()
         return jsonify({'status': 'success'})
     except Exception as e:
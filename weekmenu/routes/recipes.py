@@ -10,7 +10,7 @@ from flask import (
 from weekmenu.extensions import db
 from weekmenu.models import (
     Recipe, Ingredient, IngredientAlias, Cookbook,
-    RecipeIngredient, Settings, PantryIngredient,
+    RecipeIngredient, PantryIngredient, MenuItem, QuickAddItem, ScrapeBatch,
 )
 from weekmenu.constants import PRODUCT_CATEGORIES
 from weekmenu.services.units import (
@@ -18,42 +18,22 @@ from weekmenu.services.units import (
 )
 from weekmenu.services.recipes import (
     _resolve_or_create_ingredient, _download_site_logo,
+    serialize_recipe, search_recipes, recipes_page_etag,
 )
-from weekmenu.services.gemini import scrape_recipe_from_url, recipe_from_photos
-from weekmenu.services.recipe_matcher import score_recipes
+from weekmenu.services.gemini import recipe_from_photos
+from weekmenu.services.scrape_jobs import enqueue_scrape, scrape_job_status, start_scrape_workers
+from weekmenu.services.scrape_cache import scrape_cache_stats, clear_scrape_cache
+from weekmenu.services.recipe_matcher import score_recipes, DEFAULT_MATCH_LIMIT
+from weekmenu.services.settings import get_setting
 from weekmenu.services.pantry import list_pantry, add_to_pantry, remove_from_pantry
+from weekmenu.services.shopping import (
+    invalidate_shopping_cache, invalidate_shopping_cache_for_recipe,
+)
 
 
 bp = Blueprint('recipes', __name__)
 
 
-def serialize_recipe(r, default_serves=4):
-    """Volledige recept-payload voor detail-modal en receptenplanner-cache."""
-    return {
-        'id': r.id,
-        'name': r.name,
-        'serves': r.serves or default_serves,
-        'image_path': r.image_path or '',
-        'cookbook': r.cookbook.name if r.cookbook else None,
-        'cookbook_abbr': r.cookbook.abbreviation if r.cookbook else None,
-        'page': r.page,
-        'url': r.url or '',
-        'instructions': r.instructions or '',
-        'is_favorite': r.is_favorite,
-        'ingredients': [
-            {
-                'id': ri.id,
-                'name': ri.ingredient.display,
-                'amount': ri.amount,
-                'unit': ri.unit,
-                'category': ri.ingredient.category,
-                'preparation': ri.preparation or '',
-            }
-            for ri in r.ingredients
-        ],
-    }
-
-
 @bp.route('/recipes')
 def recipes():
     return redirect(url_for('recipes.receptenplanner'))
@@ -62,31 +42,57 @@ def recipes():
 @bp.route('/receptenplanner')
 def receptenplanner():
     from datetime import date
-    recipes = Recipe.query.order_by(Recipe.name).all()
     today = date.today()
     current_week = today.isocalendar()[1]
     current_year = today.year
 
-    default_serves_setting = Settings.query.filter_by(key='default_serves').first()
-    default_serves = int(default_serves_setting.value) if default_serves_setting and default_serves_setting.value else 4
+    default_serves = get_setting('default_serves', 4)
 
-    recipes_json = json.dumps(
-        [serialize_recipe(r, default_serves) for r in recipes],
-        ensure_ascii=False,
-    )
+    cookbooks = [name for (name,) in (
+        db.session.query(Cookbook.name)
+        .join(Recipe, Recipe.cookbook_id == Cookbook.id)
+        .distinct()
+        .order_by(Cookbook.name)
+    )]
 
     return render_template('receptenplanner.html',
-                           recipes_json=recipes_json,
+                           cookbooks=cookbooks,
                            current_week=current_week,
                            current_year=current_year,
                            default_serves=default_serves)
 
 
+@bp.route('/api/recipes')
+def api_recipes():
+    """Gepagineerde receptkaarten: ?q=&cookbook=&favorites=1&ingredient_id=&cursor=&limit=
+
+    Met sterke ETag: zolang de catalogus niet wijzigt, krijgt de browser een 304.
+    """
+    default_serves = get_setting('default_serves', 4)
+    etag = recipes_page_etag(request.args, default_serves)
+    if etag in request.if_none_match:
+        resp = current_app.response_class(mimetype='application/json')
+    else:
+        limit = max(1, min(request.args.get('limit', 48, type=int), 200))
+        recipes, next_cursor = search_recipes(
+            q=request.args.get('q', '').strip(),
+            cookbook=request.args.get('cookbook') or None,
+            favorites=request.args.get('favorites') in ('1', 'true'),
+            ingredient_id=request.args.get('ingredient_id', type=int),
+            cursor=request.args.get('cursor') or None,
+            limit=limit,
+            default_serves=default_serves,
+        )
+        resp = jsonify({'recipes': recipes, 'next_cursor': next_cursor})
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp.make_conditional(request)
+
+
 @bp.route('/api/recipe/<int:id>')
 def api_recipe_detail(id):
     recipe = Recipe.query.get_or_404(id)
-    default_serves_setting = Settings.query.filter_by(key='default_serves').first()
-    default_serves = int(default_serves_setting.value) if default_serves_setting and default_serves_setting.value else 4
+    default_serves = get_setting('default_serves', 4)
     return jsonify(serialize_recipe(recipe, default_serves))
 
 
@@ -216,6 +222,8 @@ def delete_cookbook(id):
             os.remove(os.path.join(current_app.static_folder, 'uploads', os.path.basename(cookbook.image_path)))
         except OSError:
             pass
+    # Bulk-imports naar dit kookboek vallen terug op een kookboek per site
+    ScrapeBatch.query.filter_by(cookbook_id=cookbook.id).update({'cookbook_id': None})
     db.session.delete(cookbook)
     db.session.commit()
     return jsonify({'status': 'success'})
@@ -371,6 +379,7 @@ def edit_recipe(id):
             recipe.image_path = os.path.join('static/uploads', fname)
 
         RecipeIngredient.query.filter_by(recipe_id=recipe.id).delete()
+        invalidate_shopping_cache_for_recipe(recipe.id)
 
         ingredient_ids = request.form.getlist('ingredient_id[]')
         ingredient_names = request.form.getlist('ingredient[]')
@@ -409,14 +418,19 @@ def edit_recipe(id):
         # Scope-gebonden pantry-sync: alleen ingrediënten van dit recept aanraken
         scope_ids         = set(int(x) for x in request.form.getlist('ingredient_id[]') if x)
         checked_pantry_ids = set(int(x) for x in request.form.getlist('pantry[]'))
+        pantry_changed = False
         for ing_id in scope_ids:
             exists = PantryIngredient.query.filter_by(ingredient_id=ing_id).first()
             if ing_id in checked_pantry_ids:
                 if not exists:
                     db.session.add(PantryIngredient(ingredient_id=ing_id))
+                    pantry_changed = True
             else:
                 if exists:
                     db.session.delete(exists)
+                    pantry_changed = True
+        if pantry_changed:
+            invalidate_shopping_cache()
         db.session.commit()
 
         return redirect(url_for('recipes.receptenplanner'))
@@ -429,6 +443,10 @@ def edit_recipe(id):
 @bp.route('/recipe/<int:id>', methods=['DELETE'])
 def delete_recipe(id):
     recipe = Recipe.query.get_or_404(id)
+    invalidate_shopping_cache_for_recipe(recipe.id)
+    # Foreign keys worden gehandhaafd: eerst de planningen van dit recept weg
+    MenuItem.query.filter_by(recipe_id=recipe.id).delete()
+    QuickAddItem.query.filter_by(recipe_id=recipe.id).delete()
     db.session.delete(recipe)
     db.session.commit()
     return jsonify({'status': 'success'})
@@ -555,9 +573,29 @@ def get_quick_access_recipes():
 
 @bp.route('/recipe/scrape', methods=['POST'])
 def scrape_recipe():
+    """Plan een URL-import in; poll daarna /recipe/scrape/<job_id>."""
     data = request.get_json() or {}
-    payload, status = scrape_recipe_from_url(data.get('url', ''))
-    return jsonify(payload), status
+    url = (data.get('url') or '').strip()
+    if not url:
+        return jsonify({'status': 'error', 'message': 'Geen URL opgegeven'}), 400
+    job = enqueue_scrape(url)
+    return jsonify({'status': 'queued', **job}), 202
+
+
+@bp.route('/recipe/scrape/<int:job_id>')
+def scrape_recipe_job(job_id):
+    start_scrape_workers()  # no-op als ze al draaien
+    job = scrape_job_status(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Import-job niet gevonden'}), 404
+    return jsonify(job)
+
+
+@bp.route('/api/scrape-cache', methods=['GET', 'DELETE'])
+def scrape_cache():
+    if request.method == 'DELETE':
+        clear_scrape_cache()
+    return jsonify(scrape_cache_stats())
 
 
 @bp.route('/recipe/from-photo', methods=['POST'])
@@ -577,8 +615,14 @@ def ecobooster():
 
 @bp.route('/api/ecobooster/match', methods=['POST'])
 def ecobooster_match():
-    fresh_ids = request.json.get('ingredient_ids', []) if request.json else []
-    return jsonify(score_recipes(fresh_ids, source='ecobooster'))
+    data = request.get_json(silent=True) or {}
+    fresh_ids = data.get('ingredient_ids', [])
+    try:
+        limit = int(data.get('limit', request.args.get('limit', DEFAULT_MATCH_LIMIT)))
+        offset = int(data.get('offset', request.args.get('offset', 0)))
+    except (ValueError, TypeError):
+        return jsonify({'status': 'error', 'message': 'limit/offset moeten gehele getallen zijn'}), 400
+    return jsonify(score_recipes(fresh_ids, source='ecobooster', limit=limit, offset=offset))
 
 
 # ── Pantry API ───────────────────────────────────────────────────────────────
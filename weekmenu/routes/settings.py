@@ -1,11 +1,12 @@
 import time
 
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, current_app
 
 from weekmenu.extensions import db
-from weekmenu.models import Recipe, Cookbook, Ingredient, Settings
-from weekmenu.services.ah import _ah_setting
-from weekmenu.services.gemini import _get_gemini_api_key
+from weekmenu.models import Recipe, Cookbook, Ingredient
+from weekmenu.services.llm import get_llm
+from weekmenu.services.settings import get_setting, set_setting
+from weekmenu.storage import effective_sqlite_pragmas
 
 bp = Blueprint('settings', __name__)
 
@@ -14,16 +15,7 @@ bp = Blueprint('settings', __name__)
 def settings_page():
     if request.method == 'POST':
         default_serves_raw = request.form.get('default_serves', '').strip()
-        setting = Settings.query.filter_by(key='default_serves').first()
-        if default_serves_raw:
-            if setting:
-                setting.value = default_serves_raw
-            else:
-                db.session.add(Settings(key='default_serves', value=default_serves_raw))
-        else:
-            if setting:
-                db.session.delete(setting)
-        db.session.commit()
+        set_setting('default_serves', default_serves_raw or None)
         flash('Instellingen opgeslagen')
         return redirect(url_for('settings.settings_page'))
 
@@ -32,26 +24,24 @@ def settings_page():
         'cookbooks': Cookbook.query.count(),
         'ingredients': Ingredient.query.count(),
     }
-    default_serves_setting = Settings.query.filter_by(key='default_serves').first()
-    default_serves = int(default_serves_setting.value) if default_serves_setting and default_serves_setting.value else None
-    ah_refresh = _ah_setting('ah_refresh_token')
-    ah_expires = _ah_setting('ah_token_expires')
+    default_serves = get_setting('default_serves')
+    ah_refresh = get_setting('ah_refresh_token')
+    ah_expires = get_setting('ah_token_expires')
     ah_connected = bool(ah_refresh)
     ah_expires_dt = None
     if ah_expires:
         import datetime as _dt
-        ah_expires_dt = _dt.datetime.fromtimestamp(int(ah_expires)).strftime('%d %b %Y')
+        ah_expires_dt = _dt.datetime.fromtimestamp(ah_expires).strftime('%d %b %Y')
+    pragmas = effective_sqlite_pragmas(db.session, current_app.config.get('SQLITE_PRAGMAS', {}))
     return render_template('settings.html', stats=stats, default_serves=default_serves,
-                           ah_connected=ah_connected, ah_expires_dt=ah_expires_dt)
+                           ah_connected=ah_connected, ah_expires_dt=ah_expires_dt,
+                           pragmas=pragmas)
 
 
 @bp.route('/api/gemini/key', methods=['POST', 'DELETE'])
 def gemini_key():
     if request.method == 'DELETE':
-        setting = Settings.query.filter_by(key='gemini_api_key').first()
-        if setting:
-            db.session.delete(setting)
-            db.session.commit()
+        set_setting('gemini_api_key', None)
         return jsonify({'status': 'ok'})
 
     data = request.get_json() or {}
@@ -59,17 +49,11 @@ def gemini_key():
     if not api_key:
         return jsonify({'status': 'error', 'message': 'Geen API key opgegeven'}), 400
 
-    setting = Settings.query.filter_by(key='gemini_api_key').first()
-    if setting:
-        setting.value = api_key
-    else:
-        setting = Settings(key='gemini_api_key', value=api_key)
-        db.session.add(setting)
-    db.session.commit()
+    set_setting('gemini_api_key', api_key)
     return jsonify({'status': 'ok'})
 
 
 @bp.route('/api/gemini/status')
 def gemini_status():
-    configured = bool(_get_gemini_api_key())
+    configured = get_llm() is not None
     return jsonify({'configured': configured})
@@ -7,14 +7,17 @@ from weekmenu.models import (
 )
 from weekmenu.constants import (
     CATEGORY_ORDER_SUPERMARKET, CATEGORY_BG,
-    _AH_HEADERS, _AH_SHOPPINGLIST_URL,
+    _AH_SHOPPINGLIST_URL,
+)
+from weekmenu.services.shopping import (
+    get_shopping_dict, invalidate_shopping_cache, _ingredient_map,
 )
-from weekmenu.services.shopping import _build_shopping_dict
 from weekmenu.services.units import (
     _calc_ah_qty, _calc_multiplier, _norm_unit,
     format_amount, _normalize_ri_unit,
 )
 from weekmenu.services.ah import ah_get_access_token
+from weekmenu.services.ah_client import ah_request
 from weekmenu.services.menu import clear_shopping_list as _clear_shopping_list
 
 bp = Blueprint('shopping', __name__)
@@ -22,7 +25,7 @@ bp = Blueprint('shopping', __name__)
 
 @bp.route('/shopping-list/<int:year>/<int:week>')
 def shopping_list(year, week):
-    shopping_dict = _build_shopping_dict(year, week)
+    shopping_dict = get_shopping_dict(year, week)
 
     # Tijdelijke quick-add items uit URL-parameters (sessie-only)
     recipe_ids = request.args.getlist('recipe_id')
@@ -41,9 +44,10 @@ def shopping_list(year, week):
         for o in ShoppingListOverride.query.filter_by(year=year, week_number=week).all()
     }
 
+    ingredients = _ingredient_map(shopping_dict)
     items = []
     for (ing_id, unit), total_amount in shopping_dict.items():
-        ing = Ingredient.query.get(ing_id)
+        ing = ingredients.get(ing_id)
         if not ing:
             continue
         default_qty = _calc_ah_qty(ing, total_amount, unit)
@@ -137,6 +141,7 @@ def exclude_shopping_item(year, week, ingredient_id):
         db.session.add(ShoppingListExclusion(
             year=year, week_number=week, ingredient_id=ingredient_id
         ))
+        invalidate_shopping_cache(year, week)
         db.session.commit()
     return jsonify({'status': 'ok'})
 
@@ -171,6 +176,7 @@ def add_shopping_item(year, week):
             ingredient_id=ingredient_id,
             amount=amount, unit=unit
         ))
+    invalidate_shopping_cache(year, week)
     db.session.commit()
 
     return jsonify({
@@ -194,30 +200,29 @@ def add_shopping_item(year, week):
 
 @bp.route('/api/shopping-list/<int:year>/<int:week>/send-to-ah', methods=['POST'])
 def send_to_ah(year, week):
-    import requests as _req
     from collections import defaultdict
     from weekmenu.constants import _AH_ORDER_ACTIVE_URL, _AH_ORDER_ITEMS_URL
 
-    access_token = ah_get_access_token()
-    if not access_token:
+    if not ah_get_access_token():
         return jsonify({'status': 'error', 'message': 'Geen AH-account gekoppeld. Ga naar Instellingen.'}), 401
 
-    shopping_dict = _build_shopping_dict(year, week)
+    shopping_dict = get_shopping_dict(year, week)
     if not shopping_dict:
         return jsonify({'status': 'ok', 'sent': 0, 'not_linked': [], 'message': 'Boodschappenlijst is leeg'})
 
     _body = request.get_json(force=True) or {}
     qty_overrides = {int(k): v for k, v in _body.get('qty_overrides', {}).items()}
 
-    headers = {**_AH_HEADERS, 'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'}
+    headers = {'Content-Type': 'application/json'}
 
     # Verzamel gekoppelde producten, samengevoegd per AH-productId
     # (de AH-API weigert dubbele productId's in één request).
     merged = defaultdict(int)
     name_by_pid = {}
     not_linked = []
+    ingredients = _ingredient_map(shopping_dict)
     for (ing_id, unit), amount in shopping_dict.items():
-        ing = Ingredient.query.get(ing_id)
+        ing = ingredients.get(ing_id)
         if not ing:
             continue
         if not ing.ah_product_id:
@@ -238,7 +243,7 @@ def send_to_ah(year, week):
     # naar de order zelf — met de Appie-Current-Order-Id header.
     order_id = None
     try:
-        r = _req.get(_AH_ORDER_ACTIVE_URL, headers=headers, timeout=10)
+        r = ah_request('GET', _AH_ORDER_ACTIVE_URL, 'order', auth='user', headers=headers)
         if r.status_code == 200:
             order_id = (r.json() or {}).get('id')
     except Exception:
@@ -249,20 +254,19 @@ def send_to_ah(year, week):
             items = [{'productId': pid, 'quantity': qty, 'originCode': 'PRD',
                       'description': '', 'strikethrough': False}
                      for pid, qty in merged.items()]
-            resp = _req.put(
-                _AH_ORDER_ITEMS_URL,
+            resp = ah_request(
+                'PUT', _AH_ORDER_ITEMS_URL, 'order-items', auth='user',
                 json={'items': items},
                 headers={**headers, 'Appie-Current-Order-Id': str(order_id)},
-                timeout=20,
             )
             target = 'bestelling'
         else:
             items = [{'originCode': 'PRD', 'productId': pid,
                       'quantity': qty, 'type': 'SHOPPABLE'}
                      for pid, qty in merged.items()]
-            resp = _req.patch(
-                _AH_SHOPPINGLIST_URL, json={'items': items},
-                headers=headers, timeout=20,
+            resp = ah_request(
+                'PATCH', _AH_SHOPPINGLIST_URL, 'shoppinglist', auth='user',
+                json={'items': items}, headers=headers,
             )
             target = 'boodschappenlijst'
         resp.raise_for_status()
@@ -1,14 +1,23 @@
+import json
 import re
+import threading
 import time
-from collections import Counter
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
 
 from weekmenu.extensions import db
-from weekmenu.models import Settings
+from weekmenu.models import AhSearchCache, AhProduct
+from weekmenu.services.ah_client import ah_request
+from weekmenu.services.settings import get_setting, set_setting, set_settings
 from weekmenu.services.units import _parse_product_size, price_per_unit
 from weekmenu.constants import (
     _AH_LOGIN_BASE, _AH_AUTHORIZE_PATH, _AH_ANON_TOKEN_URL,
-    _AH_TOKEN_URL, _AH_REFRESH_URL, _AH_SEARCH_URL,
-    _AH_SHOPPINGLIST_URL, _AH_HEADERS,
+    _AH_TOKEN_URL, _AH_REFRESH_URL, _AH_SEARCH_URL, _AH_PRODUCT_URL,
+    _AH_SHOPPINGLIST_URL,
     _AH_CAPTCHA_SITEKEY, _AH_CAPTCHA_PAGE,
     _AH_CLIENT_ID,
 )
@@ -23,143 +32,400 @@ def _is_organic(*texts):
 
 
 def _ah_setting(key, value=None):
-    """Get or set a Settings value by key."""
-    s = Settings.query.filter_by(key=key).first()
+    """Get or set a Settings value by key (via de settings-snapshot)."""
     if value is None:
-        return s.value if s else None
-    if s:
-        s.value = value
-    else:
-        db.session.add(Settings(key=key, value=value))
-    db.session.commit()
+        return get_setting(key)
+    set_setting(key, value)
+
+
+# ── Tokens ───────────────────────────────────────────────────────────────
+# In-memory kopie van de AH-tokens (de app draait als één proces). Settings
+# blijft de persistente bron: bij eerste gebruik uit de settings-snapshot
+# gelezen en bij elke refresh in één commit bijgewerkt. Refreshes zijn
+# single-flight per soort: wie op de lock wacht, krijgt het token dat de
+# vorige thread net ophaalde.
+
+_TOKEN_KEYS = {
+    # soort → (token-key, expires-key, refresh-key)
+    'anon': ('ah_anon_token', 'ah_anon_expires', None),
+    'user': ('ah_access_token', 'ah_token_expires', 'ah_refresh_token'),
+}
+_token_lock = threading.Lock()
+_refresh_locks = {'anon': threading.Lock(), 'user': threading.Lock()}
+_tokens = {}
+
+
+def _token_state(kind):
+    with _token_lock:
+        state = _tokens.get(kind)
+    if state is not None:
+        return state
+    token_key, expires_key, refresh_key = _TOKEN_KEYS[kind]
+    state = {
+        'token':   get_setting(token_key),
+        'expires': get_setting(expires_key, 0),
+        'refresh': get_setting(refresh_key) if refresh_key else None,
+    }
+    with _token_lock:
+        return _tokens.setdefault(kind, state)
+
+
+def _token_fresh(state):
+    return bool(state['token']) and int(time.time()) < state['expires'] - 60
+
+
+def _store_tokens(kind, token, expires=0, refresh=None):
+    """Werk geheugen en Settings bij in één commit; token=None wist de set."""
+    token_key, expires_key, refresh_key = _TOKEN_KEYS[kind]
+    values = {token_key: token, expires_key: str(int(expires)) if token else None}
+    if refresh_key:
+        values[refresh_key] = refresh
+    set_settings(values)
+    with _token_lock:
+        _tokens[kind] = {'token': token, 'expires': int(expires) if token else 0,
+                         'refresh': refresh}
+
+
+def set_ah_user_tokens(access_token, refresh_token, expires_at):
+    """Na inloggen/koppelen: nieuwe gebruikerstokens opslaan."""
+    _store_tokens('user', access_token, expires_at, refresh_token)
+
+
+def clear_ah_user_tokens():
+    _store_tokens('user', None)
 
 
 def _ah_get_anon_token(force=False):
     """Return a valid anonymous AH access token (for product search)."""
-    import requests as _req
-    token   = _ah_setting('ah_anon_token')
-    expires = _ah_setting('ah_anon_expires')
-    if not force and token and expires and int(time.time()) < int(expires) - 60:
-        return token
-    resp = _req.post(
-        _AH_ANON_TOKEN_URL,
-        json={'clientId': _AH_CLIENT_ID},
-        headers=_AH_HEADERS,
-        timeout=10,
+    state = _token_state('anon')
+    if not force and _token_fresh(state):
+        return state['token']
+    with _refresh_locks['anon']:
+        current = _token_state('anon')
+        if _token_fresh(current) and (not force or current is not state):
+            return current['token']
+        resp = ah_request('POST', _AH_ANON_TOKEN_URL, 'token', json={'clientId': _AH_CLIENT_ID})
+        resp.raise_for_status()
+        data = resp.json()
+        _store_tokens('anon', data['access_token'],
+                      int(time.time()) + data.get('expires_in', 604798))
+        return data['access_token']
+
+
+def ah_get_access_token(force=False):
+    """Return a valid user AH access token, auto-refreshing if needed (or if `force`)."""
+    state = _token_state('user')
+    if not force and _token_fresh(state):
+        return state['token']
+    with _refresh_locks['user']:
+        current = _token_state('user')
+        if _token_fresh(current) and (not force or current is not state):
+            return current['token']
+        refresh = current['refresh']
+        if not refresh:
+            return None
+        try:
+            resp = ah_request(
+                'POST', _AH_REFRESH_URL, 'token',
+                json={'clientId': _AH_CLIENT_ID, 'refreshToken': refresh},
+            )
+            if resp.status_code != 200:
+                from flask import current_app
+                current_app.logger.warning(
+                    'AH refresh failed: status=%s body=%s',
+                    resp.status_code, resp.text[:300]
+                )
+                if resp.status_code in (400, 401, 403):
+                    clear_ah_user_tokens()
+                return None
+            data = resp.json()
+            _store_tokens('user', data['access_token'],
+                          int(time.time()) + data.get('expires_in', 604798),
+                          data.get('refresh_token', refresh))
+            return data['access_token']
+        except Exception as e:
+            from flask import current_app
+            current_app.logger.warning('AH refresh exception: %r', e)
+            return None
+
+
+def _parse_ah_product(p):
+    """AH-API productobject (zoekresultaat of productdetail) → product-dict."""
+    images = p.get('images') or []
+    img_url = next((i['url'] for i in images if i.get('width') == 200), '')
+    if not img_url and images:
+        img_url = images[0].get('url', '')
+    cur_raw = p.get('currentPrice')
+    was_raw = p.get('priceBeforeBonus')
+    price_raw = cur_raw or was_raw
+    # Was-prijs alleen tonen bij een echte afprijzing.
+    show_was = bool(was_raw and cur_raw and was_raw > cur_raw)
+    size_str = p.get('salesUnitSize', '')
+    pu = price_per_unit(price_raw, size_str)
+    unit_price = round(pu[0], 4) if pu else None
+    unit_price_unit = pu[1] if pu else ''
+    unit_price_label = (
+        f"€{pu[0]:.2f}/{unit_price_unit}".replace('.', ',') if pu else ''
+    )
+    bg_color = (
+        p.get('highlight') or
+        p.get('backgroundColor') or
+        p.get('bgColor') or
+        (images[0].get('backgroundColor') if images else None) or
+        ''
     )
+    return {
+        'productId':      p.get('webshopId'),
+        'title':          p.get('title', ''),
+        'size':           p.get('salesUnitSize', ''),
+        'price':          f"{price_raw:.2f}".replace('.', ',') if price_raw else '',
+        'wasPrice':       f"{was_raw:.2f}".replace('.', ',') if show_was else '',
+        'isBonus':        bool(p.get('isBonus') or p.get('discountLabels')),
+        'bonusMechanism': p.get('bonusMechanism', '') or '',
+        'brand':          p.get('brand', '') or '',
+        'category':       p.get('mainCategory', '') or '',
+        'unitPrice':      unit_price,
+        'unitPriceUnit':  unit_price_unit,
+        'unitPriceLabel': unit_price_label,
+        'isOrganic':      _is_organic(p.get('title', ''), p.get('brand', '')),
+        'image':          img_url,
+        'bgColor':        bg_color,
+    }
+
+
+def _ah_fetch_products(query, size):
+    """Live zoekopdracht tegen de AH-API. Raist bij netwerk-/HTTP-fouten."""
+    resp = ah_request('GET', _AH_SEARCH_URL, 'search', auth='anon',
+                      params={'query': query, 'size': size})
     resp.raise_for_status()
-    data = resp.json()
-    _ah_setting('ah_anon_token', data['access_token'])
-    _ah_setting('ah_anon_expires', str(int(time.time()) + data.get('expires_in', 604798)))
-    return data['access_token']
+    return [_parse_ah_product(p) for p in resp.json().get('products', [])]
 
 
-def ah_get_access_token():
-    """Return a valid user AH access token, auto-refreshing if needed."""
-    import requests as _req
-    token   = _ah_setting('ah_access_token')
-    expires = _ah_setting('ah_token_expires')
-    if token and expires and int(time.time()) < int(expires) - 60:
-        return token
-    refresh = _ah_setting('ah_refresh_token')
-    if not refresh:
+def _ah_fetch_product(token, product_id):
+    """Actuele gegevens van één product op webshopId.
+
+    Geen DB-toegang (veilig vanuit worker-threads). Returns product-dict, of
+    None als AH het product niet meer kent. Raist bij andere HTTP-fouten.
+    """
+    resp = ah_request('GET', _AH_PRODUCT_URL.format(product_id=int(product_id)),
+                      'product', token=token)
+    if resp.status_code == 404:
         return None
+    resp.raise_for_status()
+    card = resp.json().get('productCard')
+    return _parse_ah_product(card) if card else None
+
+
+# ── Catalogus ────────────────────────────────────────────────────────────
+# Elk live zoekresultaat wordt in ah_product geüpsert; koppelen, verversen
+# en prijsadvies lezen daarna uit deze lokale tabel.
+
+def _parse_price(raw):
+    """'1,99' → 1.99; leeg of onleesbaar → None."""
     try:
-        resp = _req.post(
-            _AH_REFRESH_URL,
-            json={'clientId': _AH_CLIENT_ID, 'refreshToken': refresh},
-            headers=_AH_HEADERS,
-            timeout=10,
-        )
-        if resp.status_code != 200:
-            from flask import current_app
-            current_app.logger.warning(
-                'AH refresh failed: status=%s body=%s',
-                resp.status_code, resp.text[:300]
-            )
-            if resp.status_code in (400, 401, 403):
-                for key in ('ah_access_token', 'ah_refresh_token', 'ah_token_expires'):
-                    s = Settings.query.filter_by(key=key).first()
-                    if s:
-                        db.session.delete(s)
-                db.session.commit()
-            return None
-        data = resp.json()
-        _ah_setting('ah_access_token', data['access_token'])
-        _ah_setting('ah_refresh_token', data.get('refresh_token', refresh))
-        _ah_setting('ah_token_expires', str(int(time.time()) + data.get('expires_in', 604798)))
-        return data['access_token']
-    except Exception as e:
-        from flask import current_app
-        current_app.logger.warning('AH refresh exception: %r', e)
+        return float(str(raw).replace(',', '.')) if raw else None
+    except ValueError:
         return None
 
 
-def ah_search_products(query, size=8):
-    """Search AH product catalog. Returns list of product dicts."""
-    import requests as _req
+def _catalogue_row(p, now):
+    """Product-dict (zoals ah_search_products teruggeeft) → ah_product-rij."""
+    parsed = _parse_product_size(p.get('size') or '')
+    return {
+        'webshop_id':      int(p['productId']),
+        'title':           p.get('title') or '',
+        'brand':           p.get('brand') or None,
+        'category':        p.get('category') or None,
+        'size':            p.get('size') or None,
+        'pkg_qty':         parsed[0] if parsed else None,
+        'pkg_unit':        parsed[1] if parsed else None,
+        'price':           _parse_price(p.get('price')),
+        'was_price':       _parse_price(p.get('wasPrice')),
+        'is_bonus':        bool(p.get('isBonus')),
+        'bonus_mechanism': p.get('bonusMechanism') or None,
+        'price_per_unit':  p.get('unitPrice'),
+        'price_unit':      p.get('unitPriceUnit') or None,
+        'is_organic':      bool(p.get('isOrganic')),
+        'image':           p.get('image') or None,
+        'bg_color':        p.get('bgColor') or None,
+        'last_seen':       now,
+    }
+
+
+def upsert_ah_products(products, now=None, conn=None):
+    """Werk de lokale catalogus bij met zoekresultaten.
+
+    Zonder `conn` in een eigen transactie en best-effort bij een gelockte DB;
+    met `conn` als deel van de transactie van de aanroeper.
+    """
+    now = now or int(time.time())
+    rows = [_catalogue_row(p, now) for p in products if p.get('productId')]
+    if not rows:
+        return
+    table = AhProduct.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['webshop_id'],
+        set_={c: stmt.excluded[c] for c in rows[0] if c != 'webshop_id'},
+    )
+    if conn is not None:
+        conn.execute(stmt, rows)
+        return
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(stmt, rows)
+    except OperationalError:
+        pass
+
+
+# ── Zoekcache ────────────────────────────────────────────────────────────
+# Persistente cache per (genormaliseerde zoekterm, size) in ah_search_cache.
+# Binnen de TTL vers; daarna nog een stale-venster lang direct geserveerd
+# terwijl een achtergrondthread ververst. LRU-eviction op last_hit.
+
+_search_stats = {'hits': 0, 'stale': 0, 'misses': 0, 'errors': 0}
+_search_lock = threading.Lock()
+_revalidating = set()
+
+
+def _search_cache_key(query):
+    return ' '.join(query.lower().split())
+
+
+def _search_cache_config():
+    from flask import current_app
+    cfg = current_app.config
+    return (cfg.get('AH_SEARCH_CACHE_TTL', 6 * 3600),
+            cfg.get('AH_SEARCH_CACHE_STALE', 48 * 3600),
+            cfg.get('AH_SEARCH_CACHE_MAX', 2000))
+
+
+def _count(stat):
+    with _search_lock:
+        _search_stats[stat] += 1
 
-    def _do_search(token):
-        headers = {**_AH_HEADERS, 'Authorization': f'Bearer {token}'}
-        return _req.get(
-            _AH_SEARCH_URL,
-            params={'query': query, 'size': size},
-            headers=headers,
-            timeout=10,
-        )
 
+def _search_cache_get(key, size):
+    table = AhSearchCache.__table__
+    with db.engine.connect() as conn:
+        return conn.execute(
+            select(table.c.products, table.c.fetched_at)
+            .where(table.c.term == key, table.c.size == size)
+        ).first()
+
+
+def _search_cache_touch(key, size, now):
+    table = AhSearchCache.__table__
     try:
-        token = _ah_get_anon_token()
-        resp = _do_search(token)
-        if resp.status_code == 401:
-            token = _ah_get_anon_token(force=True)
-            resp = _do_search(token)
-        resp.raise_for_status()
-        products = []
-        for p in resp.json().get('products', []):
-            images = p.get('images') or []
-            img_url = next((i['url'] for i in images if i.get('width') == 200), '')
-            if not img_url and images:
-                img_url = images[0].get('url', '')
-            cur_raw = p.get('currentPrice')
-            was_raw = p.get('priceBeforeBonus')
-            price_raw = cur_raw or was_raw
-            # Was-prijs alleen tonen bij een echte afprijzing.
-            show_was = bool(was_raw and cur_raw and was_raw > cur_raw)
-            size_str = p.get('salesUnitSize', '')
-            pu = price_per_unit(price_raw, size_str)
-            unit_price = round(pu[0], 4) if pu else None
-            unit_price_unit = pu[1] if pu else ''
-            unit_price_label = (
-                f"€{pu[0]:.2f}/{unit_price_unit}".replace('.', ',') if pu else ''
+        with db.engine.begin() as conn:
+            conn.execute(
+                table.update()
+                .where(table.c.term == key, table.c.size == size)
+                .values(last_hit=now, hits=table.c.hits + 1)
             )
-            bg_color = (
-                p.get('highlight') or
-                p.get('backgroundColor') or
-                p.get('bgColor') or
-                (images[0].get('backgroundColor') if images else None) or
-                ''
-            )
-            products.append({
-                'productId':      p.get('webshopId'),
-                'title':          p.get('title', ''),
-                'size':           p.get('salesUnitSize', ''),
-                'price':          f"{price_raw:.2f}".replace('.', ',') if price_raw else '',
-                'wasPrice':       f"{was_raw:.2f}".replace('.', ',') if show_was else '',
-                'isBonus':        bool(p.get('isBonus') or p.get('discountLabels')),
-                'bonusMechanism': p.get('bonusMechanism', '') or '',
-                'brand':          p.get('brand', '') or '',
-                'category':       p.get('mainCategory', '') or '',
-                'unitPrice':      unit_price,
-                'unitPriceUnit':  unit_price_unit,
-                'unitPriceLabel': unit_price_label,
-                'isOrganic':      _is_organic(p.get('title', ''), p.get('brand', '')),
-                'image':          img_url,
-                'bgColor':        bg_color,
-            })
-        return products
+    except OperationalError:
+        pass  # cache is best-effort; een gelockte DB mag een zoekopdracht niet breken
+
+
+def _search_cache_put(key, size, products, now, max_entries):
+    table = AhSearchCache.__table__
+    stmt = sqlite_insert(table).values(
+        term=key, size=size, products=json.dumps(products),
+        fetched_at=now, last_hit=now, hits=0,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['term', 'size'],
+        set_={'products': stmt.excluded.products, 'fetched_at': now, 'last_hit': now},
+    )
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(stmt)
+            if conn.execute(select(func.count()).select_from(table)).scalar() > max_entries:
+                keep = select(table.c.id).order_by(table.c.last_hit.desc()).limit(max_entries)
+                conn.execute(table.delete().where(table.c.id.notin_(keep)))
+    except OperationalError:
+        pass
+
+
+def _revalidate_async(query, key, size, max_entries):
+    """Ververs één stale entry op de achtergrond (max één thread per key)."""
+    from flask import current_app
+    with _search_lock:
+        if (key, size) in _revalidating:
+            return
+        _revalidating.add((key, size))
+    app = current_app._get_current_object()
+
+    def _run():
+        try:
+            with app.app_context():
+                products = _ah_fetch_products(query, size)
+                upsert_ah_products(products)
+                _search_cache_put(key, size, products, int(time.time()), max_entries)
+        except Exception:
+            _count('errors')
+        finally:
+            with _search_lock:
+                _revalidating.discard((key, size))
+
+    threading.Thread(target=_run, daemon=True).start()
+
+
+def ah_search_products(query, size=8, fresh=False):
+    """Search AH product catalog (via de zoekcache). Returns list of product dicts.
+
+    `fresh=True` slaat de cache over bij het lezen (bv. prijs verversen),
+    maar schrijft het resultaat wel terug.
+    """
+    key = _search_cache_key(query)
+    ttl, stale, max_entries = _search_cache_config()
+    now = int(time.time())
+    row = None if fresh else _search_cache_get(key, size)
+    if row is not None:
+        age = now - row.fetched_at
+        if age < ttl + stale:
+            _search_cache_touch(key, size, now)
+            if age >= ttl:
+                _count('stale')
+                _revalidate_async(query, key, size, max_entries)
+            else:
+                _count('hits')
+            return json.loads(row.products)
+
+    _count('misses')
+    try:
+        products = _ah_fetch_products(query, size)
     except Exception:
-        return []
+        _count('errors')
+        # Liever een verlopen resultaat dan niets
+        return json.loads(row.products) if row is not None else []
+    upsert_ah_products(products, now)
+    _search_cache_put(key, size, products, now, max_entries)
+    return products
+
+
+def ah_search_cache_stats():
+    """Hit/miss-tellers (sinds processtart) en omvang van de zoekcache."""
+    ttl, stale, max_entries = _search_cache_config()
+    with _search_lock:
+        stats = dict(_search_stats)
+    lookups = stats['hits'] + stats['stale'] + stats['misses']
+    stats.update(
+        entries=AhSearchCache.query.count(),
+        max_entries=max_entries,
+        ttl=ttl,
+        stale_window=stale,
+        hit_rate=round((stats['hits'] + stats['stale']) / lookups, 3) if lookups else None,
+    )
+    return stats
+
+
+def clear_ah_search_cache():
+    AhSearchCache.query.delete()
+    db.session.commit()
+    with _search_lock:
+        for k in _search_stats:
+            _search_stats[k] = 0
 
 
 def ah_price_advice(query, size=25):
@@ -197,6 +463,44 @@ def ah_price_advice(query, size=25):
     return result
 
 
+_ADVICE_WORKERS = 6
+
+
+def ah_price_advice_many(queries, workers=_ADVICE_WORKERS):
+    """Prijsadvies voor veel zoektermen tegelijk, via de zoekcache.
+
+    `queries` is een dict key → zoekterm; gelijke termen worden één keer
+    gezocht. Yieldt (key, advies) in de volgorde waarin zoekopdrachten klaar
+    zijn. Sluit de aanroeper de generator, dan vervallen openstaande zoekacties.
+    """
+    from flask import current_app
+    if not queries:
+        return
+    app = current_app._get_current_object()
+    # Token vooraf geldig maken, anders verversen alle workers hem tegelijk
+    _ah_get_anon_token()
+
+    keys_by_term, terms = defaultdict(list), {}
+    for key, term in queries.items():
+        norm = _search_cache_key(term)
+        keys_by_term[norm].append(key)
+        terms.setdefault(norm, term)
+
+    def _advise(term):
+        with app.app_context():
+            return ah_price_advice(term)
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(_advise, terms[norm]): norm for norm in keys_by_term}
+        for fut in as_completed(futures):
+            advice = fut.result()
+            for key in keys_by_term[futures[fut]]:
+                yield key, advice
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
 _AH_FULFILLMENTS_QUERY = (
     'query OrderFulfillments { orderFulfillments(status: OPEN) { result { '
     'orderId shoppingType modifiable totalPrice { totalPrice { amount } } '
@@ -206,18 +510,12 @@ _AH_FULFILLMENTS_QUERY = (
 
 def ah_list_orders():
     """Open (geplande) AH-orders, gesorteerd op bezorgdatum."""
-    import requests as _req
     from weekmenu.constants import _AH_GRAPHQL_URL
-    token = ah_get_access_token()
-    if not token:
+    if not ah_get_access_token():
         return []
     try:
-        resp = _req.post(
-            _AH_GRAPHQL_URL,
-            json={'query': _AH_FULFILLMENTS_QUERY},
-            headers={**_AH_HEADERS, 'Authorization': f'Bearer {token}'},
-            timeout=10,
-        )
+        resp = ah_request('POST', _AH_GRAPHQL_URL, 'graphql', auth='user',
+                          json={'query': _AH_FULFILLMENTS_QUERY})
         resp.raise_for_status()
         result = (((resp.json() or {}).get('data') or {}).get('orderFulfillments') or {}).get('result') or []
     except Exception:
@@ -241,17 +539,11 @@ def ah_list_orders():
 
 def ah_get_order(order_id):
     """Inhoud van één order, gegroepeerd per schap, met totaal en bonusvoordeel."""
-    import requests as _req
-    token = ah_get_access_token()
-    if not token:
+    if not ah_get_access_token():
         return None
     url = f'https://api.ah.nl/mobile-services/order/v1/{int(order_id)}/details-grouped-by-taxonomy'
     try:
-        resp = _req.get(
-            url,
-            headers={**_AH_HEADERS, 'Authorization': f'Bearer {token}'},
-            timeout=12,
-        )
+        resp = ah_request('GET', url, 'order', auth='user')
         resp.raise_for_status()
         data = resp.json()
     except Exception:
@@ -313,14 +605,11 @@ _AH_REVERT_MUTATION = 'mutation OrderRevert($id: Int!){ orderRevert(id: $id){ st
 
 
 def _ah_graphql(token, query, variables=None):
-    import requests as _req
     from weekmenu.constants import _AH_GRAPHQL_URL
-    resp = _req.post(
-        _AH_GRAPHQL_URL,
+    resp = ah_request(
+        'POST', _AH_GRAPHQL_URL, 'graphql', token=token,
         json={'query': query, 'variables': variables or {}},
-        headers={**_AH_HEADERS, 'Authorization': f'Bearer {token}',
-                 'Content-Type': 'application/json'},
-        timeout=12,
+        headers={'Content-Type': 'application/json'},
     )
     resp.raise_for_status()
     return resp.json()
@@ -341,10 +630,8 @@ def ah_add_to_open_order(order_id, items):
     (CONFIRMED) order geeft AH 412 → nette melding. items=[{productId,
     quantity}] met absolute hoeveelheden; 0 = verwijderen.
     """
-    import requests as _req
     from weekmenu.constants import _AH_ORDER_ITEMS_URL
-    token = ah_get_access_token()
-    if not token:
+    if not ah_get_access_token():
         raise ValueError('Geen AH-account gekoppeld')
     payload = [{'productId': int(it['productId']), 'quantity': int(it['quantity']),
                 'originCode': 'PRD', 'description': '', 'strikethrough': False}
@@ -353,13 +640,11 @@ def ah_add_to_open_order(order_id, items):
         return
 
     oid = int(order_id)
-    resp = _req.put(
-        _AH_ORDER_ITEMS_URL,
+    resp = ah_request(
+        'PUT', _AH_ORDER_ITEMS_URL, 'order-items', auth='user',
         json={'items': payload},
-        headers={**_AH_HEADERS, 'Authorization': f'Bearer {token}',
-                 'Content-Type': 'application/json',
+        headers={'Content-Type': 'application/json',
                  'Appie-Current-Order-Id': str(oid)},
-        timeout=20,
     )
     if resp.status_code == 412:
         raise ValueError('Deze bestelling is doorgezet. Open hem eerst zelf in '
@@ -411,7 +696,6 @@ def _solve_hcaptcha_capsolver(api_key):
 def ah_login_with_password(email, password, capsolver_key=None):
     """Voert de volledige AH OAuth-flow server-side uit via curl_cffi."""
     from curl_cffi import requests as cffi_req
-    import requests as _req
 
     key = capsolver_key or _ah_setting('capsolver_key') or ''
     if not key:
@@ -472,12 +756,8 @@ def ah_login_with_password(email, password, capsolver_key=None):
             f'Controleer e-mail en wachtwoord. (laatste redirect: {location!r:.120})'
         )
 
-    tok = _req.post(
-        _AH_TOKEN_URL,
-        json={'clientId': _AH_CLIENT_ID, 'code': code},
-        headers=_AH_HEADERS,
-        timeout=10,
-    )
+    tok = ah_request('POST', _AH_TOKEN_URL, 'token',
+                     json={'clientId': _AH_CLIENT_ID, 'code': code})
     tok.raise_for_status()
     data = tok.json()
     expires_at = int(time.time()) + data.get('expires_in', 604798)
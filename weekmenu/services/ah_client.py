@@ -0,0 +1,123 @@
+"""Gedeelde HTTP-client voor alle AH-API-calls.
+
+Eén requests.Session met connection pooling en keep-alive, zodat niet elke
+call een nieuwe TLS-handshake naar api.ah.nl kost. Retry met backoff op
+429/5xx (alleen idempotente methodes), een timeout per endpoint, één
+401-pad dat het token ververst en de call één keer herhaalt, en
+latency-metrics per endpoint.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from weekmenu.constants import _AH_HEADERS
+
+
+_AH_TIMEOUTS = {
+    'token':        10,
+    'search':       10,
+    'product':      10,
+    'graphql':      12,
+    'order':        12,
+    'order-items':  20,
+    'shoppinglist': 20,
+}
+_DEFAULT_TIMEOUT = 10
+
+_session = None
+_session_lock = threading.Lock()
+
+_metrics_lock = threading.Lock()
+_metrics = defaultdict(lambda: {'count': 0, 'errors': 0, 'total_ms': 0.0,
+                                'max_ms': 0.0, 'last_status': None})
+
+
+def _get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests as _req
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+            session = _req.Session()
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def _record(endpoint, elapsed_ms, status):
+    with _metrics_lock:
+        m = _metrics[endpoint]
+        m['count'] += 1
+        m['total_ms'] += elapsed_ms
+        m['max_ms'] = max(m['max_ms'], elapsed_ms)
+        m['last_status'] = status
+        if status is None or status >= 400:
+            m['errors'] += 1
+
+
+def _bearer(auth, force=False):
+    from weekmenu.services.ah import _ah_get_anon_token, ah_get_access_token
+    if auth == 'anon':
+        return _ah_get_anon_token(force=force)
+    return ah_get_access_token(force=force)
+
+
+def ah_request(method, url, endpoint, auth=None, token=None, headers=None, **kwargs):
+    """Voer één AH-call uit via de gedeelde sessie.
+
+    Args:
+        endpoint: label voor timeout en metrics ('search', 'graphql', ...).
+        auth: None, 'anon' of 'user' — token ophalen en bij 401 één keer
+            ververst opnieuw proberen (vereist app context).
+        token: expliciet bearer-token (bv. vanuit worker-threads zonder DB);
+            dan geen automatische refresh.
+
+    Returns de requests.Response; netwerkfouten worden doorgegeven.
+    """
+    kwargs.setdefault('timeout', _AH_TIMEOUTS.get(endpoint, _DEFAULT_TIMEOUT))
+    if auth and token is None:
+        token = _bearer(auth)
+
+    def _send(bearer):
+        hdrs = {**_AH_HEADERS, **(headers or {})}
+        if bearer:
+            hdrs['Authorization'] = f'Bearer {bearer}'
+        start = time.monotonic()
+        try:
+            resp = _get_session().request(method, url, headers=hdrs, **kwargs)
+        except Exception:
+            _record(endpoint, (time.monotonic() - start) * 1000, None)
+            raise
+        _record(endpoint, (time.monotonic() - start) * 1000, resp.status_code)
+        return resp
+
+    resp = _send(token)
+    if resp.status_code == 401 and auth:
+        fresh = _bearer(auth, force=True)
+        if fresh:
+            resp = _send(fresh)
+    return resp
+
+
+def ah_http_metrics():
+    """Per endpoint: aantal calls, fouten, gemiddelde/max latency (ms), laatste status."""
+    with _metrics_lock:
+        return {
+            endpoint: {
+                'count': m['count'],
+                'errors': m['errors'],
+                'avg_ms': round(m['total_ms'] / m['count'], 1) if m['count'] else None,
+                'max_ms': round(m['max_ms'], 1),
+                'last_status': m['last_status'],
+            }
+            for endpoint, m in sorted(_metrics.items())
+        }
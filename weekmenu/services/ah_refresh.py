@@ -0,0 +1,154 @@
+"""Bulk-verversing van alle gekoppelde AH-producten.
+
+Eén achtergrondjob tegelijk: haalt per webshopId de actuele prijs, bonus en
+maat op (begrensde pool, rate-limited), en schrijft alles in één transactie
+naar de catalogus. De voortgang staat in `_job` zodat de UI kan pollen.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from weekmenu.extensions import db
+from weekmenu.models import Ingredient, AhProduct
+from weekmenu.services.ah import _ah_get_anon_token, _ah_fetch_product, upsert_ah_products
+from weekmenu.services.units import _parse_product_size
+
+
+_REFRESH_WORKERS = 4
+_REFRESH_BATCH = 20
+_REFRESH_RATE = 5.0   # requests per seconde over alle workers samen
+
+_job_lock = threading.Lock()
+_job = {
+    'state': 'idle',        # idle | running | done | error
+    'total': 0,
+    'done': 0,
+    'updated': 0,
+    'gone': 0,              # product bestaat niet meer bij AH
+    'failed': 0,
+    'started_at': None,
+    'finished_at': None,
+    'eta_seconds': None,
+    'message': '',
+}
+
+
+def _rate_limiter(per_second):
+    """Geeft een wait()-functie die aanroepen over threads heen uitspreidt."""
+    interval = 1.0 / per_second
+    lock = threading.Lock()
+    next_slot = [time.monotonic()]
+
+    def wait():
+        with lock:
+            now = time.monotonic()
+            slot = max(now, next_slot[0])
+            next_slot[0] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+    return wait
+
+
+def _update(**fields):
+    with _job_lock:
+        _job.update(fields)
+
+
+def _advance(outcome):
+    """Eén product afgehandeld (`outcome` = updated | gone | failed); ververs de ETA."""
+    with _job_lock:
+        _job['done'] += 1
+        _job[outcome] += 1
+        elapsed = time.time() - _job['started_at']
+        _job['eta_seconds'] = round(elapsed / _job['done'] * (_job['total'] - _job['done']))
+
+
+def ah_refresh_status():
+    with _job_lock:
+        return dict(_job)
+
+
+def start_ah_refresh():
+    """Start de bulk-refresh als er nog geen loopt. Returns (gestart, status)."""
+    from flask import current_app
+    with _job_lock:
+        if _job['state'] == 'running':
+            return False, dict(_job)
+        _job.update(state='running', total=0, done=0, updated=0, gone=0, failed=0,
+                    started_at=time.time(), finished_at=None, eta_seconds=None, message='')
+        status = dict(_job)
+    app = current_app._get_current_object()
+    threading.Thread(target=_run, args=(app,), daemon=True).start()
+    return True, status
+
+
+def _run(app):
+    with app.app_context():
+        try:
+            _refresh_all()
+        except Exception as e:
+            app.logger.warning('AH bulk-refresh mislukt: %r', e)
+            _update(state='error', message=str(e), finished_at=time.time(), eta_seconds=None)
+
+
+def _refresh_all():
+    product_ids = [pid for (pid,) in db.session.query(Ingredient.ah_product_id)
+                   .filter(Ingredient.ah_product_id.isnot(None)).distinct()]
+    previous_sizes = dict(db.session.query(AhProduct.webshop_id, AhProduct.size))
+    token = _ah_get_anon_token()
+    db.session.remove()  # geen open leestransactie vasthouden tijdens het netwerkwerk
+    _update(total=len(product_ids))
+
+    wait = _rate_limiter(_REFRESH_RATE)
+
+    def fetch(pid):
+        wait()
+        return _ah_fetch_product(token, pid)
+
+    fetched, retried = [], set()
+    queue = list(product_ids)
+    with ThreadPoolExecutor(max_workers=_REFRESH_WORKERS) as pool:
+        while queue:
+            batch, queue = queue[:_REFRESH_BATCH], queue[_REFRESH_BATCH:]
+            futures = {pool.submit(fetch, pid): pid for pid in batch}
+            auth_failed = []
+            for fut in as_completed(futures):
+                pid = futures[fut]
+                try:
+                    product = fut.result()
+                except Exception as e:
+                    status = getattr(getattr(e, 'response', None), 'status_code', None)
+                    if status == 401 and pid not in retried:
+                        retried.add(pid)
+                        auth_failed.append(pid)
+                        continue
+                    _advance('failed')
+                    continue
+                if product:
+                    fetched.append(product)
+                    _advance('updated')
+                else:
+                    _advance('gone')
+            if auth_failed:
+                # Token verlopen tijdens de run: één keer vernieuwen en opnieuw proberen
+                token = _ah_get_anon_token(force=True)
+                db.session.remove()
+                queue = auth_failed + queue
+
+    now = int(time.time())
+    ingredient = Ingredient.__table__
+    with db.engine.begin() as conn:
+        upsert_ah_products(fetched, now, conn=conn)
+        for p in fetched:
+            # Verpakking alleen overnemen als AH de maat wijzigde, zodat
+            # handmatige verpakkingsinstellingen blijven staan.
+            if p['size'] == previous_sizes.get(p['productId']):
+                continue
+            parsed = _parse_product_size(p['size'])
+            if parsed:
+                conn.execute(
+                    ingredient.update()
+                    .where(ingredient.c.ah_product_id == p['productId'])
+                    .values(ah_pkg_qty=parsed[0], ah_pkg_unit=parsed[1])
+                )
+    _update(state='done', finished_at=time.time(), eta_seconds=0)
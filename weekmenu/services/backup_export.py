@@ -0,0 +1,179 @@
+"""Streaming JSON/ZIP-export (zie routes/import_export.py).
+
+Recepten komen per `_EXPORT_BATCH` uit de database (`yield_per`, met
+ingrediënten per batch via één selectin-query) en worden direct als
+JSON-fragment doorgegeven; het document is byte-gelijk aan
+`json.dumps(data, ensure_ascii=False, indent=2)`. De ZIP wordt zonder
+seek geschreven (data descriptors), dus ook die gaat in stukken naar de
+client en afbeeldingen worden per blok gelezen. Het geheugengebruik hangt
+niet af van het aantal recepten of afbeeldingen.
+"""
+import json
+import os
+import zipfile
+from datetime import datetime
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from weekmenu.models import Cookbook, Recipe, RecipeIngredient
+
+
+_EXPORT_BATCH = 200
+_CHUNK_SIZE = 64 * 1024
+
+
+def _recipes():
+    return (Recipe.query.order_by(Recipe.name)
+            .options(joinedload(Recipe.cookbook),
+                     selectinload(Recipe.ingredients).joinedload(RecipeIngredient.ingredient))
+            .yield_per(_EXPORT_BATCH))
+
+
+def _json_document(header, lists):
+    """Stream `{**header, **lists}` precies zoals json.dumps(..., indent=2) het zou schrijven.
+
+    `lists` is een reeks (sleutel, iterable); de items worden één voor één
+    geserialiseerd.
+    """
+    yield '{\n' + ',\n'.join(
+        f'  {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)}' for key, value in header.items())
+    for key, items in lists:
+        yield f',\n  {json.dumps(key)}: ['
+        first = True
+        for item in items:
+            body = json.dumps(item, ensure_ascii=False, indent=2).replace('\n', '\n    ')
+            yield ('\n    ' if first else ',\n    ') + body
+            first = False
+        yield ']' if first else '\n  ]'
+    yield '\n}'
+
+
+def _encoded(pieces):
+    """UTF-8-blokken van ongeveer `_CHUNK_SIZE` uit een stroom tekstfragmenten."""
+    buf, size = [], 0
+    for piece in pieces:
+        buf.append(piece)
+        size += len(piece)
+        if size >= _CHUNK_SIZE:
+            yield ''.join(buf).encode('utf-8')
+            buf, size = [], 0
+    if buf:
+        yield ''.join(buf).encode('utf-8')
+
+
+def export_json_chunks():
+    """De JSON-export (versie 1) als stroom bytes."""
+    def recipes():
+        for r in _recipes():
+            yield {
+                'name': r.name,
+                'serves': r.serves,
+                'cookbook': r.cookbook.name if r.cookbook else None,
+                'page': r.page,
+                'is_favorite': r.is_favorite,
+                'url': r.url,
+                'instructions': r.instructions,
+                'ingredients': [
+                    {
+                        'name': ri.ingredient.display,
+                        'category': ri.ingredient.category,
+                        'amount': ri.amount,
+                        'unit': ri.unit,
+                        'preparation': ri.preparation or '',
+                    }
+                    for ri in r.ingredients
+                ]
+            }
+
+    cookbooks = ({'name': c.name, 'abbreviation': c.abbreviation}
+                 for c in Cookbook.query.order_by(Cookbook.name))
+    header = {'version': 1, 'exported_at': datetime.now().isoformat()}
+    return _encoded(_json_document(header, [('cookbooks', cookbooks), ('recipes', recipes())]))
+
+
+class _ZipSink:
+    """Niet-seekbaar doel voor ZipFile; `drain()` geeft de bytes sinds de vorige aanroep."""
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def write(self, data):
+        self._buf += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+
+def export_zip_chunks(uploads_dir):
+    """De ZIP-export (versie 2: JSON plus afbeeldingen) als stroom bytes."""
+    return (chunk for chunk in _zip_stream(uploads_dir) if chunk)
+
+
+def _zip_stream(uploads_dir):
+    image_filenames = []
+    seen = set()
+
+    def image(path):
+        fname = os.path.basename(path) if path else None
+        if fname and fname not in seen:
+            seen.add(fname)
+            image_filenames.append(fname)
+        return fname
+
+    def cookbooks():
+        for c in Cookbook.query.order_by(Cookbook.name):
+            yield {
+                'name': c.name,
+                'abbreviation': c.abbreviation,
+                'image_filename': image(c.image_path),
+                'is_archived': c.is_archived,
+            }
+
+    def recipes():
+        for r in _recipes():
+            yield {
+                'name': r.name,
+                'serves': r.serves,
+                'cookbook': r.cookbook.name if r.cookbook else None,
+                'page': r.page,
+                'is_favorite': r.is_favorite,
+                'url': r.url,
+                'instructions': r.instructions,
+                'image_filename': image(r.image_path),
+                'ingredients': [
+                    {
+                        'name': ri.ingredient.name,
+                        'category': ri.ingredient.category,
+                        'amount': ri.amount,
+                        'unit': ri.unit,
+                    }
+                    for ri in r.ingredients
+                ],
+            }
+
+    sink = _ZipSink()
+    header = {'version': 2, 'exported_at': datetime.now().isoformat()}
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+        with zf.open('weekmenu_export.json', 'w') as dest:
+            for chunk in _encoded(_json_document(header, [('cookbooks', cookbooks()),
+                                                          ('recipes', recipes())])):
+                dest.write(chunk)
+                yield sink.drain()
+
+        for fname in image_filenames:
+            full_path = os.path.join(uploads_dir, fname)
+            if not os.path.isfile(full_path):
+                continue
+            zinfo = zipfile.ZipInfo.from_file(full_path, arcname=os.path.join('images', fname))
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            with open(full_path, 'rb') as src, zf.open(zinfo, 'w') as dest:
+                while chunk := src.read(_CHUNK_SIZE):
+                    dest.write(chunk)
+                    yield sink.drain()
+    yield sink.drain()
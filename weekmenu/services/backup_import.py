@@ -0,0 +1,281 @@
+"""Bulk-import van een JSON/ZIP-back-up (zie routes/import_export.py).
+
+Het JSON-document wordt incrementeel gelezen (`iter_backup_items`), zodat
+ook een grote back-up nooit in zijn geheel in geheugen staat. Alle
+opzoekingen gebeuren in geheugen: kookboeken, aliassen, ingrediënten en de
+conversie-graph worden één keer geladen; recepten, nieuwe ingrediënten en
+receptregels worden per `_RECIPE_BATCH` met batch-inserts geschreven, in
+één transactie of met een commit per batch. De resolutie volgt
+`_resolve_or_create_ingredient` (JSON) resp. exacte naam (ZIP) en de
+unit-normalisatie `_normalize_ri_unit`, zodat het resultaat gelijk is aan
+de oude regel-voor-regel-import.
+"""
+import json
+import re
+
+from weekmenu.extensions import db
+from weekmenu.models import Cookbook, Recipe, RecipeIngredient, Ingredient, IngredientAlias
+from weekmenu.services.units import (
+    _normalize_ingredient, _guess_ingredient_category, _norm_unit,
+    _get_conversion_graph, _convert_to_target,
+)
+
+
+_RECIPE_BATCH = 200
+_READ_SIZE = 64 * 1024
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'\s*')
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+class _Catalogue:
+    """In-memory index van de bestaande ingrediënten, bijgewerkt tijdens de import."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.preferred = {}     # id → preferred_unit
+        self.by_name = {}       # name → id
+        self.by_display = {}    # display_name.lower() → id
+        for ing_id, name, display, preferred in db.session.query(
+                Ingredient.id, Ingredient.name, Ingredient.display_name, Ingredient.preferred_unit):
+            self.preferred[ing_id] = preferred
+            self.by_name.setdefault(name, ing_id)
+            if display:
+                self.by_display.setdefault(display.strip().lower(), ing_id)
+        self.aliases = dict(db.session.query(IngredientAlias.alias, IngredientAlias.ingredient_id))
+        self.new_aliases = []
+        self.new_preferred = {}
+        self.created = 0
+
+    def _insert(self, **values):
+        ing_id = self.conn.execute(Ingredient.__table__.insert().values(**values)).inserted_primary_key[0]
+        self.preferred[ing_id] = None
+        self.by_name[values['name']] = ing_id
+        self.created += 1
+        return ing_id
+
+    def resolve_alias(self, raw_name, category=None):
+        """Zelfde volgorde als `_resolve_or_create_ingredient`: alias, naam, weergavenaam, nieuw."""
+        normalized = _normalize_ingredient(raw_name.lower().strip())
+        found = (self.aliases.get(normalized) or self.by_name.get(normalized)
+                 or self.by_display.get(raw_name.strip().lower()))
+        if found:
+            return found
+        if not category or category == 'Overig':
+            category = _guess_ingredient_category(raw_name)
+        ing_id = self._insert(name=normalized, display_name=raw_name.strip(), category=category)
+        self.by_display.setdefault(raw_name.strip().lower(), ing_id)
+        self.aliases[normalized] = ing_id
+        self.new_aliases.append({'alias': normalized, 'ingredient_id': ing_id})
+        return ing_id
+
+    def resolve_name(self, name, category=None):
+        """Exacte naam, anders een nieuw ingrediënt (zoals de ZIP-import altijd deed)."""
+        return self.by_name.get(name) or self._insert(
+            name=name, display_name='', category=category or 'Overig')
+
+    def normalize_unit(self, graph, ing_id, unit, amount):
+        """`_normalize_ri_unit` zonder queries; nieuwe preferred units worden verzameld."""
+        norm = _norm_unit(unit)
+        preferred = self.preferred[ing_id]
+        if not preferred and norm:
+            preferred = self.preferred[ing_id] = self.new_preferred[ing_id] = norm
+        if not preferred or norm == preferred or amount is None:
+            return norm, amount
+        return _convert_to_target(graph, ing_id, norm, amount, preferred)
+
+    def flush(self):
+        if self.new_aliases:
+            self.conn.execute(IngredientAlias.__table__.insert(), self.new_aliases)
+        if self.new_preferred:
+            table = Ingredient.__table__
+            self.conn.execute(
+                table.update().where(table.c.id == db.bindparam('ing_id'))
+                .values(preferred_unit=db.bindparam('unit')),
+                [{'ing_id': k, 'unit': v} for k, v in self.new_preferred.items()],
+            )
+            from weekmenu.services.shopping import invalidate_shopping_cache
+            invalidate_shopping_cache()
+        self.new_aliases, self.new_preferred = [], {}
+
+
+class _JsonStream:
+    """Minimale incrementele JSON-lezer: één waarde tegelijk uit een tekststroom."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.fp.read(_READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Eerste teken na witruimte, zonder het te consumeren."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError('Onverwacht einde van het JSON-bestand')
+
+    def take(self, allowed):
+        char = self.peek()
+        if char not in allowed:
+            raise ValueError(f'Ongeldige JSON op positie {self.pos}: {char!r}')
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+                # Een getal aan het eind van de buffer kan nog doorlopen ('1' → '1.5')
+                if self.eof or (end < len(self.buf) and self.buf[end] not in _NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def iter_backup_items(fp):
+    """(sectie, item) voor elk element van de arrays op het hoogste niveau van een back-up.
+
+    Leest de tekststroom `fp` in blokken van `_READ_SIZE`; alleen het huidige
+    item staat in geheugen. Overige velden (version, exported_at) worden
+    overgeslagen.
+    """
+    stream = _JsonStream(fp)
+    stream.take('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        key = stream.value()
+        stream.take(':')
+        if stream.peek() != '[':
+            stream.value()
+        else:
+            stream.take('[')
+            if stream.peek() == ']':
+                stream.take(']')
+            else:
+                while True:
+                    yield key, stream.value()
+                    if stream.take(',]') == ']':
+                        break
+        if stream.take(',}') == '}':
+            return
+
+
+def import_backup_batches(items, zip_format=False, image_path_for=None, commit=False):
+    """Importeer kookboeken en recepten uit een (sectie, item)-stroom.
+
+    Args:
+        items: stroom van `iter_backup_items`; kookboeken worden direct
+            aangemaakt, recepten per `_RECIPE_BATCH`.
+        zip_format: ZIP-semantiek (ingrediënten op exacte naam, geen standaard
+            porties, kookboek-afbeelding/archief); anders die van de JSON-import.
+        image_path_for: functie bestandsnaam → image_path of None.
+        commit: commit na elke batch (anders commit of rollt de aanroeper terug).
+
+    Bestaande kookboeken en recepten (op naam) worden overgeslagen.
+
+    Yields na elke batch (en altijd minstens één keer) de cumulatieve tellers
+    'processed' (gelezen recepten), 'cookbooks', 'recipes' en 'ingredients'
+    (JSON: receptregels, ZIP: nieuw aangemaakte ingrediënten).
+    """
+    image_path_for = image_path_for or (lambda fname: None)
+    counts = {'processed': 0, 'cookbooks': 0, 'recipes': 0, 'ingredients': 0}
+    cookbooks = dict(db.session.query(Cookbook.name, Cookbook.id))
+    catalogue = _Catalogue(db.session.connection())
+    graph = _get_conversion_graph()
+    batch = []
+
+    def run_batch():
+        conn = catalogue.conn = db.session.connection()
+        lines = _import_recipes(conn, batch, catalogue, graph, cookbooks, counts,
+                                zip_format, image_path_for)
+        counts['processed'] += len(batch)
+        counts['ingredients'] = catalogue.created if zip_format else counts['ingredients'] + lines
+        catalogue.flush()
+        batch.clear()
+        if commit:
+            db.session.commit()
+        return dict(counts)
+
+    for section, item in items:
+        if section == 'cookbooks':
+            _import_cookbook(item, cookbooks, counts, zip_format, image_path_for)
+        elif section == 'recipes':
+            batch.append(item)
+            if len(batch) >= _RECIPE_BATCH:
+                yield run_batch()
+    if batch or not counts['processed']:
+        yield run_batch()
+
+
+def _import_cookbook(cb_data, cookbooks, counts, zip_format, image_path_for):
+    if cb_data['name'] in cookbooks:
+        return
+    values = {'name': cb_data['name'], 'abbreviation': cb_data.get('abbreviation')}
+    if zip_format:
+        values.update(
+            image_path=image_path_for(cb_data['image_filename']) if cb_data.get('image_filename') else None,
+            is_archived=cb_data.get('is_archived', False),
+        )
+    cookbooks[cb_data['name']] = db.session.connection().execute(
+        Cookbook.__table__.insert().values(**values)).inserted_primary_key[0]
+    counts['cookbooks'] += 1
+
+
+def _import_recipes(conn, batch, catalogue, graph, cookbooks, counts, zip_format, image_path_for):
+    """Schrijf één batch recepten met hun regels. Returns het aantal receptregels."""
+    resolve = catalogue.resolve_name if zip_format else catalogue.resolve_alias
+    # Ook recepten uit eerdere batches van deze import staan al in de database
+    taken = {name for (name,) in db.session.query(Recipe.name)
+             .filter(Recipe.name.in_({r['name'] for r in batch}))}
+    lines = []
+
+    for r_data in batch:
+        if r_data['name'] in taken:
+            continue
+        taken.add(r_data['name'])
+        image_path = image_path_for(r_data['image_filename']) if r_data.get('image_filename') else None
+        recipe_id = conn.execute(Recipe.__table__.insert().values(
+            name=r_data['name'],
+            serves=r_data.get('serves') if zip_format else r_data.get('serves', 4),
+            cookbook_id=cookbooks.get(r_data['cookbook']) if r_data.get('cookbook') else None,
+            page=r_data.get('page'),
+            is_favorite=r_data.get('is_favorite', False),
+            url=r_data.get('url'),
+            instructions=r_data.get('instructions'),
+            image_path=image_path,
+        )).inserted_primary_key[0]
+
+        for ing_data in r_data.get('ingredients', []):
+            ing_id = resolve(ing_data['name'], ing_data.get('category', 'Overig'))
+            raw_amount = (ing_data.get('amount') or 0) if zip_format else ing_data.get('amount', 0)
+            unit, amount = catalogue.normalize_unit(graph, ing_id, ing_data.get('unit', ''), raw_amount)
+            lines.append({
+                'recipe_id': recipe_id,
+                'ingredient_id': ing_id,
+                'amount': amount,
+                'unit': unit,
+                'preparation': None if zip_format else ing_data.get('preparation'),
+            })
+        counts['recipes'] += 1
+
+    if lines:
+        conn.execute(RecipeIngredient.__table__.insert(), lines)
+    return len(lines)
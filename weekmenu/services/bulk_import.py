@@ -0,0 +1,274 @@
+"""Bulk-URL-import: een lijst recept-URL's in één keer naar de receptenbank.
+
+De URL's gaan als ScrapeJobs van één ScrapeBatch door de gewone wachtrij
+(per-domein-limiet, Gemini alleen als recipe-scrapers faalt). Geslaagde
+resultaten worden per `_INGEST_BATCH` in één transactie als recept
+opgeslagen, elk recept in een eigen savepoint zodat één fout de rest niet
+meeneemt. URL's die al als recept bestaan, worden niet opnieuw opgehaald;
+ze worden vergeleken op de genormaliseerde URL van de scrape-cache.
+"""
+import json
+import re
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+from weekmenu.extensions import db
+from weekmenu.models import Recipe, RecipeIngredient, Cookbook, ScrapeJob, ScrapeBatch
+from weekmenu.services.recipes import _resolve_or_create_ingredient, _download_site_logo
+from weekmenu.services.scrape_cache import normalize_url
+from weekmenu.services.scrape_jobs import start_scrape_workers
+from weekmenu.services.units import _normalize_ri_unit
+
+
+MAX_BULK_URLS = 500
+_INGEST_BATCH = 10
+
+_ingest_lock = threading.Lock()
+# Opgehaalde logo's van nog aan te maken site-kookboeken (naam → image_path of None)
+_logos_lock = threading.Lock()
+_site_logos = {}
+
+
+def parse_url_list(raw):
+    """Tekst (één URL per regel) of lijst → unieke http(s)-URL's in volgorde.
+
+    Varianten van dezelfde URL (www., slash, trackingparameters) tellen één keer.
+    """
+    if isinstance(raw, str):
+        raw = re.split(r'\s+', raw)
+    urls, seen = [], set()
+    for url in raw or []:
+        url = (url or '').strip()
+        parsed = urlparse(url)
+        if parsed.scheme in ('http', 'https') and parsed.netloc and normalize_url(url) not in seen:
+            seen.add(normalize_url(url))
+            urls.append(url)
+    return urls
+
+
+def _known_urls():
+    """Recept-id per genormaliseerde recept-URL (zelfde sleutel als de scrape-cache)."""
+    return {normalize_url(url): recipe_id for url, recipe_id in
+            db.session.query(Recipe.url, Recipe.id).filter(Recipe.url.isnot(None), Recipe.url != '')}
+
+
+def enqueue_bulk_import(urls, cookbook_id=None):
+    """Maak een batch aan en zet alle nieuwe URL's in de wachtrij."""
+    from weekmenu.services.scrape_jobs import _domain
+    now = int(time.time())
+    batch = ScrapeBatch(cookbook_id=cookbook_id, created_at=now)
+    db.session.add(batch)
+    db.session.flush()
+
+    known = _known_urls()
+    for url in urls:
+        job = ScrapeJob(url=url, domain=_domain(url), batch_id=batch.id, created_at=now)
+        recipe_id = known.get(normalize_url(url))
+        if recipe_id:
+            job.state, job.outcome, job.recipe_id, job.finished_at = 'done', 'duplicate', recipe_id, now
+        else:
+            job.state = 'queued'
+        db.session.add(job)
+    db.session.commit()
+    start_scrape_workers()
+    return bulk_import_status(batch.id)
+
+
+def bulk_import_status(batch_id):
+    """Voortgang van een batch: tellers en de status per URL. None als onbekend."""
+    batch = ScrapeBatch.query.get(batch_id)
+    if batch is None:
+        return None
+    jobs = ScrapeJob.query.filter_by(batch_id=batch_id).order_by(ScrapeJob.id).all()
+    counts = Counter()
+    items = []
+    for job in jobs:
+        key = job.outcome or ('processing' if job.state in ('done', 'failed') else job.state)
+        counts[key] += 1
+        item = {
+            'job_id': job.id,
+            'url': job.url,
+            'state': job.state,
+            'outcome': job.outcome,
+            'recipe_id': job.recipe_id,
+        }
+        if job.outcome == 'error' and job.result:
+            item['message'] = json.loads(job.result).get('message', '')
+        items.append(item)
+    return {
+        'batch_id': batch.id,
+        'total': len(jobs),
+        'counts': {k: counts[k] for k in ('queued', 'running', 'processing',
+                                          'imported', 'duplicate', 'error')},
+        'finished': all(job.outcome for job in jobs),
+        'jobs': items,
+    }
+
+
+def ingest_ready(batch_id):
+    """Sla afgeronde jobs van de batch op zodra er genoeg zijn (of de batch klaar is)."""
+    batch = ScrapeBatch.query.get(batch_id)
+    pending = _pending_jobs(batch_id)
+    if not _ready(batch_id, pending):
+        return
+    # Site-logo's (netwerk) buiten de lock, zodat andere workers niet wachten
+    _fetch_site_logos(batch, [json.loads(job.result) for job in pending if job.result])
+    with _ingest_lock:
+        pending = _pending_jobs(batch_id)
+        if _ready(batch_id, pending):
+            _ingest(batch, pending)
+
+
+def sweep_batches():
+    """Ingest batches met afgeronde maar nog niet opgeslagen jobs.
+
+    Vangt een mislukte `_ingest` (bv. 'database is locked') of een herstart
+    op: zonder deze ronde bleef zo'n batch voor altijd op 'processing' staan.
+    """
+    from flask import current_app
+    batch_ids = [batch_id for (batch_id,) in db.session.query(ScrapeJob.batch_id).filter(
+        ScrapeJob.batch_id.isnot(None),
+        ScrapeJob.state.in_(('done', 'failed')),
+        ScrapeJob.outcome.is_(None)).distinct()]
+    for batch_id in batch_ids:
+        try:
+            ingest_ready(batch_id)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning('Bulk-import %s opslaan mislukt: %r', batch_id, e)
+
+
+def _pending_jobs(batch_id):
+    return (ScrapeJob.query
+            .filter(ScrapeJob.batch_id == batch_id,
+                    ScrapeJob.state.in_(('done', 'failed')),
+                    ScrapeJob.outcome.is_(None))
+            .order_by(ScrapeJob.id).all())
+
+
+def _ready(batch_id, pending):
+    if not pending:
+        return False
+    still_open = ScrapeJob.query.filter(
+        ScrapeJob.batch_id == batch_id,
+        ScrapeJob.state.in_(('queued', 'running'))).count()
+    return not still_open or len(pending) >= _INGEST_BATCH
+
+
+def _ingest(batch, jobs):
+    failed, results = [], []
+    for job in jobs:
+        payload = json.loads(job.result) if job.result else {}
+        if job.state != 'done' or payload.get('status') != 'success':
+            failed.append((job, None))
+        elif not (payload.get('name') or '').strip():
+            failed.append((job, 'Geen receptnaam gevonden'))
+        else:
+            results.append((job, payload))
+
+    payloads = [p for _, p in results]
+    known = _known_urls()
+
+    for job, message in failed:
+        job.outcome = 'error'
+        if message:
+            job.result = json.dumps({'status': 'error', 'message': message})
+    cookbooks = _resolve_cookbooks(batch, payloads)
+    for job, payload in results:
+        key = normalize_url(job.url)
+        if key in known:
+            job.outcome, job.recipe_id = 'duplicate', known[key]
+            continue
+        name = payload.get('cookbook_name')
+        if name and name not in cookbooks:
+            continue  # logo nog niet opgehaald (job kwam na het ophalen binnen): volgende ronde
+        try:
+            with db.session.begin_nested():
+                recipe = _create_recipe(payload, cookbooks.get(name))
+            job.outcome, job.recipe_id = 'imported', recipe.id
+            known[key] = recipe.id
+        except Exception as e:
+            job.outcome = 'error'
+            job.result = json.dumps({'status': 'error', 'message': f'Opslaan mislukt: {str(e)[:100]}'})
+    db.session.commit()
+
+
+def _new_site_names(payloads):
+    names = {p.get('cookbook_name') for p in payloads} - {None, ''}
+    existing = {name for (name,) in db.session.query(Cookbook.name).filter(Cookbook.name.in_(names))}
+    return names - existing
+
+
+def _fetch_site_logos(batch, payloads):
+    """Haal het logo op van elk nog niet bestaand site-kookboek (None als er geen te vinden is)."""
+    if batch.cookbook_id:
+        return
+    import requests as _req
+    urls = {p.get('cookbook_name'): p.get('url') or '' for p in payloads}
+    for name in _new_site_names(payloads):
+        with _logos_lock:
+            if name in _site_logos:
+                continue
+        try:
+            logo = _download_site_logo(urlparse(urls[name]).netloc, '', _req)
+        except Exception:
+            logo = None
+        with _logos_lock:
+            _site_logos.setdefault(name, logo)
+
+
+def _resolve_cookbooks(batch, payloads):
+    """Kookboek-id per voorgestelde sitenaam; ontbrekende sites krijgen een eigen kookboek.
+
+    Sites waarvan het logo nog niet is opgehaald, ontbreken in het resultaat.
+    """
+    if batch.cookbook_id:
+        return {p.get('cookbook_name'): batch.cookbook_id for p in payloads}
+    names = {p.get('cookbook_name') for p in payloads} - {None, ''}
+    resolved = dict(db.session.query(Cookbook.name, Cookbook.id).filter(Cookbook.name.in_(names)))
+    for name in sorted(names - set(resolved)):
+        with _logos_lock:
+            if name not in _site_logos:
+                continue
+            logo = _site_logos.pop(name)
+        abbr = ''.join(w[0].upper() for w in name.split() if w)[:5]
+        cookbook = Cookbook(name=name, abbreviation=abbr, image_path=logo)
+        db.session.add(cookbook)
+        db.session.flush()
+        resolved[name] = cookbook.id
+    return resolved
+
+
+def _create_recipe(payload, cookbook_id):
+    try:
+        serves = int(payload.get('serves')) or None
+    except (TypeError, ValueError):
+        serves = None
+    recipe = Recipe(
+        name=payload['name'].strip(),
+        serves=serves,
+        cookbook_id=cookbook_id,
+        image_path=payload.get('image_path'),
+        url=payload.get('url'),
+        instructions=payload.get('instructions') or None,
+    )
+    db.session.add(recipe)
+    db.session.flush()
+    for line in payload.get('ingredients') or []:
+        if not (line.get('name') or '').strip():
+            continue
+        ingredient = _resolve_or_create_ingredient(line['name'], line.get('category'))
+        if not ingredient:
+            continue
+        norm_unit, norm_amount = _normalize_ri_unit(ingredient, line.get('unit') or '',
+                                                    line.get('amount') or 0)
+        db.session.add(RecipeIngredient(
+            recipe_id=recipe.id,
+            ingredient_id=ingredient.id,
+            amount=norm_amount,
+            unit=norm_unit,
+        ))
+    db.session.flush()
+    return recipe
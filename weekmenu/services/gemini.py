@@ -1,18 +1,27 @@
 """Gemini API integration: key lookup, HTML/JSON helpers, recipe extraction."""
 import hashlib
+import io
 import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 from flask import current_app
 
 from weekmenu.extensions import db  # noqa: F401 — reserved for future write flows
-from weekmenu.models import Settings
+from weekmenu.services import scrape_cache
+from weekmenu.services.llm import get_llm
+from weekmenu.services.settings import get_setting
 from weekmenu.constants import DUTCH_UNITS
 from weekmenu.services.units import _guess_ingredient_category, parse_ingredients_from_list
 from weekmenu.services.recipes import _suggest_site_cookbook
 
 
+_MAX_PHOTOS = 6
+_PHOTO_MAX_SIDE = 1600   # px, langste zijde
+_PHOTO_QUALITY = 80      # JPEG
+_PHOTO_WORKERS = 3       # gelijktijdige Gemini-calls per foto-import
+
 _VALID_UNITS = sorted(set(DUTCH_UNITS.values()))
 _UNITS_STR = ', '.join(_VALID_UNITS)
 
@@ -43,10 +52,7 @@ Regels:
 
 def _get_gemini_api_key():
     """Get Gemini API key from database or environment."""
-    s = Settings.query.filter_by(key='gemini_api_key').first()
-    if s and s.value:
-        return s.value
-    return os.environ.get('GEMINI_API_KEY')
+    return get_setting('gemini_api_key') or os.environ.get('GEMINI_API_KEY')
 
 
 def _clean_html(raw_html):
@@ -97,30 +103,56 @@ def _build_gemini_ingredients(raw_list):
 
 
 def scrape_recipe_from_url(url):
-    """Fetch URL, try structured scraper, fall back to Gemini LLM. Returns (data, status)."""
-    from curl_cffi import requests as _requests
-    from recipe_scrapers import scrape_html
+    """Fetch URL, try structured scraper, fall back to Gemini LLM. Returns (data, status).
 
+    Pagina's en geslaagde parses komen uit de scrape-cache waar mogelijk.
+    """
     url = (url or '').strip()
     if not url:
         return {'status': 'error', 'message': 'Geen URL opgegeven'}, 400
 
+    cached = scrape_cache.lookup(url)
+    if cached and cached.recipe:
+        return cached.recipe, 200
+    if cached:
+        digest, html = cached.content_hash, cached.html
+    else:
+        html, error = _fetch_html(url)
+        if error:
+            return error, 400
+        digest, recipe = scrape_cache.store_page(url, html)
+        if recipe:
+            return recipe, 200
+
+    payload, status = _parse_recipe_html(url, html, digest)
+    if status == 200:
+        scrape_cache.store_recipe(digest, payload)
+    return payload, status
+
+
+def _fetch_html(url):
+    """Returns (html, None) of (None, foutpayload)."""
+    from curl_cffi import requests as _requests
     try:
         resp = _requests.get(url, impersonate='chrome', timeout=15, allow_redirects=True)
         resp.raise_for_status()
-        html = resp.text
+        return resp.text, None
     except Exception as e:
         msg = str(e)
         code = getattr(getattr(e, 'response', None), 'status_code', None)
         if 'timed out' in msg.lower() or 'timeout' in msg.lower():
-            return {'status': 'error', 'message': 'De pagina reageerde niet op tijd. Probeer het opnieuw.'}, 400
+            return None, {'status': 'error', 'message': 'De pagina reageerde niet op tijd. Probeer het opnieuw.'}
         if code == 403:
-            return {'status': 'error', 'message': 'Deze website blokkeert automatisch ophalen (403). Probeer een andere site.'}, 400
+            return None, {'status': 'error', 'message': 'Deze website blokkeert automatisch ophalen (403). Probeer een andere site.'}
         if code == 404:
-            return {'status': 'error', 'message': 'Pagina niet gevonden (404). Controleer de URL.'}, 400
+            return None, {'status': 'error', 'message': 'Pagina niet gevonden (404). Controleer de URL.'}
         if code:
-            return {'status': 'error', 'message': f'De pagina kon niet worden opgehaald (HTTP {code}).'}, 400
-        return {'status': 'error', 'message': 'De URL kon niet worden bereikt. Controleer de URL.'}, 400
+            return None, {'status': 'error', 'message': f'De pagina kon niet worden opgehaald (HTTP {code}).'}
+        return None, {'status': 'error', 'message': 'De URL kon niet worden bereikt. Controleer de URL.'}
+
+
+def _parse_recipe_html(url, html, digest):
+    from recipe_scrapers import scrape_html
 
     try:
         scraper = scrape_html(html, org_url=url)
@@ -132,27 +164,22 @@ def scrape_recipe_from_url(url):
             scraper = None
 
     if scraper is None:
-        return _llm_fallback_from_html(url, html)
+        return _llm_fallback_from_html(url, html, digest)
 
     return _extract_from_scraper(url, html, scraper)
 
 
-def _llm_fallback_from_html(url, html):
+def _llm_fallback_from_html(url, html, digest=None):
     """When the structured scraper fails, ask Gemini to parse the page text."""
-    api_key = _get_gemini_api_key()
-    if not api_key:
+    llm = get_llm()
+    if llm is None:
         return {'status': 'error', 'message': 'Geen receptinformatie gevonden op deze pagina. De site ondersteunt geen gestructureerde receptdata.'}, 400
 
-    from google import genai as _genai
-
-    text = _clean_html(html)
+    text = scrape_cache.clean_text(digest, html, _clean_html) if digest else _clean_html(html)
     prompt = _GEMINI_RECIPE_PROMPT + f"\n\nTekst van de pagina:\n{text}"
 
     try:
-        client = _genai.Client(api_key=api_key)
-        response = client.models.generate_content(model='gemini-2.5-flash', contents=prompt)
-        sanitized = _sanitize_json(response.text)
-        result = json.loads(sanitized)
+        result = json.loads(_sanitize_json(llm(prompt)))
 
         if 'error' in result:
             return {'status': 'error', 'message': result['error']}, 400
@@ -279,73 +306,84 @@ def _extract_from_scraper(url, html, scraper):
     }, 200
 
 
+def _downscale_photo(photo):
+    """Verklein een geüploade foto tot max `_PHOTO_MAX_SIDE` px als JPEG. Returns (bytes, mime).
+
+    Gemini leest een pagina op 1600 px nog prima; een telefoonfoto van 4-12 MB
+    wordt zo een paar honderd KB. Zonder Pillow (optioneel) of bij een
+    formaat dat Pillow niet kent, gaat het origineel ongewijzigd door.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return photo.read(), photo.content_type or 'image/jpeg'
+    try:
+        img = Image.open(photo.stream)
+        img.draft('RGB', (_PHOTO_MAX_SIDE, _PHOTO_MAX_SIDE))  # JPEG: direct op lagere resolutie decoderen
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((_PHOTO_MAX_SIDE, _PHOTO_MAX_SIDE))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        out = io.BytesIO()
+        img.save(out, 'JPEG', quality=_PHOTO_QUALITY, optimize=True)
+        return out.getvalue(), 'image/jpeg'
+    except Exception:
+        photo.stream.seek(0)
+        return photo.read(), photo.content_type or 'image/jpeg'
+
+
+def _merge_pages(pages):
+    """Voeg de per pagina herkende delen samen tot één recept (in paginavolgorde)."""
+    merged = {'title': '', 'yields': None, 'ingredients': [], 'instructions': []}
+    seen = set()
+    for page in pages:
+        merged['title'] = merged['title'] or str(page.get('title') or '').strip()
+        merged['yields'] = merged['yields'] or page.get('yields')
+        for ing in page.get('ingredients') or []:
+            if not isinstance(ing, dict):
+                continue
+            key = ((ing.get('name') or '').strip().lower(), ing.get('amount'), ing.get('unit'))
+            if key not in seen:
+                seen.add(key)
+                merged['ingredients'].append(ing)
+        instructions = page.get('instructions')
+        if isinstance(instructions, str) and instructions.strip():
+            merged['instructions'].append(instructions.strip())
+    merged['instructions'] = '\n'.join(merged['instructions'])
+    return merged
+
+
 def recipe_from_photos(photos):
-    """Extract a recipe from up to 3 photos using Gemini vision. Returns (data, status)."""
-    from google import genai as _genai
-    from google.genai import types as _gtypes
+    """Extract a recipe from up to `_MAX_PHOTOS` photos using Gemini vision. Returns (data, status).
 
-    api_key = _get_gemini_api_key()
-    if not api_key:
+    Foto's worden eerst verkleind; bij meerdere pagina's gaat elke pagina
+    als eigen Gemini-call (parallel) en worden de delen samengevoegd.
+    """
+    llm = get_llm()
+    if llm is None:
         return {'status': 'error', 'message': 'Gemini API key niet geconfigureerd'}, 400
 
-    if not photos or len(photos) == 0 or photos[0].filename == '':
+    photos = [p for p in photos or [] if p.filename]
+    if not photos:
         return {'status': 'error', 'message': "Geen foto's geselecteerd"}, 400
 
-    if len(photos) > 3:
-        return {'status': 'error', 'message': "Maximaal 3 foto's toegestaan"}, 400
+    if len(photos) > _MAX_PHOTOS:
+        return {'status': 'error', 'message': f"Maximaal {_MAX_PHOTOS} foto's toegestaan"}, 400
 
-    image_parts = []
-    first_image_path = None
+    total = len(photos)
 
-    for i, photo in enumerate(photos):
-        if photo.filename == '':
-            continue
-
-        image_bytes = photo.read()
-
-        if i == 0:
-            ext = '.jpg'
-            if photo.content_type == 'image/png':
-                ext = '.png'
-            elif photo.content_type == 'image/webp':
-                ext = '.webp'
-            elif photo.content_type == 'image/avif':
-                ext = '.avif'
-            fname = hashlib.md5(image_bytes).hexdigest() + ext
-            save_path = os.path.join(current_app.static_folder, 'uploads', fname)
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            with open(save_path, 'wb') as f:
-                f.write(image_bytes)
-            first_image_path = os.path.join('static/uploads', fname)
-
-        image_parts.append(
-            _gtypes.Part.from_bytes(data=image_bytes, mime_type=photo.content_type or 'image/jpeg')
-        )
-
-    prompt = _GEMINI_RECIPE_PROMPT + "\n\nBij meerdere foto's: combineer ingrediënten en bereiding van alle pagina's."
+    def _read_page(args):
+        index, photo = args
+        image_bytes, mime = _downscale_photo(photo)
+        prompt = _GEMINI_RECIPE_PROMPT
+        if total > 1:
+            prompt += (f"\n\nDit is pagina {index + 1} van {total} van één recept. Geef alleen wat "
+                       "op deze pagina staat; laat ontbrekende velden leeg (null of lege lijst).")
+        return image_bytes, mime, json.loads(_sanitize_json(llm(prompt, [(image_bytes, mime)])))
 
     try:
-        client = _genai.Client(api_key=api_key)
-        content = [prompt] + image_parts
-        response = client.models.generate_content(model='gemini-2.5-flash', contents=content)
-        sanitized = _sanitize_json(response.text)
-        result = json.loads(sanitized)
-
-        if 'error' in result:
-            return {'status': 'error', 'message': result['error']}, 400
-
-        return {
-            'status': 'success',
-            'name': result.get('title', ''),
-            'serves': result.get('yields'),
-            'url': None,
-            'instructions': result.get('instructions', ''),
-            'ingredients': _build_gemini_ingredients(result.get('ingredients', [])),
-            'image_path': first_image_path,
-            'cookbook_id': None,
-            'cookbook_name': None,
-        }, 200
-
+        with ThreadPoolExecutor(max_workers=min(total, _PHOTO_WORKERS)) as pool:
+            pages = list(pool.map(_read_page, enumerate(photos)))
     except json.JSONDecodeError as e:
         return {'status': 'error', 'message': f'Fout in receptgegevens: {str(e)[:100]}'}, 400
     except Exception as e:
@@ -355,3 +393,33 @@ def recipe_from_photos(photos):
         else:
             msg = f'Fout bij verwerken: {msg[:100]}'
         return {'status': 'error', 'message': msg}, 400
+
+    # Pagina's zonder recept (bv. alleen een foto van het gerecht) of met een
+    # antwoord dat geen object is (lijst, tekst) tellen niet mee
+    results = [result for _, _, result in pages if isinstance(result, dict)]
+    found = [result for result in results if 'error' not in result]
+    if not found:
+        message = results[0]['error'] if results else 'Geen recept gevonden'
+        return {'status': 'error', 'message': str(message)}, 400
+    result = _merge_pages(found)
+
+    # De eerste foto (verkleind) wordt de receptafbeelding
+    image_bytes, mime, _ = pages[0]
+    ext = {'image/png': '.png', 'image/webp': '.webp', 'image/avif': '.avif'}.get(mime, '.jpg')
+    fname = hashlib.md5(image_bytes).hexdigest() + ext
+    save_path = os.path.join(current_app.static_folder, 'uploads', fname)
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    with open(save_path, 'wb') as f:
+        f.write(image_bytes)
+
+    return {
+        'status': 'success',
+        'name': result['title'],
+        'serves': result['yields'],
+        'url': None,
+        'instructions': result['instructions'],
+        'ingredients': _build_gemini_ingredients(result['ingredients']),
+        'image_path': os.path.join('static/uploads', fname),
+        'cookbook_id': None,
+        'cookbook_name': None,
+    }, 200
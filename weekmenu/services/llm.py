@@ -0,0 +1,114 @@
+"""LLM-provider voor de Gemini-paden (URL-fallback en foto-import).
+
+`get_llm()` geeft een `generate(prompt, images=())`-functie terug (of None
+als er geen provider beschikbaar is), gekozen via `LLM_PROVIDER`:
+
+- `gemini` (standaard): google-genai met de ingestelde API key;
+- `record`: als gemini, maar elk antwoord komt ook als fixture in
+  `LLM_FIXTURES_DIR`;
+- `replay`: geen netwerk; antwoorden komen uit `LLM_FIXTURES_DIR`, op
+  sleutel sha256(model, prompt, afbeeldingen). Onbekende sleutels vallen
+  terug op `_default.json`, anders een fout.
+
+`LLM_LATENCY_MS` (bv. `800` of `500-1500`) voegt per call vertraging toe,
+om doorvoer en concurrency-limieten offline te kunnen meten; `create_app`
+parset de waarde eenmalig naar een (min, max)-tuple. De functie
+wordt binnen een app context opgehaald maar is daarna ook vanuit
+worker-threads bruikbaar.
+"""
+import hashlib
+import json
+import os
+import random
+import time
+
+
+GEMINI_MODEL = 'gemini-2.5-flash'
+
+
+def fixture_key(prompt, images=(), model=GEMINI_MODEL):
+    h = hashlib.sha256()
+    for part in (model, prompt):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    for data, _mime in images:
+        h.update(hashlib.sha256(data).digest())
+    return h.hexdigest()
+
+
+def _gemini(api_key):
+    def generate(prompt, images=()):
+        from google import genai as _genai
+        client = _genai.Client(api_key=api_key)
+        contents = prompt
+        if images:
+            from google.genai import types as _gtypes
+            contents = [prompt] + [_gtypes.Part.from_bytes(data=data, mime_type=mime)
+                                   for data, mime in images]
+        return client.models.generate_content(model=GEMINI_MODEL, contents=contents).text
+    return generate
+
+
+def _recording(generate, fixtures_dir):
+    def record(prompt, images=()):
+        text = generate(prompt, images)
+        os.makedirs(fixtures_dir, exist_ok=True)
+        path = os.path.join(fixtures_dir, fixture_key(prompt, images) + '.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'prompt': prompt[:200], 'images': len(images), 'text': text},
+                      f, ensure_ascii=False, indent=2)
+        return text
+    return record
+
+
+def _replay(fixtures_dir):
+    def replay(prompt, images=()):
+        for name in (fixture_key(prompt, images), '_default'):
+            path = os.path.join(fixtures_dir, name + '.json')
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    return json.load(f)['text']
+        raise LookupError(f'Geen LLM-fixture voor {fixture_key(prompt, images)[:12]}')
+    return replay
+
+
+def _parse_latency(spec):
+    """'800' → (800, 800); '500-1500' → (500, 1500), in ms. ValueError bij ongeldige invoer."""
+    low, _, high = str(spec).strip().partition('-')
+    low, high = int(low), int(high or low)
+    if low < 0 or high < low:
+        raise ValueError(f'Ongeldige latency: {spec!r}')
+    return low, high
+
+
+def _with_latency(generate, latency):
+    low, high = latency
+
+    def delayed(prompt, images=()):
+        time.sleep(random.uniform(low, high) / 1000)
+        return generate(prompt, images)
+    return delayed
+
+
+def get_llm():
+    """`generate(prompt, images=())` → antwoordtekst, of None zonder beschikbare provider.
+
+    `images` is een reeks (bytes, mime-type).
+    """
+    from flask import current_app
+    cfg = current_app.config
+    provider = cfg.get('LLM_PROVIDER', 'gemini')
+    fixtures_dir = cfg.get('LLM_FIXTURES_DIR')
+    if provider == 'replay':
+        generate = _replay(fixtures_dir)
+    else:
+        from weekmenu.services.gemini import _get_gemini_api_key
+        api_key = _get_gemini_api_key()
+        if not api_key:
+            return None
+        generate = _gemini(api_key)
+        if provider == 'record':
+            generate = _recording(generate, fixtures_dir)
+    if cfg.get('LLM_LATENCY_MS'):
+        generate = _with_latency(generate, cfg['LLM_LATENCY_MS'])
+    return generate
@@ -5,6 +5,7 @@ from weekmenu.models import (
     Recipe, MenuItem, CustomShoppingIngredient,
     ShoppingListExclusion, ShoppingListOverride,
 )
+from weekmenu.services.shopping import invalidate_shopping_cache
 
 
 def plan_recipe(recipe_id, day, meal_type, week, year, people_count, ingredient_ids):
@@ -44,6 +45,7 @@ def plan_recipe(recipe_id, day, meal_type, week, year, people_count, ingredient_
                 year=year, week_number=week, ingredient_id=ri.ingredient_id
             ).delete()
 
+    invalidate_shopping_cache(year, week)
     db.session.commit()
 
 
@@ -62,6 +64,9 @@ def update_week_menu(week, year, menu_data):
 
     MenuItem.query.filter_by(week_number=week, year=year).delete()
 
+    # Een intussen verwijderd recept (bv. in een ander tabblad) wordt overgeslagen
+    known_ids = {rid for (rid,) in db.session.query(Recipe.id)}
+
     new_positions = set()
     for day in menu_data:
         for meal_type, meal_data in day['meals'].items():
@@ -76,7 +81,7 @@ def update_week_menu(week, year, menu_data):
                 recipe_id = meal_data
                 people_count = None
 
-            if recipe_id:
+            if recipe_id and int(recipe_id) in known_ids:
                 recipe_id = int(recipe_id)
                 new_positions.add((day['day'], meal_type, recipe_id))
                 db.session.add(MenuItem(
@@ -107,6 +112,7 @@ def update_week_menu(week, year, menu_data):
         if recipe:
             recipe.last_used = datetime.now()
 
+    invalidate_shopping_cache(year, week)
     db.session.commit()
 
 
@@ -116,6 +122,7 @@ def clear_week(week, year):
     CustomShoppingIngredient.query.filter_by(week_number=week, year=year).delete()
     ShoppingListExclusion.query.filter_by(week_number=week, year=year).delete()
     ShoppingListOverride.query.filter_by(week_number=week, year=year).delete()
+    invalidate_shopping_cache(year, week)
     db.session.commit()
 
 
@@ -127,4 +134,5 @@ def clear_shopping_list(week, year):
     CustomShoppingIngredient.query.filter_by(week_number=week, year=year).delete()
     ShoppingListExclusion.query.filter_by(week_number=week, year=year).delete()
     ShoppingListOverride.query.filter_by(week_number=week, year=year).delete()
+    invalidate_shopping_cache(year, week)
     db.session.commit()
@@ -1,6 +1,7 @@
 """Pantry CRUD — items marked as "altijd op voorraad", used by shopping-list filter and Ecobooster."""
 from weekmenu.extensions import db
 from weekmenu.models import PantryIngredient
+from weekmenu.services.shopping import invalidate_shopping_cache
 
 
 def list_pantry():
@@ -24,6 +25,7 @@ def add_to_pantry(ingredient_id):
 
     p = PantryIngredient(ingredient_id=ingredient_id)
     db.session.add(p)
+    invalidate_shopping_cache()
     db.session.commit()
     return {
         'status': 'ok',
@@ -38,5 +40,6 @@ def remove_from_pantry(ingredient_id):
     p = PantryIngredient.query.filter_by(ingredient_id=ingredient_id).first()
     if p:
         db.session.delete(p)
+        invalidate_shopping_cache()
         db.session.commit()
     return {'status': 'ok'}
@@ -4,11 +4,51 @@ Used by Ecobooster ("bijna-op"-items), and prepared for future Flyer
 (aanbiedingen) and Seasonal (seizoens-groente) features. All three share the
 same shape: a set of ingredient ids gets boosted, each recipe gets an
 eco-style match-score, results are sorted by missing-count ascending.
+
+Callers normally ask for a top-K page (`limit`/`offset`): a bounded heap
+keeps only the best recipes and display names are resolved for those only.
+
+Scoring runs on an in-process inverted index (ingredient_id -> recipe_ids)
+so only recipes sharing at least one boost-ingredient are touched. The
+index is rebuilt when `catalog_version` changes — DB triggers bump that on
+every recipe save, delete and import (see migrations._migrate_v7).
 """
-from weekmenu.models import Recipe, PantryIngredient
+import heapq
+
+from sqlalchemy.orm import joinedload
+
+from weekmenu.extensions import db
+from weekmenu.models import Recipe, RecipeIngredient, Ingredient, PantryIngredient, Settings
+
+
+DEFAULT_MATCH_LIMIT = 50
+
+_index = {'version': None, 'by_ingredient': {}, 'by_recipe': {}}
+
+
+def _recipe_index():
+    """Inverted index, herbouwd als de catalogus gewijzigd is.
+
+    Returns dict met:
+        by_ingredient: ingredient_id -> set(recipe_id)
+        by_recipe:     recipe_id -> [ingredient_id, ...] in receptvolgorde
+                       (incl. dubbele regels, zoals recipe.ingredients)
+    """
+    version = db.session.query(Settings.value).filter_by(key='catalog_version').scalar()
+    if _index['version'] != version or version is None:
+        by_ingredient, by_recipe = {}, {}
+        rows = (
+            db.session.query(RecipeIngredient.recipe_id, RecipeIngredient.ingredient_id)
+            .order_by(RecipeIngredient.recipe_id, RecipeIngredient.id)
+        )
+        for recipe_id, ing_id in rows:
+            by_ingredient.setdefault(ing_id, set()).add(recipe_id)
+            by_recipe.setdefault(recipe_id, []).append(ing_id)
+        _index.update(version=version, by_ingredient=by_ingredient, by_recipe=by_recipe)
+    return _index
 
 
-def score_recipes(boost_ids, source='ecobooster'):
+def score_recipes(boost_ids, source='ecobooster', limit=None, offset=0):
     """Score recipes by overlap with `boost_ids`.
 
     Args:
@@ -18,6 +58,8 @@ def score_recipes(boost_ids, source='ecobooster'):
         source: label passed through on each result so the frontend can
             distinguish why a recipe is recommended ('ecobooster' | 'flyer' |
             'season').
+        limit: max number of results (top-K); None returns all matches.
+        offset: number of best results to skip, for paging.
 
     Returns:
         list[dict] sorted by (missing_count asc, score desc).
@@ -26,26 +68,52 @@ def score_recipes(boost_ids, source='ecobooster'):
     if not boost_ids:
         return []
 
+    index = _recipe_index()
+    candidate_ids = set()
+    for ing_id in boost_ids:
+        candidate_ids |= index['by_ingredient'].get(ing_id, set())
+    if not candidate_ids:
+        return []
+
     pantry_ids = {p.ingredient_id for p in PantryIngredient.query.all()}
     all_available = boost_ids | pantry_ids
 
-    results = []
-    for recipe in Recipe.query.all():
-        ri_list = recipe.ingredients
-        ri_ids = {ri.ingredient_id for ri in ri_list}
-        total = len(ri_ids)
-        if total == 0:
-            continue
+    def _scored():
+        for recipe_id in candidate_ids:
+            ri_ing_ids = index['by_recipe'][recipe_id]
+            ri_ids = set(ri_ing_ids)
+            matched_boost = boost_ids & ri_ids
+            matched_pantry = pantry_ids & ri_ids
+            score = round((len(matched_boost) + len(matched_pantry)) / len(ri_ids) * 100)
+            missing = [i for i in ri_ing_ids if i not in all_available]
+            # recipe_id als tiebreaker: zelfde volgorde als een stabiele sort op id
+            yield (len(missing), -score, recipe_id, missing)
 
-        matched_boost = boost_ids & ri_ids
-        if not matched_boost:
-            continue
+    offset = max(offset or 0, 0)
+    if limit is None:
+        winners = sorted(_scored())
+    else:
+        winners = heapq.nsmallest(offset + max(limit, 0), _scored())
+    winners = winners[offset:]
+    if not winners:
+        return []
 
-        matched_pantry = pantry_ids & ri_ids
-        score = round((len(matched_boost) + len(matched_pantry)) / total * 100)
-        missing = [ri.ingredient.display for ri in ri_list
-                   if ri.ingredient_id not in all_available]
+    winner_ids = [w[2] for w in winners]
+    missing_ing_ids = {i for w in winners for i in w[3]}
+    recipes = {
+        r.id: r for r in
+        Recipe.query.options(joinedload(Recipe.cookbook)).filter(Recipe.id.in_(winner_ids)).all()
+    }
+    names = {
+        ing.id: ing.display for ing in
+        Ingredient.query.filter(Ingredient.id.in_(missing_ing_ids)).all()
+    } if missing_ing_ids else {}
 
+    results = []
+    for missing_count, neg_score, recipe_id, missing in winners:
+        recipe = recipes.get(recipe_id)
+        if recipe is None:
+            continue
         results.append({
             'id': recipe.id,
             'name': recipe.name,
@@ -53,11 +121,9 @@ def score_recipes(boost_ids, source='ecobooster'):
             'cookbook': recipe.cookbook.abbreviation if recipe.cookbook else None,
             'page': recipe.page,
             'serves': recipe.serves,
-            'eco_score': score,
-            'missing': missing,
-            'missing_count': len(missing),
+            'eco_score': -neg_score,
+            'missing': [names.get(i, '') for i in missing],
+            'missing_count': missing_count,
             'source': source,
         })
-
-    results.sort(key=lambda x: (x['missing_count'], -x['eco_score']))
     return results
@@ -1,15 +1,129 @@
 import re
 import os
+import json
+import base64
 import hashlib
 
 from flask import current_app
+from sqlalchemy.orm import contains_eager
 
 from weekmenu.extensions import db
-from weekmenu.models import Ingredient, IngredientAlias, Cookbook
+from weekmenu.models import (
+    Recipe, RecipeIngredient, Ingredient, IngredientAlias, Cookbook, Settings,
+)
 from weekmenu.constants import _KNOWN_SITES, _BROWSER_HEADERS
 from weekmenu.services.units import _normalize_ingredient, _guess_ingredient_category
 
 
+def serialize_recipe(r, default_serves=4):
+    """Volledige recept-payload voor de detail-modal."""
+    return {
+        'id': r.id,
+        'name': r.name,
+        'serves': r.serves or default_serves,
+        'image_path': r.image_path or '',
+        'cookbook': r.cookbook.name if r.cookbook else None,
+        'cookbook_abbr': r.cookbook.abbreviation if r.cookbook else None,
+        'page': r.page,
+        'url': r.url or '',
+        'instructions': r.instructions or '',
+        'is_favorite': r.is_favorite,
+        'ingredients': [
+            {
+                'id': ri.id,
+                'name': ri.ingredient.display,
+                'amount': ri.amount,
+                'unit': ri.unit,
+                'category': ri.ingredient.category,
+                'preparation': ri.preparation or '',
+            }
+            for ri in r.ingredients
+        ],
+    }
+
+
+def serialize_recipe_card(r, default_serves=4):
+    """Lichte recept-payload voor kaartjes (grid/coverflow/lijst), zonder ingrediënten."""
+    return {
+        'id': r.id,
+        'name': r.name,
+        'serves': r.serves or default_serves,
+        'image_path': r.image_path or '',
+        'cookbook': r.cookbook.name if r.cookbook else None,
+        'cookbook_abbr': r.cookbook.abbreviation if r.cookbook else None,
+        'page': r.page,
+        'is_favorite': r.is_favorite,
+    }
+
+
+def _encode_cursor(recipe):
+    raw = json.dumps([recipe.name, recipe.id], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    try:
+        name, recipe_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(name), int(recipe_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def search_recipes(q='', cookbook=None, favorites=False, ingredient_id=None,
+                   cursor=None, limit=48, default_serves=4):
+    """Eén pagina recepten, gefilterd en gesorteerd op (naam, id).
+
+    Keyset-paginering: `cursor` is de opaque `next_cursor` van de vorige
+    pagina, zodat latere pagina's net zo goedkoop zijn als de eerste.
+    Tekstzoeken matcht elk woord op receptnaam, kookboeknaam of -afkorting.
+
+    Returns (list[dict] kaart-payloads, next_cursor | None).
+    """
+    query = (
+        Recipe.query
+        .outerjoin(Recipe.cookbook)
+        .options(contains_eager(Recipe.cookbook))
+    )
+    for word in (q or '').lower().split():
+        pattern = f'%{word}%'
+        query = query.filter(db.or_(
+            Recipe.name.ilike(pattern),
+            Cookbook.name.ilike(pattern),
+            Cookbook.abbreviation.ilike(pattern),
+        ))
+    if cookbook:
+        query = query.filter(Cookbook.name == cookbook)
+    if favorites:
+        query = query.filter(Recipe.is_favorite.is_(True))
+    if ingredient_id:
+        query = query.filter(Recipe.ingredients.any(RecipeIngredient.ingredient_id == ingredient_id))
+    if cursor:
+        after = _decode_cursor(cursor)
+        if after:
+            name, recipe_id = after
+            query = query.filter(db.or_(
+                Recipe.name > name,
+                db.and_(Recipe.name == name, Recipe.id > recipe_id),
+            ))
+
+    rows = query.order_by(Recipe.name, Recipe.id).limit(limit + 1).all()
+    next_cursor = _encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return [serialize_recipe_card(r, default_serves) for r in rows[:limit]], next_cursor
+
+
+def recipes_page_etag(args, default_serves=4):
+    """Sterke ETag voor één pagina van `search_recipes`.
+
+    `catalog_version` wordt door DB-triggers opgehoogd bij elke wijziging aan
+    recepten, receptingrediënten, ingrediënten en kookboeken (zie
+    migrations._migrate_v7), dus ook bij bulk-updates en scripts. Samen met
+    `default_serves` en de queryparameters (incl. cursor) bepaalt die de pagina.
+    """
+    version = db.session.query(Settings.value).filter_by(key='catalog_version').scalar()
+    raw = json.dumps([version, default_serves, sorted(args.items(multi=True))], ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
 def _resolve_or_create_ingredient(raw_name, category=None):
     """Resolve an ingredient name via the alias system, or create a new one."""
     normalized = _normalize_ingredient(raw_name.lower().strip())
@@ -0,0 +1,210 @@
+"""Content-addressed cache voor URL-imports.
+
+Twee lagen: `scrape_cache_page` koppelt een genormaliseerde URL aan de hash
+van de laatst opgehaalde HTML, `scrape_cache_blob` bewaart per hash de HTML
+(zlib), de `_clean_html`-tekst en de geparste recept-payload. Een tweede
+preview van dezelfde URL binnen `SCRAPE_CACHE_TTL` doet geen enkele
+uitgaande call; daarna wordt opnieuw opgehaald, maar ongewijzigde inhoud
+wordt niet opnieuw geparst of naar Gemini gestuurd. Eviction is LRU op
+`last_hit` tot het totaal onder `SCRAPE_CACHE_MAX_MB` zit.
+"""
+import hashlib
+import json
+import threading
+import time
+import zlib
+from collections import Counter, namedtuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+
+from weekmenu.extensions import db
+from weekmenu.models import Cookbook, ScrapeCachePage, ScrapeCacheBlob
+
+
+_TRACKING_PARAMS = {'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref'}
+
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+CachedPage = namedtuple('CachedPage', 'content_hash html recipe')
+
+
+def _count(stat):
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def _config():
+    from flask import current_app
+    cfg = current_app.config
+    return (cfg.get('SCRAPE_CACHE_TTL', 30 * 24 * 3600),
+            cfg.get('SCRAPE_CACHE_MAX_MB', 64) * 1024 * 1024)
+
+
+def normalize_url(url):
+    """Cachesleutel: host zonder www, zonder fragment/trackingparameters, query gesorteerd."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix('www.')
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith('utm_') and k.lower() not in _TRACKING_PARAMS
+    )
+    return urlunsplit((parts.scheme.lower(), host, parts.path.rstrip('/') or '/',
+                       urlencode(query), ''))
+
+
+def content_hash(html):
+    return hashlib.sha256(html.encode('utf-8', 'replace')).hexdigest()
+
+
+def _with_current_cookbook(payload, url):
+    """Gecachte payload voor deze aanvraag: eigen URL en actuele kookboekstatus."""
+    payload = dict(payload, url=url)
+    name = payload.get('cookbook_name')
+    if name:
+        cookbook = Cookbook.query.filter_by(name=name).first()
+        payload.update(cookbook_id=cookbook.id if cookbook else None,
+                       cookbook_exists=cookbook is not None)
+    return payload
+
+
+def lookup(url):
+    """Gecachte pagina voor `url` binnen de TTL, of None.
+
+    Returns CachedPage(content_hash, html, recipe); `recipe` is de payload
+    (klaar om terug te geven) of None als de pagina nog niet geparst is.
+    """
+    ttl, _ = _config()
+    now = int(time.time())
+    page, blob = ScrapeCachePage.__table__, ScrapeCacheBlob.__table__
+    with db.engine.connect() as conn:
+        row = conn.execute(
+            select(blob.c.content_hash, blob.c.html, blob.c.recipe, page.c.fetched_at)
+            .select_from(page.join(blob, page.c.content_hash == blob.c.content_hash))
+            .where(page.c.url_key == normalize_url(url))
+        ).first()
+    if row is None or now - row.fetched_at >= ttl:
+        _count('misses')
+        return None
+    _touch(row.content_hash, now)
+    _count('hits')
+    recipe = _with_current_cookbook(json.loads(row.recipe), url) if row.recipe else None
+    return CachedPage(row.content_hash, zlib.decompress(row.html).decode('utf-8'), recipe)
+
+
+def _touch(digest, now):
+    blob = ScrapeCacheBlob.__table__
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(blob.update().where(blob.c.content_hash == digest).values(last_hit=now))
+    except OperationalError:
+        pass  # cache is best-effort
+
+
+def store_page(url, html):
+    """Leg net opgehaalde HTML vast. Returns (content_hash, recipe-payload of None).
+
+    Had dezelfde inhoud al een geparst recept (bv. via een andere URL of na
+    het verlopen van de TTL), dan komt dat direct terug.
+    """
+    _, max_bytes = _config()
+    now = int(time.time())
+    digest = content_hash(html)
+    compressed = zlib.compress(html.encode('utf-8', 'replace'), 6)
+    page, blob = ScrapeCachePage.__table__, ScrapeCacheBlob.__table__
+    blob_stmt = sqlite_insert(blob).values(
+        content_hash=digest, html=compressed, size=len(compressed), last_hit=now,
+    ).on_conflict_do_update(index_elements=['content_hash'], set_={'last_hit': now})
+    page_stmt = sqlite_insert(page).values(
+        url_key=normalize_url(url), content_hash=digest, fetched_at=now,
+    ).on_conflict_do_update(index_elements=['url_key'],
+                            set_={'content_hash': digest, 'fetched_at': now})
+    recipe = None
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(blob_stmt)
+            conn.execute(page_stmt)
+            recipe = conn.execute(select(blob.c.recipe).where(blob.c.content_hash == digest)).scalar()
+            _evict(conn, max_bytes, keep=digest)
+    except OperationalError:
+        pass
+    if recipe:
+        _count('unchanged')
+        return digest, _with_current_cookbook(json.loads(recipe), url)
+    return digest, None
+
+
+def _store_field(digest, field, value):
+    blob = ScrapeCacheBlob.__table__
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(
+                blob.update().where(blob.c.content_hash == digest)
+                .values({field: value, 'size': blob.c.size + len(value.encode('utf-8'))})
+            )
+    except OperationalError:
+        pass
+
+
+def store_recipe(digest, payload):
+    """Bewaar een geslaagde parse bij de inhoud waar hij uit kwam."""
+    _store_field(digest, 'recipe', json.dumps(payload, ensure_ascii=False))
+
+
+def clean_text(digest, html, cleaner):
+    """`cleaner(html)`, gecachet per content-hash (invoer voor de LLM-fallback)."""
+    blob = ScrapeCacheBlob.__table__
+    with db.engine.connect() as conn:
+        cached = conn.execute(select(blob.c.clean_text).where(blob.c.content_hash == digest)).scalar()
+    if cached is not None:
+        return cached
+    result = cleaner(html)
+    _store_field(digest, 'clean_text', result)
+    return result
+
+
+def _evict(conn, max_bytes, keep):
+    """Verwijder de minst recent gebruikte pagina's boven `max_bytes`; `keep` blijft altijd."""
+    blob, page = ScrapeCacheBlob.__table__, ScrapeCachePage.__table__
+    if conn.execute(select(func.coalesce(func.sum(blob.c.size), 0))).scalar() <= max_bytes:
+        return
+    conn.execute(text('''
+        DELETE FROM scrape_cache_blob WHERE content_hash IN (
+            SELECT content_hash FROM (
+                SELECT content_hash,
+                       SUM(size) OVER (ORDER BY content_hash = :keep DESC, last_hit DESC,
+                                                 content_hash) AS running
+                FROM scrape_cache_blob
+            ) WHERE running > :max_bytes
+        )
+    '''), {'max_bytes': max_bytes, 'keep': keep})
+    conn.execute(page.delete().where(page.c.content_hash.notin_(select(blob.c.content_hash))))
+
+
+def scrape_cache_stats():
+    """Hit/miss-tellers (sinds processtart) en omvang van de scrape-cache."""
+    ttl, max_bytes = _config()
+    with _stats_lock:
+        stats = dict(_stats)
+    blob = ScrapeCacheBlob.__table__
+    size = db.session.execute(select(func.coalesce(func.sum(blob.c.size), 0))).scalar()
+    stats = {k: stats.get(k, 0) for k in ('hits', 'misses', 'unchanged')}
+    stats.update(
+        urls=ScrapeCachePage.query.count(),
+        pages=ScrapeCacheBlob.query.count(),
+        bytes=size,
+        max_bytes=max_bytes,
+        ttl=ttl,
+    )
+    return stats
+
+
+def clear_scrape_cache():
+    ScrapeCachePage.query.delete()
+    ScrapeCacheBlob.query.delete()
+    db.session.commit()
+    with _stats_lock:
+        _stats.clear()
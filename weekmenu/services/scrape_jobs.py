@@ -0,0 +1,183 @@
+"""Wachtrij voor URL-imports.
+
+`/recipe/scrape` legt alleen een `ScrapeJob` vast en geeft direct een job-id
+terug; een kleine pool worker-threads haalt de jobs in volgorde op en draait
+`scrape_recipe_from_url` (ophalen, parsen, eventueel Gemini, afbeelding en
+site-logo). De tabel is de wachtrij, dus jobs overleven een herstart:
+`create_app` start de workers en wat bij het afsluiten nog 'running' stond,
+wordt dan opnieuw ingepland.
+
+Losse imports gaan vóór bulk-jobs, en per domein draaien nooit meer dan
+`SCRAPE_PER_DOMAIN` jobs tegelijk (één blog wordt niet platgelegd).
+"""
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+from sqlalchemy import text
+
+from weekmenu.extensions import db
+from weekmenu.models import ScrapeJob
+
+
+_IDLE_WAIT = 5               # s; workers kijken ook zonder signaal af en toe in de tabel
+_JOB_RETENTION = 24 * 3600   # afgeronde losse jobs worden na een dag opgeruimd
+_SWEEP_INTERVAL = 60         # s; ledige workers kijken zo vaak naar niet-opgeslagen bulk-jobs
+
+_start_lock = threading.Lock()
+_workers = []
+# Nieuwe job of vrijgekomen domeinslot: wek wachtende workers. De generatie
+# voorkomt een gemiste wake-up tussen een lege claim en het wachten.
+_wakeup = threading.Condition()
+_generation = [0]
+_next_sweep = [0.0]
+
+
+def _notify():
+    with _wakeup:
+        _generation[0] += 1
+        _wakeup.notify_all()
+
+
+def _ensure_workers(app):
+    with _start_lock:
+        if _workers:
+            return
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                "UPDATE scrape_job SET state = 'queued', started_at = NULL WHERE state = 'running'"
+            ))
+        for n in range(app.config.get('SCRAPE_WORKERS', 3)):
+            t = threading.Thread(target=_worker, args=(app,), name=f'scrape-worker-{n}', daemon=True)
+            t.start()
+            _workers.append(t)
+
+
+def _domain(url):
+    return urlparse(url).netloc.lower().removeprefix('www.') or None
+
+
+def enqueue_scrape(url):
+    """Plan een URL-import in. Returns de job als dict (zie `scrape_job_status`)."""
+    now = int(time.time())
+    job = ScrapeJob(url=url, domain=_domain(url), state='queued', created_at=now)
+    db.session.add(job)
+    ScrapeJob.query.filter(
+        ScrapeJob.batch_id.is_(None),
+        ScrapeJob.state.in_(('done', 'failed')),
+        ScrapeJob.finished_at < now - _JOB_RETENTION,
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    start_scrape_workers()
+    return _job_dict(job)
+
+
+def start_scrape_workers():
+    """Start de workers (eenmalig) en meld dat er nieuw werk klaarstaat."""
+    from flask import current_app
+    _ensure_workers(current_app._get_current_object())
+    _notify()
+
+
+def scrape_job_status(job_id):
+    """Status van één job, of None als hij niet (meer) bestaat."""
+    job = ScrapeJob.query.get(job_id)
+    if job is None:
+        return None
+    return _job_dict(job)
+
+
+def _job_dict(job):
+    data = {
+        'job_id': job.id,
+        'url': job.url,
+        'state': job.state,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+    if job.state == 'queued':
+        data['queued_ahead'] = ScrapeJob.query.filter(
+            ScrapeJob.state == 'queued', ScrapeJob.id < job.id).count()
+    if job.result is not None:
+        data['http_status'] = job.http_status
+        data['result'] = json.loads(job.result)
+    return data
+
+
+def _claim_next(per_domain):
+    """Zet de volgende wachtende job atomair op 'running'.
+
+    Losse imports eerst, dan bulk-jobs in volgorde; jobs van een domein dat
+    al `per_domain` keer draait, worden overgeslagen. Returns (id, url,
+    batch_id) of None.
+    """
+    with db.engine.begin() as conn:
+        return conn.execute(text('''
+            UPDATE scrape_job SET state = 'running', started_at = :now
+            WHERE id = (
+                SELECT q.id FROM scrape_job q
+                WHERE q.state = 'queued'
+                  AND (SELECT COUNT(*) FROM scrape_job r
+                       WHERE r.state = 'running' AND r.domain = q.domain) < :per_domain
+                ORDER BY q.batch_id IS NOT NULL, q.id
+                LIMIT 1
+            )
+            RETURNING id, url, batch_id
+        '''), {'now': int(time.time()), 'per_domain': per_domain}).fetchone()
+
+
+def _finish(job_id, state, payload, status):
+    with db.engine.begin() as conn:
+        conn.execute(text('''
+            UPDATE scrape_job
+            SET state = :state, result = :result, http_status = :status, finished_at = :now
+            WHERE id = :id
+        '''), {'state': state, 'result': json.dumps(payload), 'status': status,
+               'now': int(time.time()), 'id': job_id})
+
+
+def _sweep_due():
+    with _start_lock:
+        if time.time() < _next_sweep[0]:
+            return False
+        _next_sweep[0] = time.time() + _SWEEP_INTERVAL
+        return True
+
+
+def _worker(app):
+    from weekmenu.services.gemini import scrape_recipe_from_url
+    from weekmenu.services.bulk_import import ingest_ready, sweep_batches
+    per_domain = app.config.get('SCRAPE_PER_DOMAIN', 2)
+    idle = True  # direct na de start ook een ronde langs blijven hangende batches
+    while True:
+        with _wakeup:
+            seen = _generation[0]
+        with app.app_context():
+            try:
+                if idle and _sweep_due():
+                    sweep_batches()
+                claimed = _claim_next(per_domain)
+                idle = claimed is None
+                if claimed is None:
+                    with _wakeup:
+                        if _generation[0] == seen:
+                            _wakeup.wait(_IDLE_WAIT)
+                    continue
+                job_id, url, batch_id = claimed
+                try:
+                    payload, status = scrape_recipe_from_url(url)
+                    _finish(job_id, 'done', payload, status)
+                except Exception as e:
+                    app.logger.warning('Scrape-job %s mislukt: %r', job_id, e)
+                    _finish(job_id, 'failed',
+                            {'status': 'error', 'message': f'Fout bij verwerken: {str(e)[:100]}'}, 500)
+                _notify()  # domeinslot vrij
+                if batch_id is not None:
+                    ingest_ready(batch_id)
+            except Exception as e:
+                app.logger.warning('Scrape-worker fout: %r', e)
+                time.sleep(1)
+            finally:
+                db.session.remove()
@@ -0,0 +1,90 @@
+"""Instellingen: getypte in-process snapshot van de Settings-tabel.
+
+Alle keys worden bij het eerste gebruik in één query geladen; daarna lezen
+routes uit het geheugen. Schrijven gaat via `set_settings` (write-through
+naar de DB, daarna een nieuwe snapshot met opgehoogde versie). De app draait
+als één proces, dus er is geen andere schrijver die de snapshot mist.
+
+`schema_version`, `catalog_version` en `conversion_version` vallen erbuiten: die worden door
+migraties en DB-triggers bijgewerkt, buiten deze service om.
+"""
+import threading
+
+from weekmenu.extensions import db
+from weekmenu.models import Settings
+
+
+_EXTERNAL_KEYS = ('schema_version', 'catalog_version', 'conversion_version')
+
+# Keys die niet als string gelezen worden
+_TYPES = {
+    'default_serves':   int,
+    'ah_token_expires': int,
+    'ah_anon_expires':  int,
+}
+
+_lock = threading.Lock()
+_snapshot = {'version': 0, 'values': None}
+
+
+def _convert(key, raw):
+    if raw is None or raw == '':
+        return None
+    try:
+        return _TYPES.get(key, str)(raw)
+    except ValueError:
+        return None
+
+
+def settings_snapshot():
+    """Huidige snapshot: `{'version': int, 'values': {key: getypte waarde}}`.
+
+    De values-dict wordt nooit in-place gewijzigd; behandel hem als read-only.
+    """
+    with _lock:
+        snapshot = _snapshot
+    if snapshot['values'] is not None:
+        return snapshot
+    rows = db.session.query(Settings.key, Settings.value).filter(
+        Settings.key.notin_(_EXTERNAL_KEYS)).all()
+    values = {key: _convert(key, raw) for key, raw in rows}
+    with _lock:
+        if _snapshot['values'] is None:
+            _snapshot.update(values=values, version=_snapshot['version'] + 1)
+        return _snapshot
+
+
+def get_setting(key, default=None):
+    value = settings_snapshot()['values'].get(key)
+    return default if value is None else value
+
+
+def set_settings(values):
+    """Schrijf meerdere keys in één commit; None of '' verwijdert de key."""
+    existing = {s.key: s for s in Settings.query.filter(Settings.key.in_(list(values)))}
+    for key, value in values.items():
+        s = existing.get(key)
+        if value is None or value == '':
+            if s:
+                db.session.delete(s)
+        elif s:
+            s.value = str(value)
+        else:
+            db.session.add(Settings(key=key, value=str(value)))
+    db.session.commit()
+
+    with _lock:
+        if _snapshot['values'] is None:
+            return
+        updated = dict(_snapshot['values'])
+        for key, value in values.items():
+            converted = _convert(key, None if value is None else str(value))
+            if converted is None:
+                updated.pop(key, None)
+            else:
+                updated[key] = converted
+        _snapshot.update(values=updated, version=_snapshot['version'] + 1)
+
+
+def set_setting(key, value):
+    set_settings({key: value})
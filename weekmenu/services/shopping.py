@@ -1,16 +1,62 @@
+import json
 from collections import defaultdict
 
+from sqlalchemy.exc import IntegrityError
+
 from weekmenu.extensions import db
 from weekmenu.models import (
-    MenuItem, QuickAddItem, CustomShoppingIngredient,
-    Ingredient, IngredientUnitConversion, ShoppingListExclusion, PantryIngredient,
+    Recipe, RecipeIngredient, MenuItem, QuickAddItem, CustomShoppingIngredient,
+    Ingredient, ShoppingListExclusion, PantryIngredient,
+    ShoppingListCache,
 )
 from weekmenu.constants import _UNIT_BUY_ONE
 from weekmenu.services.units import (
-    _norm_unit, _calc_multiplier, _convert_unit_for_agg,
+    _norm_unit, _convert_unit_for_agg, _get_conversion_graph,
 )
 
 
+def _planned_ingredient_rows(source, year, week):
+    """Ingrediëntregels van alle recepten uit `source` (MenuItem/QuickAddItem) in één query.
+
+    JOIN recept → ingrediënten, portie-multiplier, pantry- en exclusion-filter
+    gebeuren in SQLite. Levert (ingredient_id, unit, amount × multiplier) op,
+    in dezelfde volgorde als de oude per-item walk (item.id, ri.id).
+
+    De multiplier volgt `_calc_multiplier`: alleen bij serves én people_count
+    (beide truthy), anders 1.
+    """
+    multiplier = db.case(
+        (db.and_(Recipe.serves != 0, source.people_count != 0),
+         db.cast(source.people_count, db.Float) / Recipe.serves),
+        else_=1.0,
+    )
+    pantry_ids = db.select(PantryIngredient.ingredient_id)
+    excluded_ids = db.select(ShoppingListExclusion.ingredient_id).where(
+        ShoppingListExclusion.year == year,
+        ShoppingListExclusion.week_number == week,
+    )
+    q = (
+        db.session.query(
+            RecipeIngredient.ingredient_id,
+            RecipeIngredient.unit,
+            RecipeIngredient.amount * multiplier,
+        )
+        .select_from(source)
+        .join(Recipe, Recipe.id == source.recipe_id)
+        .join(RecipeIngredient, RecipeIngredient.recipe_id == Recipe.id)
+        .filter(
+            source.year == year,
+            source.week_number == week,
+            RecipeIngredient.ingredient_id.notin_(pantry_ids),
+            RecipeIngredient.ingredient_id.notin_(excluded_ids),
+        )
+        .order_by(source.id, RecipeIngredient.id)
+    )
+    if source is MenuItem:
+        q = q.filter(MenuItem.skip_shopping_list.is_(False))
+    return q.all()
+
+
 def _build_shopping_dict(year, week):
     """Bouw geaggregeerde boodschappendict voor een week.
 
@@ -18,10 +64,11 @@ def _build_shopping_dict(year, week):
 
     BUG 4 FIX: Custom items worden toegevoegd NA de exclusion filter,
     zodat handmatig toegevoegde items nooit verborgen worden door exclusions.
+
+    Receptregels komen set-based uit SQLite (zie `_planned_ingredient_rows`)
+    in plaats van lazy `item.recipe.ingredients` per menu-item.
     """
-    conversions = {}
-    for conv in IngredientUnitConversion.query.all():
-        conversions[(conv.ingredient_id, conv.from_unit)] = (conv.to_unit, conv.factor)
+    graph = _get_conversion_graph()
     preferred_units = {
         ing.id: ing.preferred_unit
         for ing in Ingredient.query.filter(Ingredient.preferred_unit.isnot(None)).all()
@@ -29,44 +76,18 @@ def _build_shopping_dict(year, week):
 
     shopping_dict = {}
 
-    # 1. Recepten uit weekmenu
-    for item in MenuItem.query.filter_by(week_number=week, year=year).all():
-        if item.skip_shopping_list or not item.recipe:
-            continue
-        m = _calc_multiplier(item.recipe.serves, item.people_count)
-        for ri in item.recipe.ingredients:
-            norm = _norm_unit(ri.unit)
-            amount = ri.amount * m
-            norm, amount = _convert_unit_for_agg(ri.ingredient_id, norm, amount, conversions, preferred_units)
-            shopping_dict[(ri.ingredient_id, norm)] = shopping_dict.get((ri.ingredient_id, norm), 0) + amount
-
-    # 2. Quick-add items
-    for qi in QuickAddItem.query.filter_by(week_number=week, year=year).all():
-        if not qi.recipe:
-            continue
-        m = _calc_multiplier(qi.recipe.serves, qi.people_count)
-        for ri in qi.recipe.ingredients:
-            norm = _norm_unit(ri.unit)
-            amount = ri.amount * m
-            norm, amount = _convert_unit_for_agg(ri.ingredient_id, norm, amount, conversions, preferred_units)
-            shopping_dict[(ri.ingredient_id, norm)] = shopping_dict.get((ri.ingredient_id, norm), 0) + amount
-
-    # 3a. Pantry filter — ingrediënten die altijd in huis zijn nooit op de lijst
-    pantry_ids = {p.ingredient_id for p in PantryIngredient.query.all()}
-    shopping_dict = {k: v for k, v in shopping_dict.items() if k[0] not in pantry_ids}
-
-    # 3. Exclusion filter — VOOR custom items (BUG 4 FIX)
-    excluded_ids = {
-        e.ingredient_id
-        for e in ShoppingListExclusion.query.filter_by(year=year, week_number=week).all()
-    }
-    shopping_dict = {k: v for k, v in shopping_dict.items() if k[0] not in excluded_ids}
+    # 1+2. Recepten uit weekmenu en quick-add items, inclusief pantry- en
+    # exclusion-filter (custom items hieronder vallen daar bewust buiten)
+    for source in (MenuItem, QuickAddItem):
+        for ing_id, unit, amount in _planned_ingredient_rows(source, year, week):
+            norm, amount = _convert_unit_for_agg(ing_id, _norm_unit(unit), amount, graph, preferred_units)
+            shopping_dict[(ing_id, norm)] = shopping_dict.get((ing_id, norm), 0) + amount
 
     # 4. Custom shopping items — NA exclusion filter, zodat ze altijd zichtbaar zijn
     for ci in CustomShoppingIngredient.query.filter_by(week_number=week, year=year).all():
         norm = _norm_unit(ci.unit)
         amount = ci.amount
-        norm, amount = _convert_unit_for_agg(ci.ingredient_id, norm, amount, conversions, preferred_units)
+        norm, amount = _convert_unit_for_agg(ci.ingredient_id, norm, amount, graph, preferred_units)
         shopping_dict[(ci.ingredient_id, norm)] = shopping_dict.get((ci.ingredient_id, norm), 0) + amount
 
     # 5. Merge buy-one entries
@@ -88,3 +109,62 @@ def _build_shopping_dict(year, week):
                 merged[(ing_id, unit)] = amount
 
     return merged
+
+
+def get_shopping_dict(year, week):
+    """Geaggregeerde boodschappendict voor een week, uit de cache waar mogelijk.
+
+    Bij een cache-miss wordt `_build_shopping_dict` gedraaid en het resultaat
+    per (year, week) opgeslagen. Er is geen TTL: schrijfacties die de lijst
+    raken roepen zelf `invalidate_shopping_cache*` aan, binnen hun eigen
+    transactie. Geeft altijd een nieuwe dict terug (routes muteren hem).
+    """
+    cached = ShoppingListCache.query.filter_by(year=year, week_number=week).first()
+    if cached:
+        return {(ing_id, unit): amount for ing_id, unit, amount in json.loads(cached.items)}
+
+    shopping_dict = _build_shopping_dict(year, week)
+    try:
+        db.session.add(ShoppingListCache(
+            year=year, week_number=week,
+            items=json.dumps([[ing_id, unit, amount]
+                              for (ing_id, unit), amount in shopping_dict.items()]),
+        ))
+        db.session.commit()
+    except IntegrityError:
+        # Gelijktijdige request heeft dezelfde week al opgeslagen
+        db.session.rollback()
+    return shopping_dict
+
+
+def invalidate_shopping_cache(year=None, week=None):
+    """Verwijder de cache voor één week, of voor alle weken zonder argumenten.
+
+    Commit niet: de aanroeper commit samen met de wijziging die de lijst raakt.
+    """
+    q = ShoppingListCache.query
+    if year is not None and week is not None:
+        q = q.filter_by(year=year, week_number=week)
+    q.delete(synchronize_session=False)
+
+
+def invalidate_shopping_cache_for_recipe(recipe_id):
+    """Verwijder de cache van alle weken waarin `recipe_id` gepland of quick-added is."""
+    weeks = db.union(
+        db.select(MenuItem.year, MenuItem.week_number).where(MenuItem.recipe_id == recipe_id),
+        db.select(QuickAddItem.year, QuickAddItem.week_number).where(QuickAddItem.recipe_id == recipe_id),
+    )
+    for year, week in db.session.execute(weeks).all():
+        invalidate_shopping_cache(year, week)
+
+
+def _ingredient_map(shopping_dict):
+    """Laad alle ingrediënten uit een boodschappendict in één IN-query.
+
+    Returns dict ingredient_id -> Ingredient (incl. ah_product_* kolommen),
+    zodat routes niet per regel `Ingredient.query.get` hoeven te doen.
+    """
+    ids = {ing_id for ing_id, _ in shopping_dict}
+    if not ids:
+        return {}
+    return {ing.id: ing for ing in Ingredient.query.filter(Ingredient.id.in_(ids)).all()}
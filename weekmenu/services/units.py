@@ -77,29 +77,138 @@ def _norm_unit(u):
     return _UNIT_NORMALIZE.get((u or '').lower().strip(), (u or '').lower().strip())
 
 
+def _conversion_paths(edges, sources):
+    """Alle (from, to) -> factor paden vanuit `sources`, via BFS over `edges`.
+
+    `edges` is een adjacency-dict unit -> {unit: factor}; multi-hop paden
+    krijgen het product van de factoren (bijv. el → ml → l).
+    """
+    paths = {}
+    for src in sources:
+        seen = {src: 1.0}
+        queue = [src]
+        while queue:
+            unit = queue.pop(0)
+            for nxt, factor in edges.get(unit, {}).items():
+                if nxt not in seen:
+                    seen[nxt] = seen[unit] * factor
+                    queue.append(nxt)
+        for dst, factor in seen.items():
+            if dst != src:
+                paths[(src, dst)] = factor
+    return paths
+
+
+def _add_edge(edges, from_unit, to_unit, factor):
+    """Voeg een conversie én de inverse toe aan een adjacency-dict."""
+    if not factor or from_unit == to_unit:
+        return
+    edges.setdefault(from_unit, {}).setdefault(to_unit, factor)
+    edges.setdefault(to_unit, {}).setdefault(from_unit, 1.0 / factor)
+
+
+_GLOBAL_UNIT_EDGES = {}
+for (_from, _to), _factor in _UNIT_CONVERSIONS.items():
+    _add_edge(_GLOBAL_UNIT_EDGES, _from, _to, _factor)
+_GLOBAL_UNIT_PATHS = _conversion_paths(_GLOBAL_UNIT_EDGES, list(_GLOBAL_UNIT_EDGES))
+
+
+def _compile_conversion_graph(rows):
+    """Compileer globale + per-ingrediënt conversies tot één lookup-graph.
+
+    Args:
+        rows: iterable van (ingredient_id, from_unit, to_unit, factor), de
+            inhoud van IngredientUnitConversion.
+
+    Returns:
+        dict met 'paths' {(ingredient_id | None, from, to): factor} — alle
+        transitieve paden, None voor de globale tabel — en 'direct'
+        {(ingredient_id, from): (to, factor)}, de losse conversieregels.
+    """
+    per_ing = {}
+    direct = {}
+    for ing_id, from_unit, to_unit, factor in rows:
+        from_unit, to_unit = _norm_unit(from_unit), _norm_unit(to_unit)
+        direct[(ing_id, from_unit)] = (to_unit, factor)
+        _add_edge(per_ing.setdefault(ing_id, {}), from_unit, to_unit, factor)
+
+    paths = {(None, f, t): factor for (f, t), factor in _GLOBAL_UNIT_PATHS.items()}
+    for ing_id, ing_edges in per_ing.items():
+        edges = {u: dict(nbrs) for u, nbrs in _GLOBAL_UNIT_EDGES.items()}
+        for unit, nbrs in ing_edges.items():
+            edges.setdefault(unit, {}).update(nbrs)
+        for (f, t), factor in _conversion_paths(edges, list(edges)).items():
+            if _GLOBAL_UNIT_PATHS.get((f, t)) != factor:
+                paths[(ing_id, f, t)] = factor
+    return {'paths': paths, 'direct': direct}
+
+
+_conversion_graph = {'version': None, 'graph': None}
+
+
+def _get_conversion_graph():
+    """Gecompileerde conversie-graph, alleen herbouwd als de tabel wijzigt.
+
+    De conversietabel wordt ook buiten de app bijgewerkt (scripts/), dus
+    DB-triggers hogen `conversion_version` op bij elke wijziging (migratie v11).
+    """
+    from weekmenu.models import Settings, IngredientUnitConversion as IUC
+
+    version = db.session.query(Settings.value).filter_by(key='conversion_version').scalar()
+    if _conversion_graph['version'] != version or version is None:
+        rows = db.session.query(IUC.ingredient_id, IUC.from_unit, IUC.to_unit, IUC.factor).all()
+        _conversion_graph['graph'] = _compile_conversion_graph(rows)
+        _conversion_graph['version'] = version
+    return _conversion_graph['graph']
+
+
+def convert(ing_id, from_unit, to_unit, graph=None):
+    """O(1) factor van `from_unit` naar `to_unit` voor een ingrediënt, of None.
+
+    Per-ingrediënt paden gaan voor op de globale; units moeten al
+    genormaliseerd zijn (zie `_norm_unit`). Geef `graph` mee in loops om
+    de versie-check van `_get_conversion_graph` maar één keer te doen.
+    """
+    if from_unit == to_unit:
+        return 1.0
+    paths = (graph or _get_conversion_graph())['paths']
+    return paths.get((ing_id, from_unit, to_unit)) or paths.get((None, from_unit, to_unit))
+
+
+def _convert_to_target(graph, ing_id, norm, amount, preferred):
+    """Zet (norm, amount) om naar de preferred unit als daar een pad naartoe is.
+
+    Zonder (bereikbare) preferred unit valt dit terug op de directe
+    per-ingrediënt conversieregel, zoals voorheen.
+    """
+    if preferred and norm != preferred:
+        factor = convert(ing_id, norm, preferred, graph)
+        if factor:
+            return preferred, amount * factor
+    elif preferred:
+        return norm, amount
+    direct = graph['direct'].get((ing_id, norm))
+    if direct:
+        to_unit, factor = direct
+        return to_unit, amount * factor
+    return norm, amount
+
+
 def _normalize_ri_unit(ingredient, unit, amount):
     """Normaliseer unit + amount bij opslaan van RecipeIngredient/CustomShoppingIngredient."""
-    from weekmenu.models import IngredientUnitConversion
-
     norm = _norm_unit(unit)
 
     if not ingredient.preferred_unit and norm:
+        # Nieuwe preferred_unit verandert de aggregatie in elke week met dit ingrediënt
+        from weekmenu.services.shopping import invalidate_shopping_cache
         ingredient.preferred_unit = norm
+        invalidate_shopping_cache()
 
     if not ingredient.preferred_unit or norm == ingredient.preferred_unit:
         return norm, amount
 
-    conv = IngredientUnitConversion.query.filter_by(
-        ingredient_id=ingredient.id, from_unit=norm
-    ).first()
-    if conv:
-        return conv.to_unit, amount * conv.factor
-
-    gfactor = _UNIT_CONVERSIONS.get((norm, ingredient.preferred_unit))
-    if gfactor:
-        return ingredient.preferred_unit, amount * gfactor
-
-    return norm, amount
+    return _convert_to_target(_get_conversion_graph(), ingredient.id, norm, amount,
+                              ingredient.preferred_unit)
 
 
 def _calc_multiplier(recipe_serves, people_count):
@@ -112,19 +221,13 @@ def _calc_multiplier(recipe_serves, people_count):
     return 1
 
 
-def _convert_unit_for_agg(ing_id, norm, amount, conversions, preferred_units):
-    """Pas unit-conversie toe voor aggregatie (vangnet voor historische data)."""
-    conv_key = (ing_id, norm)
-    if conv_key in conversions:
-        to_unit, factor = conversions[conv_key]
-        return to_unit, amount * factor
-    if ing_id in preferred_units:
-        pref = preferred_units[ing_id]
-        if norm != pref:
-            gfactor = _UNIT_CONVERSIONS.get((norm, pref))
-            if gfactor:
-                return pref, amount * gfactor
-    return norm, amount
+def _convert_unit_for_agg(ing_id, norm, amount, graph, preferred_units):
+    """Pas unit-conversie toe voor aggregatie (vangnet voor historische data).
+
+    `graph` komt uit `_get_conversion_graph()`; multi-hop paden naar de
+    preferred unit (bijv. stuks → g → kg) worden ook samengevoegd.
+    """
+    return _convert_to_target(graph, ing_id, norm, amount, preferred_units.get(ing_id))
 
 
 def _calc_ah_qty(ing, amount, unit):
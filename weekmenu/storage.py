@@ -0,0 +1,88 @@
+"""SQLite-opslagprofiel: PRAGMA's die op elke nieuwe connectie worden gezet.
+
+De app draait als één proces op één databasebestand (`/data/weekmenu.db`).
+WAL laat de planner- en boodschappenpagina's lezen terwijl er geschreven
+wordt; de overige waarden zijn afgestemd op een kleine DB op lokale disk.
+
+Elke PRAGMA is te overschrijven via een env-var `SQLITE_<NAAM>`, bv.
+`SQLITE_MMAP_SIZE=0` of `SQLITE_SYNCHRONOUS=FULL`.
+"""
+import os
+import re
+
+from sqlalchemy import event, text
+
+
+# Volgorde is relevant: journal_mode eerst, busy_timeout vóór de rest zodat
+# een concurrerende schrijver niet direct een 'database is locked' geeft.
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,            # ms
+    'synchronous': 'NORMAL',         # veilig in WAL-modus, alleen de laatste commit kan verloren gaan bij stroomuitval
+    'cache_size': -16000,            # negatief = KiB, dus ~16 MB page cache
+    'mmap_size': 64 * 1024 * 1024,   # DB is enkele MB's; 64 MB dekt groei ruim
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',            # verwijderen ruimt afhankelijke rijen expliciet op (routes/recipes.py)
+}
+
+# Leesbare namen voor de numerieke waarden die `PRAGMA x` teruggeeft
+_PRAGMA_LABELS = {
+    'synchronous': {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'},
+    'temp_store': {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'},
+    'foreign_keys': {0: 'OFF', 1: 'ON'},
+}
+
+_VALUE_RE = re.compile(r'^-?\w+$')
+
+
+def sqlite_pragmas_from_env(environ=None):
+    """Standaardprofiel met overrides uit `SQLITE_<NAAM>` env-vars."""
+    environ = os.environ if environ is None else environ
+    pragmas = dict(DEFAULT_SQLITE_PRAGMAS)
+    for name in pragmas:
+        raw = environ.get(f'SQLITE_{name.upper()}')
+        if raw is not None and raw.strip():
+            pragmas[name] = raw.strip()
+    return pragmas
+
+
+def install_sqlite_profile(engine, pragmas):
+    """Registreer een connect-hook die `pragmas` op elke nieuwe connectie zet.
+
+    No-op voor niet-SQLite engines. Waarden worden gevalideerd omdat PRAGMA
+    geen bind-parameters ondersteunt.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    for name, value in pragmas.items():
+        if not _VALUE_RE.match(str(value)):
+            raise ValueError(f'Ongeldige waarde voor PRAGMA {name}: {value!r}')
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def effective_sqlite_pragmas(session, pragmas):
+    """Lees de actuele PRAGMA-waarden van de huidige connectie terug.
+
+    Returns:
+        list[dict]: `{name, configured, effective}` per PRAGMA, in profielvolgorde.
+    """
+    if session.get_bind().dialect.name != 'sqlite':
+        return []
+    rows = []
+    for name, configured in pragmas.items():
+        value = session.execute(text(f'PRAGMA {name}')).scalar()
+        value = _PRAGMA_LABELS.get(name, {}).get(value, value)
+        rows.append({
+            'name': name,
+            'configured': str(configured),
+            'effective': str(value).upper() if isinstance(value, str) else str(value),
+        })
+    return rows